@@ -0,0 +1 @@
+"""MySQL MCP 服务器的基准测试与计时工具"""
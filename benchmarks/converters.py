@@ -0,0 +1,99 @@
+"""结果值转换吞吐量（单元格/秒）
+
+用约一百万个单元格的内存结果集（与benchmarks.encoding相同的宽表）比较
+改动前逐单元格判断类型的转换循环与按cursor.description生成的按列转换计划，
+分别给出只转换与转换加编码的耗时。
+
+用法: python -m benchmarks.converters [--cells N] [--repeat N]
+"""
+
+import argparse
+import json
+import time
+from decimal import Decimal
+
+from mysql_mcp.converters import ConversionPlan
+from mysql_mcp.encoding import ENCODER, NATIVE_DATETIME, RESULT_FORMATS, encode_json, shape_columns
+from mysql_mcp.mysql_handler import DecimalEncoder
+
+from .encoding import COLUMNS, DESCRIPTION, make_rows
+
+def legacy_convert(rows: list) -> list:
+    """改动前的转换循环：每个单元格做isinstance/hasattr判断与列名查找"""
+    data = []
+    for row in rows:
+        row_dict = {}
+        for i, value in enumerate(row):
+            col_name = COLUMNS[i] if i < len(COLUMNS) else f"column_{i}"
+            if value is None:
+                row_dict[col_name] = None
+            elif isinstance(value, Decimal):
+                row_dict[col_name] = float(value)
+            elif hasattr(value, 'isoformat'):
+                row_dict[col_name] = value.isoformat()
+            else:
+                row_dict[col_name] = value
+        data.append(row_dict)
+    return data
+
+
+def _best(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(cells: int, repeat: int) -> dict:
+    rows = make_rows(max(1, cells // len(COLUMNS)))
+    total_cells = len(rows) * len(COLUMNS)
+
+    def rate(seconds: float) -> dict:
+        return {"ms": seconds * 1000, "cells_per_sec": int(total_cells / seconds)}
+
+    def legacy_total():
+        return json.dumps(legacy_convert(rows), ensure_ascii=False, cls=DecimalEncoder)
+
+    results = {
+        "rows": len(rows),
+        "cells": total_cells,
+        "encoder": ENCODER,
+        "before": {
+            "convert_objects": rate(_best(lambda: legacy_convert(rows), repeat)),
+            "convert_encode_objects": rate(_best(legacy_total, repeat)),
+        },
+        "after": {},
+    }
+
+    variants = [
+        # 按列转换，日期列由转换计划调用isoformat()
+        ("plan", {}),
+        # 安装orjson时的默认配置：日期列原样交给编码器
+        ("plan_native_datetime", {"native_datetime": NATIVE_DATETIME}),
+        ("plan_decimal_as_string", {"decimal_as_string": True, "native_datetime": NATIVE_DATETIME}),
+    ]
+    for name, options in variants:
+        entry = {}
+        for fmt in RESULT_FORMATS:
+            def convert(fmt=fmt, options=options):
+                plan = ConversionPlan(DESCRIPTION, **options)
+                return shape_columns(plan.columns, plan.convert(rows), fmt)
+
+            entry[f"convert_{fmt}"] = rate(_best(convert, repeat))
+            entry[f"convert_encode_{fmt}"] = rate(_best(lambda convert=convert: encode_json(convert()), repeat))
+        results["after"][name] = entry
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cells', type=int, default=1_000_000, help="单元格总数")
+    parser.add_argument('--repeat', type=int, default=3, help="每项重复次数（取最好值）")
+    args = parser.parse_args()
+    print(json.dumps(run(args.cells, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
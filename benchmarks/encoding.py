@@ -0,0 +1,147 @@
+"""各返回格式的输出大小与编码耗时
+
+在内存中构造一个宽结果集（不连接数据库），先测量旧的逐行字典 + DecimalEncoder路径，
+再对objects/rows/columnar三种格式分别测量值转换耗时，以及标准库紧凑编码和
+orjson（已安装时）的输出大小与编码耗时。
+
+用法: python -m benchmarks.encoding [--rows N] [--repeat N]
+"""
+
+import argparse
+import dataclasses
+import datetime
+import json
+import os
+import time
+from decimal import Decimal
+
+from mysql_mcp import converters as ft
+
+_DUMMY_ENV = {
+    'MYSQL_HOST': '127.0.0.1:3306',
+    'MYSQL_USER': 'bench',
+    'MYSQL_PASSWORD': 'bench',
+    'MYSQL_DATABASE': 'bench',
+}
+
+COLUMNS = [
+    'id', 'user_id', 'sku', 'title', 'status', 'quantity',
+    'unit_price', 'discount', 'created_at', 'updated_at', 'note', 'shipped',
+]
+
+# 与make_rows各列对应的cursor.description：(name, type_code, ..., null_ok)
+_TYPES = [
+    (ft.LONGLONG, False), (ft.LONG, False), (ft.VAR_STRING, False), (ft.VAR_STRING, False),
+    (ft.STRING, False), (ft.TINY, False), (ft.NEWDECIMAL, False), (ft.NEWDECIMAL, True),
+    (ft.DATETIME, False), (ft.DATETIME, True), (ft.VAR_STRING, True), (ft.TINY, False),
+]
+DESCRIPTION = [
+    (name, type_code, None, None, None, None, null_ok)
+    for name, (type_code, null_ok) in zip(COLUMNS, _TYPES)
+]
+
+
+def make_rows(count: int) -> list:
+    """构造与aiomysql返回值类型一致的结果行"""
+    base = datetime.datetime(2024, 1, 1, 12, 0, 0)
+    rows = []
+    for i in range(count):
+        rows.append((
+            i,
+            i % 9973,
+            f"SKU-{i:08d}",
+            f"Product title number {i} with a moderately long name",
+            ('paid', 'shipped', 'refunded')[i % 3],
+            i % 17,
+            Decimal(f"{i % 1000}.{i % 100:02d}"),
+            None if i % 4 else Decimal('0.10'),
+            base + datetime.timedelta(seconds=i),
+            None if i % 2 else base + datetime.timedelta(days=1, seconds=i),
+            None if i % 5 else "gift wrap, leave at the door",
+            i % 2,
+        ))
+    return rows
+
+
+def _best(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(rows_count: int, repeat: int) -> dict:
+    for key, value in _DUMMY_ENV.items():
+        os.environ.setdefault(key, value)
+
+    from mysql_mcp import encoding
+    from mysql_mcp.config import Settings
+    from mysql_mcp.mysql_handler import DecimalEncoder, MySQLHandler
+
+    settings = dataclasses.replace(
+        Settings.from_env(), result_max_bytes=0, result_max_cell_length=0
+    )
+    handler = MySQLHandler(settings)
+    rows = make_rows(rows_count)
+
+    def legacy():
+        # 改动前的路径：逐行构造字典，DecimalEncoder + 默认分隔符
+        data = []
+        for row in rows:
+            row_dict = {}
+            for i, value in enumerate(row):
+                if isinstance(value, Decimal):
+                    value = float(value)
+                elif hasattr(value, 'isoformat'):
+                    value = value.isoformat()
+                row_dict[COLUMNS[i]] = value
+            data.append(row_dict)
+        return json.dumps({"columns": COLUMNS, "data": data}, ensure_ascii=False, cls=DecimalEncoder)
+
+    legacy_out = legacy()
+    results = {
+        "rows": rows_count,
+        "columns": len(COLUMNS),
+        "encoder": encoding.ENCODER,
+        # 旧路径的耗时包含转换与编码
+        "legacy_objects": {
+            "bytes": len(legacy_out.encode('utf-8')),
+            "total_ms": _best(legacy, repeat) * 1000,
+        },
+        "formats": {},
+    }
+
+    encoders = {"json": encoding.encode_json_stdlib}
+    if encoding.orjson is not None:
+        encoders["orjson"] = encoding.encode_json
+
+    for fmt in encoding.RESULT_FORMATS:
+        def convert(fmt=fmt):
+            plan = handler._conversion_plan(DESCRIPTION, rows)
+            data, _ = handler._convert_rows(plan, rows, result_format=fmt)
+            return {"columns": plan.columns, "data": data}
+
+        payload = convert()
+        entry = {"convert_ms": _best(convert, repeat) * 1000}
+        for name, encode in encoders.items():
+            out = encode(payload)
+            entry[name] = {
+                "bytes": len(out.encode('utf-8')),
+                "encode_ms": _best(lambda encode=encode: encode(payload), repeat) * 1000,
+            }
+        results["formats"][fmt] = entry
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20000, help="结果行数")
+    parser.add_argument('--repeat', type=int, default=5, help="每项重复次数（取最好值）")
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+"""进程内的aiomysql替身，供基准测试在没有MySQL服务器时使用
+
+FakeServer模拟一个只有一张表（bench_items）的数据库：每条语句按配置的延迟（加上每行的
+附加延迟）异步等待后返回预先生成的结果行，行数、列类型与NULL比例都可以配置，
+返回值的Python类型与aiomysql一致（Decimal、datetime、timedelta、bytes等）。
+install()替换aiomysql.create_pool与aiomysql.connect，退出时恢复。
+
+它只实现mysql_mcp实际用到的驱动接口，覆盖所有工具的代码路径：SHOW、DESCRIBE、
+information_schema多结果集、EXPLAIN、流式游标、executemany与事务。命名锁（GET_LOCK等）
+按连接记录，连接关闭或COM_RESET_CONNECTION时释放，用于验证连接归还前的会话重置。
+"""
+
+import asyncio
+import datetime
+import json
+import re
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from mysql_mcp import converters as ft
+
+TABLE = 'bench_items'
+
+# 列类型名 -> (类型码, SQL类型, 按行号生成值)
+COLUMN_TYPES: Dict[str, Tuple[int, str, Callable[[int], Any]]] = {
+    'int': (ft.LONG, 'int', lambda i: i % 9973),
+    'bigint': (ft.LONGLONG, 'bigint', lambda i: i * 7919),
+    'double': (ft.DOUBLE, 'double', lambda i: i / 7.0),
+    'decimal': (ft.NEWDECIMAL, 'decimal(12,2)', lambda i: Decimal(f"{i % 100000}.{i % 100:02d}")),
+    'varchar': (ft.VAR_STRING, 'varchar(64)', lambda i: f"item-{i:08d}"),
+    'text': (ft.BLOB, 'text', lambda i: f"Description of item {i}, with a moderately long body of text"),
+    'json': (ft.JSON, 'json', lambda i: json.dumps({"id": i, "tags": ["a", "b"]})),
+    'blob': (ft.BLOB, 'varbinary(16)', lambda i: i.to_bytes(8, 'big') + b'\xff\xfe'),
+    'date': (ft.DATE, 'date', lambda i: datetime.date(2024, 1, 1) + datetime.timedelta(days=i % 3650)),
+    'datetime': (
+        ft.DATETIME, 'datetime',
+        lambda i: datetime.datetime(2024, 1, 1) + datetime.timedelta(seconds=i * 37),
+    ),
+    'time': (ft.TIME, 'time', lambda i: datetime.timedelta(seconds=i % 86400)),
+}
+
+DEFAULT_COLUMNS = 'bigint,int,varchar,decimal,decimal?,datetime,date?,text?,double,json?'
+
+_LIMIT_RE = re.compile(r"\bLIMIT\s+(\d+)\s*(?:OFFSET\s+\d+\s*)?;?\s*$", re.IGNORECASE)
+_LOCK_RE = re.compile(
+    r"^\s*SELECT\s+(?:/\*.*?\*/\s*)?(GET_LOCK|IS_FREE_LOCK|IS_USED_LOCK|RELEASE_LOCK)\s*\(\s*'([^']*)'", re.IGNORECASE
+)
+# COM_RESET_CONNECTION（pymysql.constants.COMMAND未定义）
+COM_RESET_CONNECTION = 0x1F
+_COUNT_RE = re.compile(r"^\s*SELECT\s+(?:/\*.*?\*/\s*)?COUNT\(\*\)", re.IGNORECASE)
+
+
+class ColumnSpec:
+    """一列的名称、类型与NULL比例；类型名后加?表示可为NULL（每三行一个NULL）"""
+
+    def __init__(self, index: int, spec: str):
+        self.nullable = spec.endswith('?')
+        self.type_name = spec.rstrip('?')
+        if self.type_name not in COLUMN_TYPES:
+            raise ValueError(f"未知的列类型 '{self.type_name}'，可选: {', '.join(COLUMN_TYPES)}")
+        self.type_code, self.sql_type, self._make = COLUMN_TYPES[self.type_name]
+        self.name = 'id' if index == 0 else f"c{index}_{self.type_name}"
+
+    def value(self, i: int) -> Any:
+        if self.nullable and i % 3 == 0:
+            return None
+        return self._make(i)
+
+    def description(self) -> Tuple[Any, ...]:
+        return (self.name, self.type_code, None, None, None, None, self.nullable)
+
+
+def parse_columns(spec: str) -> List[ColumnSpec]:
+    """解析逗号分隔的列类型列表，第一列作为主键id"""
+    return [ColumnSpec(i, part.strip()) for i, part in enumerate(spec.split(',')) if part.strip()]
+
+
+class FakeServer:
+    """模拟的MySQL服务器
+
+    Args:
+        database: 库名
+        rows: bench_items的行数
+        columns: 列类型列表（见COLUMN_TYPES）
+        latency: 每条语句的往返延迟（秒）
+        row_latency: 每返回或写入一行附加的延迟（秒）
+        version: VERSION()返回的服务器版本
+    """
+
+    def __init__(
+        self,
+        database: str = 'bench',
+        rows: int = 1000,
+        columns: str = DEFAULT_COLUMNS,
+        latency: float = 0.0005,
+        row_latency: float = 0.0,
+        version: str = '8.0.36',
+    ):
+        self.database = database
+        self.latency = latency
+        self.row_latency = row_latency
+        self.version = version
+        self.columns = parse_columns(columns)
+        self.rows = [tuple(column.value(i) for column in self.columns) for i in range(rows)]
+        self.statements = 0
+        # 最近一次批量写入（executemany）的语句
+        self.last_batch: Optional[str] = None
+        self._next_thread_id = 1
+        # 命名锁 -> 持有者的线程ID
+        self.named_locks: Dict[str, int] = {}
+
+    def thread_id(self) -> int:
+        self._next_thread_id += 1
+        return self._next_thread_id
+
+    def lock_function(self, conn: "FakeConnection", query: str) -> Optional[List[Tuple[List[Tuple[Any, ...]], Optional[Sequence[Any]]]]]:
+        """执行命名锁函数，不是命名锁查询时返回None"""
+        match = _LOCK_RE.match(query)
+        if match is None:
+            return None
+        self.statements += 1
+        function, name = match.group(1).upper(), match.group(2)
+        owner = self.named_locks.get(name)
+        if function == 'GET_LOCK':
+            value: Optional[int] = int(owner in (None, conn.thread_id()))
+            if value:
+                self.named_locks[name] = conn.thread_id()
+        elif function == 'IS_FREE_LOCK':
+            value = int(owner is None)
+        elif function == 'IS_USED_LOCK':
+            value = owner
+        else:
+            value = None if owner is None else int(owner == conn.thread_id())
+            if value:
+                del self.named_locks[name]
+        description = ((f"{function}('{name}')", ft.LONGLONG, None, None, None, None, True),)
+        return [([(value,)], description)]
+
+    def release_locks(self, conn: "FakeConnection") -> None:
+        """释放连接持有的全部命名锁（会话结束或重置）"""
+        for name, owner in list(self.named_locks.items()):
+            if owner == conn.thread_id():
+                del self.named_locks[name]
+
+    async def delay(self, rows: int = 0) -> None:
+        wait = self.latency + self.row_latency * rows
+        # 即使不设延迟也让出一次事件循环，与真实驱动的await行为一致
+        await asyncio.sleep(wait if wait > 0 else 0)
+
+    def _describe_rows(self) -> List[Tuple[Any, ...]]:
+        return [
+            (c.name, c.sql_type, 'YES' if c.nullable else 'NO', 'PRI' if i == 0 else '', None, '')
+            for i, c in enumerate(self.columns)
+        ]
+
+    def _schema_results(self) -> List[Tuple[List[Tuple[Any, ...]], Optional[Sequence[Any]]]]:
+        tables = [(TABLE, 'BASE TABLE', 'InnoDB', len(self.rows), '')]
+        columns = [
+            (TABLE, c.name, c.sql_type, 'YES' if c.nullable else 'NO', 'PRI' if i == 0 else '', None, '')
+            for i, c in enumerate(self.columns)
+        ]
+        indexes = [(TABLE, 'PRIMARY', 0, 'id', 'BTREE')]
+        return [(tables, None), (columns, None), (indexes, None)]
+
+    def _plan(self) -> Dict[str, Any]:
+        return {
+            "query_block": {
+                "select_id": 1,
+                "cost_info": {"query_cost": f"{len(self.rows) * 0.1:.2f}"},
+                "table": {
+                    "table_name": TABLE,
+                    "access_type": "ALL",
+                    "rows_examined_per_scan": len(self.rows),
+                    "filtered": "100.00",
+                },
+            }
+        }
+
+    def respond(self, query: str, args: Any = None) -> List[Tuple[List[Tuple[Any, ...]], Optional[Sequence[Any]]]]:
+        """返回语句的各个结果集：[(行, description)]"""
+        self.statements += 1
+        upper = query.lstrip().upper()
+        one = lambda name, code=ft.LONGLONG: ((name, code, None, None, None, None, False),)  # noqa: E731
+        if upper.startswith('SHOW DATABASES'):
+            return [([(self.database,), ('information_schema',)], one('Database', ft.VAR_STRING))]
+        if upper.startswith('SHOW TABLES'):
+            return [([(TABLE,)], one(f'Tables_in_{self.database}', ft.VAR_STRING))]
+        if upper.startswith(('DESCRIBE', 'DESC ')):
+            return [(self._describe_rows(), None)]
+        if 'INFORMATION_SCHEMA.TABLES' in upper and 'INFORMATION_SCHEMA.COLUMNS' in upper:
+            return self._schema_results()
+        if 'INFORMATION_SCHEMA.TABLES' in upper:
+            created = datetime.datetime(2024, 1, 1)
+            return [([(1, created, created)], None)]
+        if upper.startswith('SELECT @@MAX_ALLOWED_PACKET'):
+            description = one('@@max_allowed_packet') + one('VERSION()', ft.VAR_STRING)
+            return [([(67108864, self.version)], description)]
+        if upper.startswith('EXPLAIN FORMAT=JSON'):
+            return [([(json.dumps(self._plan()),)], one('EXPLAIN', ft.JSON))]
+        if upper.startswith('EXPLAIN'):
+            description = (
+                ('id', ft.LONGLONG, None, None, None, None, True),
+                ('table', ft.VAR_STRING, None, None, None, None, True),
+                ('rows', ft.LONGLONG, None, None, None, None, True),
+                ('filtered', ft.DOUBLE, None, None, None, None, True),
+            )
+            return [([(1, TABLE, len(self.rows), 100.0)], description)]
+        if upper.startswith(('KILL', 'SET', 'BEGIN', 'COMMIT', 'ROLLBACK')):
+            return [([], None)]
+        if _COUNT_RE.match(query):
+            return [([(len(self.rows),)], one('COUNT(*)'))]
+        if upper.startswith(('SELECT', 'WITH', '(')):
+            rows = self.rows
+            limit = _LIMIT_RE.search(query)
+            if limit is not None:
+                rows = rows[:int(limit.group(1))]
+            return [(rows, [c.description() for c in self.columns])]
+        # 写语句：不返回结果集
+        return [([], None)]
+
+
+class FakeCursor:
+    def __init__(self, conn: "FakeConnection"):
+        self.connection = conn
+        self.description: Optional[Sequence[Any]] = None
+        self.rowcount = -1
+        self.max_stmt_length = 1024000
+        self._results: List[Tuple[List[Tuple[Any, ...]], Optional[Sequence[Any]]]] = []
+        self._rows: List[Tuple[Any, ...]] = []
+        self._pos = 0
+
+    async def __aenter__(self) -> "FakeCursor":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    def _load(self) -> None:
+        rows, self.description = self._results.pop(0)
+        self._rows = rows
+        self._pos = 0
+        self.rowcount = len(rows)
+
+    async def execute(self, query: str, args: Any = None) -> int:
+        server = self.connection.server
+        self._results = server.lock_function(self.connection, query) or server.respond(query, args)
+        self._load()
+        await server.delay(self.rowcount)
+        return self.rowcount
+
+    async def executemany(self, query: str, args: Sequence[Any]) -> int:
+        server = self.connection.server
+        server.statements += 1
+        server.last_batch = query
+        # 驱动把多行INSERT按max_stmt_length拆分为多条语句，每条语句一次往返
+        size = sum(len(repr(row)) for row in args)
+        statements = max(1, -(-size // max(1, self.max_stmt_length)))
+        for _ in range(statements):
+            await server.delay(len(args) // statements)
+        self.description = None
+        self.rowcount = len(args)
+        return len(args)
+
+    async def _do_execute_many(
+        self, prefix: str, values: str, postfix: str, args: Sequence[Any], max_stmt_length: int, encoding: str
+    ) -> int:
+        self.max_stmt_length = max_stmt_length
+        return await self.executemany(prefix + values + postfix, args)
+
+    async def nextset(self) -> Optional[bool]:
+        if not self._results:
+            return None
+        self._load()
+        return True
+
+    async def fetchone(self) -> Optional[Tuple[Any, ...]]:
+        if self._pos >= len(self._rows):
+            return None
+        self._pos += 1
+        return self._rows[self._pos - 1]
+
+    async def fetchmany(self, size: int) -> List[Tuple[Any, ...]]:
+        rows = self._rows[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+    async def fetchall(self) -> List[Tuple[Any, ...]]:
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return rows
+
+    async def close(self) -> None:
+        self._results = []
+
+
+class FakeConnection:
+    def __init__(self, server: FakeServer):
+        self.server = server
+        self.closed = False
+        self.last_usage = asyncio.get_running_loop().time()
+        self._thread_id = server.thread_id()
+        self.resets = 0
+        self.encoding = 'utf8'
+        self._command: Optional[int] = None
+
+    def thread_id(self) -> int:
+        return self._thread_id
+
+    def cursor(self, cursor_class: Any = None) -> FakeCursor:
+        self.last_usage = asyncio.get_running_loop().time()
+        return FakeCursor(self)
+
+    async def begin(self) -> None:
+        await self.server.delay()
+
+    async def commit(self) -> None:
+        await self.server.delay()
+
+    async def rollback(self) -> None:
+        await self.server.delay()
+
+    async def ping(self, reconnect: bool = False) -> None:
+        await self.server.delay()
+
+    async def select_db(self, db: str) -> None:
+        await self.server.delay()
+
+    async def _execute_command(self, command: int, sql: Any) -> None:
+        self._command = command
+
+    async def _read_ok_packet(self) -> bool:
+        await self.server.delay()
+        if self._command == COM_RESET_CONNECTION:
+            self.resets += 1
+            self.server.release_locks(self)
+        self._command = None
+        return True
+
+    def close(self) -> None:
+        self.closed = True
+        self.server.release_locks(self)
+
+    async def ensure_closed(self) -> None:
+        self.close()
+
+
+class FakePool:
+    """有上限的连接池，与aiomysql.Pool一样在连接用尽时等待"""
+
+    def __init__(self, server: FakeServer, minsize: int = 1, maxsize: int = 10, **kwargs: Any):
+        self.server = server
+        self.minsize = minsize
+        self.maxsize = maxsize
+        self.size = 0
+        self._free: List[FakeConnection] = []
+        self._cond = asyncio.Condition()
+
+    @property
+    def freesize(self) -> int:
+        return len(self._free)
+
+    async def acquire(self) -> FakeConnection:
+        async with self._cond:
+            while True:
+                if self._free:
+                    return self._free.pop()
+                if self.size < self.maxsize:
+                    self.size += 1
+                    await self.server.delay()
+                    return FakeConnection(self.server)
+                await self._cond.wait()
+
+    def release(self, conn: FakeConnection) -> "asyncio.Future[None]":
+        if conn.closed:
+            self.size -= 1
+        else:
+            self._free.append(conn)
+
+        async def notify() -> None:
+            async with self._cond:
+                self._cond.notify()
+
+        return asyncio.ensure_future(notify())
+
+    def close(self) -> None:
+        self._free.clear()
+
+    async def wait_closed(self) -> None:
+        pass
+
+
+@contextmanager
+def install(server: FakeServer, hosts: Optional[Dict[str, FakeServer]] = None) -> Iterator[FakeServer]:
+    """在with块内让aiomysql创建的连接池与连接都指向server
+
+    hosts按主机名把连接指向其他服务器（如副本），未列出的主机使用server。
+    """
+    import aiomysql
+
+    original = aiomysql.create_pool, aiomysql.connect
+    hosts = hosts or {}
+
+    async def create_pool(**kwargs: Any) -> FakePool:
+        target = hosts.get(kwargs.get('host', ''), server)
+        await target.delay()
+        return FakePool(target, **kwargs)
+
+    async def connect(**kwargs: Any) -> FakeConnection:
+        target = hosts.get(kwargs.get('host', ''), server)
+        await target.delay()
+        return FakeConnection(target)
+
+    aiomysql.create_pool, aiomysql.connect = create_pool, connect
+    try:
+        yield server
+    finally:
+        aiomysql.create_pool, aiomysql.connect = original
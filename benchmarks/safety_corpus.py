@@ -0,0 +1,227 @@
+"""SQL安全检查引擎的差异对比语料与校验耗时
+
+对语料中的每条查询分别用单遍词法分析（lexer）与sqlparse AST两种引擎做安全检查
+和数据库上下文检查，要求判定结果（包括错误消息）完全一致；KNOWN_DIVERGENCES中
+列出的是sqlparse与MySQL词法不一致、导致其放行多语句的情况，lexer按MySQL规则拒绝。
+随后在不同长度的生成查询上比较两种引擎的耗时。
+
+用法: python -m benchmarks.safety_corpus [--sizes 1,10,100] [--skip-sqlparse-above 100]
+"""
+
+import argparse
+import dataclasses
+import json
+import os
+import sys
+import time
+
+_DUMMY_ENV = {
+    'MYSQL_HOST': '127.0.0.1:3306',
+    'MYSQL_USER': 'bench',
+    'MYSQL_PASSWORD': 'bench',
+    'MYSQL_DATABASE': 'shop',
+}
+
+CORPUS = [
+    # 普通查询
+    "SELECT 1",
+    "select * from users",
+    "SELECT id, name FROM users WHERE id = 1",
+    "SELECT id, name FROM users WHERE name = 'alice' AND age > 30 ORDER BY id DESC LIMIT 10",
+    "SELECT u.id, o.total FROM users u JOIN orders o ON o.user_id = u.id WHERE o.total > 100",
+    "SELECT u.id FROM users u LEFT JOIN orders o ON o.user_id = u.id WHERE o.id IS NULL",
+    "SELECT COUNT(*), SUM(total), AVG(total) FROM orders GROUP BY user_id HAVING COUNT(*) > 2",
+    "SELECT * FROM users WHERE id IN (SELECT user_id FROM orders WHERE total > 10)",
+    "SELECT * FROM users WHERE EXISTS (SELECT 1 FROM orders WHERE orders.user_id = users.id)",
+    "SELECT CASE WHEN total > 100 THEN 'big' WHEN total > 10 THEN 'mid' ELSE 'small' END AS size FROM orders",
+    "SELECT DATE_FORMAT(created_at, '%Y-%m') AS month, COUNT(*) FROM orders GROUP BY month",
+    "SELECT * FROM `order` WHERE `status` = 'paid'",
+    "SELECT * FROM shop.users",
+    "SELECT * FROM other_db.users",
+    "SELECT * FROM users u JOIN other_db.orders o ON o.uid = u.id",
+    "SELECT id FROM users;",
+    "SELECT id FROM users; ",
+    "SELECT id FROM users -- trailing comment",
+    "SELECT id /* inline */ FROM users",
+    "SELECT id FROM users; -- same line comment",
+    "SELECT 'it''s' AS s",
+    "SELECT 'a\\'b' AS s",
+    "SELECT \"double quoted\" AS s",
+    "SELECT * FROM users WHERE note = 'please delete me'",
+    "SELECT * FROM users WHERE note = 'union of things'",
+    "SELECT * FROM users WHERE email LIKE '%@%'",
+    "SELECT * FROM users WHERE note = 'from other.place'",
+    "SELECT INSERT('abcdef', 2, 3, 'XYZ')",
+    "SELECT REPLACE(name, 'a', 'b') FROM users",
+    "SELECT t.update, t.delete FROM audit t",
+    "SELECT update_time, deleted_at, inserted_by FROM audit",
+    "SELECT `delete`, `insert` FROM audit",
+    "SELECT @rownum := @rownum + 1 FROM users",
+    "SELECT 名前 FROM users WHERE 名前 = 'テスト'",
+    "SELECT * FROM users WHERE id IN (1, 2, 3, 4, 5, 6, 7, 8, 9, 10)",
+    "SELECT -1, +2, 3.5e10, 0x1F FROM dual",
+    "SHOW TABLES",
+    "SHOW CREATE TABLE users",
+    "SHOW INDEX FROM users",
+    "show full processlist",
+    "DESCRIBE users",
+    "DESC users",
+    "EXPLAIN SELECT * FROM users WHERE id = 1",
+    "EXPLAIN FORMAT=JSON SELECT * FROM users",
+    # 被拒绝的查询
+    "",
+    "   ",
+    ";",
+    "SELECT 1;;",
+    "DROP TABLE users",
+    "drop table users",
+    "DELETE FROM users WHERE id = 1",
+    "UPDATE users SET name = 'x' WHERE id = 1",
+    "INSERT INTO users (name) VALUES ('x')",
+    "REPLACE INTO users (id, name) VALUES (1, 'x')",
+    "ALTER TABLE users ADD COLUMN x INT",
+    "CREATE TABLE t (id INT)",
+    "CREATE OR REPLACE VIEW v AS SELECT 1",
+    "TRUNCATE TABLE users",
+    "GRANT ALL ON *.* TO 'x'@'%'",
+    "SET @a = 1",
+    "USE other_db",
+    "use shop",
+    "CALL do_something()",
+    "LOCK TABLES users WRITE",
+    "WITH recent AS (SELECT * FROM orders) SELECT * FROM recent",
+    "(SELECT 1)",
+    "/* leading comment */ SELECT 1",
+    "-- leading comment\nSELECT 1",
+    "SELECT 1; DROP TABLE users",
+    "SELECT 1; DELETE FROM users",
+    "SELECT 1;\nUPDATE users SET a = 1",
+    "SELECT 1; /* trailing block comment */",
+    "SELECT * FROM users INTO OUTFILE '/tmp/x'",
+    "SELECT * FROM users INTO DUMPFILE '/tmp/x'",
+    "SELECT LOAD_FILE('/etc/passwd')",
+    "SELECT @@version",
+    "SELECT id FROM users UNION SELECT id FROM admins",
+    "SELECT id FROM users UNION ALL SELECT password FROM admins",
+    "SELECT * FROM users WHERE id = 1 FOR UPDATE",
+    "SELECT * FROM users WHERE id = (DELETE FROM users)",
+    "SELECT 1\nDELETE FROM users",
+    "SELECT * FROM users WHERE id = 1 OR 1=1; INSERT INTO log VALUES (1)",
+    "SELECT insert INTO t",
+    "END IF",
+    "ORDER BY id",
+    "SELECT * FROM users WHERE name = 'x' USE INDEX (idx)",
+]
+
+# sqlparse与MySQL词法不一致的写法：sqlparse将其视为单条SELECT并放行，
+# 而MySQL（MULTI_STATEMENTS开启）会执行分号之后的语句
+KNOWN_DIVERGENCES = [
+    # MySQL中"--"后必须跟空白才是注释，1--1是算术表达式
+    "SELECT 1--1; DROP TABLE users",
+    # /*! */ 可执行注释中的内容会被MySQL执行
+    "SELECT 1 /*!; DROP TABLE users */",
+    # sqlparse在括号未闭合或出现BEGIN时不在分号处切分语句
+    "SELECT (1; DROP TABLE users",
+    "SELECT begin FROM t; DROP TABLE users",
+]
+
+
+def _handlers():
+    for key, value in _DUMMY_ENV.items():
+        os.environ.setdefault(key, value)
+
+    from mysql_mcp.config import Settings
+    from mysql_mcp.mysql_handler import MySQLHandler
+
+    settings = dataclasses.replace(Settings.from_env(), safety_cache_size=0)
+    lexer = MySQLHandler(dataclasses.replace(settings, sql_parser='lexer'))
+    ast = MySQLHandler(dataclasses.replace(settings, sql_parser='sqlparse'))
+    return lexer, ast
+
+
+def run_corpus(lexer, ast) -> dict:
+    """逐条比较两种引擎的判定，返回不一致的查询"""
+    mismatches = []
+    for query in CORPUS:
+        expected = ast.check_query(query)
+        actual = lexer.check_query(query)
+        if actual != expected:
+            mismatches.append({"query": query, "lexer": actual, "sqlparse": expected})
+
+    divergences = []
+    for query in KNOWN_DIVERGENCES:
+        (lexer_safe, _), _ = lexer.check_query(query)
+        (ast_safe, _), _ = ast.check_query(query)
+        if lexer_safe or not ast_safe:
+            divergences.append({"query": query, "lexer_safe": lexer_safe, "sqlparse_safe": ast_safe})
+
+    return {
+        "queries": len(CORPUS),
+        "mismatches": mismatches,
+        "known_divergences": len(KNOWN_DIVERGENCES),
+        "unexpected_divergences": divergences,
+    }
+
+
+def _generated_query(size_kb: int) -> str:
+    """生成约size_kb大小的长SELECT：大IN列表加宽CASE表达式"""
+    target = size_kb * 1024
+    cases = []
+    values = []
+    i = 0
+    while sum(len(c) for c in cases) + sum(len(v) + 2 for v in values) < target:
+        cases.append(f"WHEN status = 'state_{i}' THEN {i}")
+        values.append(f"'item-{i}'")
+        values.append(str(i))
+        i += 1
+    return (
+        "SELECT id, CASE " + " ".join(cases) + " ELSE -1 END AS code "
+        "FROM orders WHERE sku IN (" + ", ".join(values) + ") ORDER BY id LIMIT 100"
+    )
+
+
+def _time_check(handler, query: str, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        handler.check_query(query)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_timing(lexer, ast, sizes, skip_sqlparse_above: int) -> list:
+    """在不同长度的查询上测量两种引擎的校验耗时（取最好值）"""
+    results = []
+    for size_kb in sizes:
+        query = _generated_query(size_kb)
+        row = {"size_kb": size_kb, "bytes": len(query)}
+        lexer_s = _time_check(lexer, query, repeat=5)
+        row["lexer_ms"] = lexer_s * 1000
+        row["lexer_us_per_kb"] = lexer_s * 1e6 / size_kb
+        if size_kb <= skip_sqlparse_above:
+            ast_s = _time_check(ast, query, repeat=1)
+            row["sqlparse_ms"] = ast_s * 1000
+            row["sqlparse_us_per_kb"] = ast_s * 1e6 / size_kb
+        results.append(row)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='1,10,100', help="生成查询的大小（KB），逗号分隔")
+    parser.add_argument('--skip-sqlparse-above', type=int, default=100,
+                        help="超过该大小（KB）时不再测量sqlparse")
+    args = parser.parse_args()
+
+    lexer, ast = _handlers()
+    corpus = run_corpus(lexer, ast)
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    timing = run_timing(lexer, ast, sizes, args.skip_sqlparse_above)
+    print(json.dumps({"corpus": corpus, "timing": timing}, indent=2, ensure_ascii=False))
+
+    if corpus["mismatches"] or corpus["unexpected_divergences"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
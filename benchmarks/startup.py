@@ -0,0 +1,90 @@
+"""启动耗时与每次工具调用固定开销的计时工具
+
+用法: python -m benchmarks.startup [--runs N] [--calls N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# 计时只解析配置，不会真正连接数据库
+_DUMMY_ENV = {
+    'MYSQL_HOST': '127.0.0.1:3306',
+    'MYSQL_USER': 'bench',
+    'MYSQL_PASSWORD': 'bench',
+    'MYSQL_DATABASE': 'bench',
+}
+
+
+def _subprocess_seconds(code: str, runs: int) -> float:
+    """在新进程中执行代码片段，返回其自报耗时的中位数"""
+    samples = []
+    for _ in range(runs):
+        out = subprocess.check_output([sys.executable, '-c', code], env={**os.environ, **_DUMMY_ENV})
+        samples.append(float(out.decode().strip()))
+    return statistics.median(samples)
+
+
+def measure_startup(runs: int) -> dict:
+    """冷启动：导入mysql_mcp与预热驱动的耗时"""
+    import_code = (
+        "import time; t=time.perf_counter(); import mysql_mcp; "
+        "print(time.perf_counter()-t)"
+    )
+    warm_code = (
+        "import time; import mysql_mcp; from mysql_mcp.mysql_handler import warm_imports; "
+        "t=time.perf_counter(); warm_imports(); print(time.perf_counter()-t)"
+    )
+    return {
+        "import_ms": _subprocess_seconds(import_code, runs) * 1000,
+        "warm_imports_ms": _subprocess_seconds(warm_code, runs) * 1000,
+    }
+
+
+def _per_call_us(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def measure_per_call(calls: int) -> dict:
+    """每次工具调用在访问数据库前的固定开销"""
+    for key, value in _DUMMY_ENV.items():
+        os.environ.setdefault(key, value)
+
+    import mysql_mcp
+    from mysql_mcp.config import Settings, detect_chinese_locale
+    from mysql_mcp.mysql_handler import MySQLHandler
+
+    def shared_path():
+        mysql_mcp._get_handler()
+        mysql_mcp._get_message("完成", "done")
+
+    def per_call_resolution():
+        # 旧实现每次调用的等价开销：重新解析环境变量并检测两次语言环境
+        MySQLHandler(Settings.from_env())
+        "完成" if detect_chinese_locale() else "done"
+
+    return {
+        "shared_settings_us": _per_call_us(shared_path, calls),
+        "per_call_resolution_us": _per_call_us(per_call_resolution, calls),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5, help="冷启动测量的进程数")
+    parser.add_argument('--calls', type=int, default=10000, help="固定开销测量的调用次数")
+    args = parser.parse_args()
+
+    result = {"startup": measure_startup(args.runs), "per_call": measure_per_call(args.calls)}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+"""mysql_mcp的可复现基准测试套件
+
+默认在进程内的aiomysql替身（benchmarks.fake_driver）上运行，延迟、行数与列类型可配置；
+加--mysql时改为连接MYSQL_*环境变量指定的本地mysqld（会重建其中的bench_items表，
+请使用专门的测试库）。测量四类指标：
+
+- validation: 安全检查与数据库上下文检查的吞吐（未命中/命中判定缓存）
+- convert/encode: 每种返回格式下每行的值转换与JSON编码耗时、每行输出字节数
+- tool: 通过FastMCP调用每个工具的端到端延迟（p50/p95/p99）
+- throughput: 不同并发客户端数下每个工具的吞吐
+
+结果以JSON输出（--output写入文件），每个指标带单位与优劣方向；--compare与之前的结果
+逐项比较，劣化超过--tolerance的指标会被列出，并以退出码1结束。
+
+用法: python -m benchmarks.suite [--rows N] [--columns SPEC] [--latency-ms X]
+                                 [--calls N] [--concurrency 1,8,32] [--mysql]
+                                 [--output FILE] [--compare BASELINE] [--tolerance 0.1]
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from benchmarks.fake_driver import DEFAULT_COLUMNS, TABLE, FakeServer, install
+from benchmarks.safety_corpus import CORPUS
+
+RESULT_VERSION = 1
+
+_DUMMY_ENV = {
+    'MYSQL_HOST': '127.0.0.1:3306',
+    'MYSQL_USER': 'bench',
+    'MYSQL_PASSWORD': 'bench',
+    'MYSQL_DATABASE': 'bench',
+}
+
+# 工具返回的错误响应（JSON错误对象或execute_query的文本错误）
+_ERROR_MARKERS = ('"status": "error"', '"status":"error"')
+_ERROR_PREFIXES = ('查询执行失败', '查询被拒绝', 'Query rejected', 'Query failed')
+
+
+class Metrics:
+    """扁平的指标表：名称 -> {value, unit, better}"""
+
+    def __init__(self) -> None:
+        self.values: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, name: str, value: float, unit: str, better: str = 'lower') -> None:
+        self.values[name] = {"value": value, "unit": unit, "better": better}
+
+
+def _percentile(samples: Sequence[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _best(fn: Callable[[], Any], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _failed(text: str) -> bool:
+    return any(marker in text for marker in _ERROR_MARKERS) or text.startswith(_ERROR_PREFIXES)
+
+
+def measure_validation(metrics: Metrics, repeat: int) -> None:
+    """默认安全模式下校验语料的吞吐"""
+    from mysql_mcp.config import get_settings
+    from mysql_mcp.mysql_handler import MySQLHandler
+
+    handler = MySQLHandler(dataclasses.replace(
+        get_settings(), allow_dangerous_operations=False, database='shop'
+    ))
+
+    def uncached():
+        for query in CORPUS:
+            handler._check_query_uncached(query)
+
+    def cached():
+        for query in CORPUS:
+            handler.check_query(query)
+
+    cached()
+    for name, fn in (('uncached', uncached), ('cached', cached)):
+        seconds = _best(fn, repeat)
+        metrics.add(f"validation.{name}.queries_per_s", len(CORPUS) / seconds, 'queries/s', 'higher')
+
+
+def measure_conversion(metrics: Metrics, server: FakeServer, repeat: int) -> None:
+    """每种返回格式的转换与编码耗时"""
+    from mysql_mcp import encoding
+    from mysql_mcp.config import get_settings
+    from mysql_mcp.mysql_handler import MySQLHandler
+
+    handler = MySQLHandler(dataclasses.replace(get_settings(), result_max_bytes=0, result_max_cell_length=0))
+    rows = server.rows
+    description = [column.description() for column in server.columns]
+    count = max(1, len(rows))
+    for fmt in encoding.RESULT_FORMATS:
+        def convert(fmt=fmt):
+            plan = handler._conversion_plan(description, rows)
+            data, _ = handler._convert_rows(plan, rows, result_format=fmt)
+            return {"columns": plan.columns, "data": data}
+
+        payload = convert()
+        metrics.add(f"convert.{fmt}.us_per_row", _best(convert, repeat) * 1e6 / count, 'us')
+        encoded = encoding.encode_json(payload)
+        metrics.add(
+            f"encode.{fmt}.us_per_row",
+            _best(lambda: encoding.encode_json(payload), repeat) * 1e6 / count, 'us',
+        )
+        metrics.add(f"encode.{fmt}.bytes_per_row", len(encoded.encode('utf-8')) / count, 'bytes')
+
+
+class Scenario:
+    """一个工具的调用参数；prepare在每次调用前生成参数（不计入延迟）"""
+
+    def __init__(self, args: Optional[Dict[str, Any]] = None, prepare: Optional[Callable[[], Awaitable[Dict[str, Any]]]] = None):
+        self.args = args or {}
+        self.prepare = prepare
+
+    async def arguments(self) -> Dict[str, Any]:
+        if self.prepare is not None:
+            return await self.prepare()
+        return self.args
+
+
+def build_scenarios(server: FakeServer, call: Callable[[str, Dict[str, Any]], Awaitable[str]]) -> Dict[str, Scenario]:
+    """每个工具的基准调用，工具列表变化时需要在这里补充"""
+    from mysql_mcp.converters import convert_value
+
+    columns = [column.name for column in server.columns]
+    bulk_rows = [
+        [convert_value(column.value(i)) for column in server.columns]
+        for i in range(len(server.rows), len(server.rows) + 200)
+    ]
+    for i, row in enumerate(bulk_rows):
+        row[0] = len(server.rows) + i
+
+    async def open_cursor() -> Dict[str, Any]:
+        text = await call('execute_query', {"query": f"SELECT * FROM {TABLE}", "page_size": 100})
+        return {"cursor_token": json.loads(text)["cursor"]["token"]}
+
+    return {
+        'list_databases': Scenario(),
+        'list_tables': Scenario(),
+        'describe_table': Scenario({"table_name": TABLE}),
+        'describe_schema': Scenario({"tables": [TABLE]}),
+        'execute_query': Scenario({"query": f"SELECT * FROM {TABLE} WHERE id >= 0"}),
+        'execute_queries': Scenario({"queries": [
+            f"SELECT COUNT(*) FROM {TABLE}",
+            f"SELECT * FROM {TABLE} WHERE id < 100",
+            f"SELECT id FROM {TABLE} WHERE id >= 0",
+        ]}),
+        'bulk_insert': Scenario({"table": TABLE, "columns": columns, "rows": bulk_rows, "upsert": True}),
+        'export_query': Scenario({"query": f"SELECT * FROM {TABLE}", "format": "ndjson"}),
+        'fetch_next_page': Scenario(prepare=open_cursor),
+        'close_cursor': Scenario(prepare=open_cursor),
+        'cache_stats': Scenario(),
+        'server_stats': Scenario(),
+        'slow_queries': Scenario(),
+    }
+
+
+async def measure_tools(metrics: Metrics, server: FakeServer, calls: int, concurrency: List[int]) -> None:
+    """逐个工具测量端到端延迟与并发吞吐"""
+    import mysql_mcp
+
+    async def call(name: str, args: Dict[str, Any]) -> str:
+        result = await mysql_mcp.mcp.call_tool(name, args)
+        return result.content[0].text
+
+    scenarios = build_scenarios(server, call)
+    tools = [tool.name for tool in await mysql_mcp.mcp.list_tools()]
+    missing = [name for name in tools if name not in scenarios]
+    if missing:
+        raise SystemExit(f"没有为这些工具配置基准调用: {', '.join(missing)}")
+
+    for name in tools:
+        scenario = scenarios[name]
+        samples: List[float] = []
+        errors = 0
+        for i in range(calls + 3):
+            args = await scenario.arguments()
+            start = time.perf_counter()
+            text = await call(name, args)
+            elapsed = time.perf_counter() - start
+            # 前三次调用用于预热（建立连接池、填充缓存），不计入
+            if i >= 3:
+                samples.append(elapsed)
+                errors += _failed(text)
+        for q in (0.5, 0.95, 0.99):
+            metrics.add(f"tool.{name}.p{int(q * 100)}_ms", _percentile(samples, q) * 1000, 'ms')
+        metrics.add(f"tool.{name}.errors", errors, 'calls')
+
+        for clients in concurrency:
+            remaining = calls
+            failures = 0
+
+            async def client() -> None:
+                nonlocal remaining, failures
+                while remaining > 0:
+                    remaining -= 1
+                    failures += _failed(await call(name, await scenario.arguments()))
+
+            start = time.perf_counter()
+            await asyncio.gather(*(client() for _ in range(clients)))
+            elapsed = time.perf_counter() - start
+            metrics.add(f"throughput.{name}.c{clients}.calls_per_s", calls / elapsed, 'calls/s', 'higher')
+            metrics.add(f"throughput.{name}.c{clients}.errors", failures, 'calls')
+
+
+async def seed_mysql(server: FakeServer) -> None:
+    """在真实MySQL中按列配置重建bench_items并写入生成的行"""
+    import aiomysql
+    from mysql_mcp.config import get_settings
+
+    settings = get_settings()
+    conn = await aiomysql.connect(
+        host=settings.host, port=settings.port, user=settings.user,
+        password=settings.password, db=settings.database, autocommit=True,
+    )
+    try:
+        definitions = ", ".join(
+            f"`{c.name}` {c.sql_type} {'NULL' if c.nullable else 'NOT NULL'}" for c in server.columns
+        )
+        names = ", ".join(f"`{c.name}`" for c in server.columns)
+        async with conn.cursor() as cursor:
+            await cursor.execute(f"DROP TABLE IF EXISTS `{TABLE}`")
+            await cursor.execute(f"CREATE TABLE `{TABLE}` ({definitions}, PRIMARY KEY (`id`))")
+            placeholders = ", ".join(['%s'] * len(server.columns))
+            await cursor.executemany(f"INSERT INTO `{TABLE}` ({names}) VALUES ({placeholders})", server.rows)
+    finally:
+        conn.close()
+
+
+async def _close() -> None:
+    from mysql_mcp.metrics import close_metrics
+    from mysql_mcp.pool import close_shared_pool
+    from mysql_mcp.slow_log import close_slow_log
+    from mysql_mcp.streaming import close_stream_registry
+
+    await close_slow_log()
+    await close_stream_registry()
+    await close_shared_pool()
+    await close_metrics()
+
+
+async def run_tools(metrics: Metrics, server: FakeServer, args: argparse.Namespace) -> None:
+    try:
+        if args.mysql:
+            await seed_mysql(server)
+            await measure_tools(metrics, server, args.calls, args.concurrency)
+        else:
+            with install(server):
+                await measure_tools(metrics, server, args.calls, args.concurrency)
+    finally:
+        await _close()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL)
+        return out.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _configure_env(args: argparse.Namespace, export_dir: str) -> None:
+    if not args.mysql:
+        for key, value in _DUMMY_ENV.items():
+            os.environ.setdefault(key, value)
+    # export_query写出的文件放在临时目录中，运行结束后删除
+    os.environ.setdefault('MYSQL_EXPORT_DIR', export_dir)
+    # bulk_insert需要危险模式；连接池与流式游标数要容纳最大并发客户端数
+    peak = max(args.concurrency)
+    os.environ.setdefault('MYSQL_ALLOW_DANGEROUS', 'true')
+    os.environ.setdefault('MYSQL_POOL_MAX_SIZE', str(max(10, peak * 2)))
+    os.environ.setdefault('MYSQL_STREAM_MAX_CURSORS', str(max(4, peak)))
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix='mysql-mcp-bench-') as export_dir:
+        _configure_env(args, export_dir)
+        return _run(args)
+
+
+def _run(args: argparse.Namespace) -> Dict[str, Any]:
+    from mysql_mcp import encoding
+
+    server = FakeServer(
+        database=os.environ['MYSQL_DATABASE'],
+        rows=args.rows,
+        columns=args.columns,
+        latency=args.latency_ms / 1000,
+        row_latency=args.row_latency_us / 1e6,
+    )
+    metrics = Metrics()
+    measure_validation(metrics, args.repeat)
+    measure_conversion(metrics, server, args.repeat)
+    asyncio.run(run_tools(metrics, server, args))
+    return {
+        "version": RESULT_VERSION,
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "encoder": encoding.ENCODER,
+        },
+        "config": {
+            "driver": "mysql" if args.mysql else "fake",
+            "rows": args.rows,
+            "columns": args.columns,
+            "latency_ms": args.latency_ms if not args.mysql else None,
+            "row_latency_us": args.row_latency_us if not args.mysql else None,
+            "calls": args.calls,
+            "concurrency": args.concurrency,
+        },
+        "metrics": metrics.values,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """逐项比较两次结果，返回每个共同指标的变化（regression表示劣化超过容差）"""
+    rows = []
+    for name, now in current["metrics"].items():
+        before = baseline["metrics"].get(name)
+        if before is None:
+            continue
+        old, new = before["value"], now["value"]
+        if old == 0:
+            change = 0.0 if new == 0 else float('inf')
+        else:
+            change = (new - old) / abs(old)
+        worse = change < -tolerance if now["better"] == 'higher' else change > tolerance
+        rows.append({"metric": name, "baseline": old, "current": new, "change": change, "regression": worse})
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000, help="bench_items的行数")
+    parser.add_argument('--columns', default=DEFAULT_COLUMNS, help="逗号分隔的列类型，类型后加?表示可为NULL")
+    parser.add_argument('--latency-ms', type=float, default=0.5, help="替身驱动每条语句的延迟（毫秒）")
+    parser.add_argument('--row-latency-us', type=float, default=0.0, help="替身驱动每行附加的延迟（微秒）")
+    parser.add_argument('--calls', type=int, default=200, help="每个工具的调用次数（延迟与每个并发级别的吞吐）")
+    parser.add_argument('--concurrency', default='1,8,32', help="并发客户端数，逗号分隔")
+    parser.add_argument('--repeat', type=int, default=5, help="校验与转换计时的重复次数（取最好值）")
+    parser.add_argument('--mysql', action='store_true', help="连接MYSQL_*指定的本地mysqld而不是替身驱动")
+    parser.add_argument('--output', help="将结果JSON写入该文件")
+    parser.add_argument('--compare', help="与之前保存的结果JSON比较")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="比较时允许的相对劣化（默认10%%）")
+    args = parser.parse_args()
+    args.concurrency = [int(n) for n in args.concurrency.split(',') if n.strip()]
+
+    result = run(args)
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("config") != result["config"]:
+            print("warning: baseline was recorded with a different configuration", file=sys.stderr)
+        rows = compare(baseline, result, args.tolerance)
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(
+                f"{row['metric']:<48} {row['baseline']:>12.4g} {row['current']:>12.4g} "
+                f"{row['change']:>+8.1%} {flag}",
+                file=sys.stderr,
+            )
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
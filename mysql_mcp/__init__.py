@@ -1,45 +1,114 @@
 #!/usr/bin/env python3
 
-import os
 import json
-import asyncio
-import locale
-from typing import List
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, Optional
 from fastmcp import FastMCP
+from .admission import AdmissionController, AdmissionRejected, get_admission_controller
+from .config import get_settings, is_chinese_locale
+from .metrics import close_metrics, configure_metrics, get_metrics, instrument, stage
 from .mysql_handler import MySQLHandler
-
-# 检测语言环境
-def _detect_chinese_locale() -> bool:
-    """检测是否为中文语言环境"""
-    try:
-        # 尝试获取系统语言环境
-        lang = locale.getdefaultlocale()[0]
-        if lang and ('zh' in lang.lower() or 'chinese' in lang.lower()):
-            return True
-        
-        # 检查环境变量
-        for env_var in ['LANG', 'LANGUAGE', 'LC_ALL', 'LC_MESSAGES']:
-            lang_env = os.getenv(env_var, '')
-            if lang_env and ('zh' in lang_env.lower() or 'chinese' in lang_env.lower()):
-                return True
-        
-        return False
-    except Exception:
-        return False
+from .pool import close_shared_pool
+from .replicas import close_replica_router
+from .slow_log import close_slow_log
+from .streaming import close_stream_registry
 
 def _get_message(zh_msg: str, en_msg: str) -> str:
-    """根据语言环境返回对应消息"""
-    return zh_msg if _detect_chinese_locale() else en_msg
+    """根据语言环境返回对应消息（语言环境在进程内只检测一次）"""
+    return zh_msg if is_chinese_locale() else en_msg
+
+_handler: Optional[MySQLHandler] = None
+
+def _get_handler() -> MySQLHandler:
+    """返回所有工具共享的处理器，配置变化（reload_settings）后自动重建
+
+    只重建处理器本身；连接池与各类缓存等共享对象保持首次创建时的配置，见reload_settings。
+    """
+    global _handler
+    settings = get_settings()
+    if _handler is None or _handler.settings is not settings:
+        _handler = MySQLHandler(settings)
+        configure_metrics(
+            settings.metrics_enabled,
+            settings.metrics_prometheus_file,
+            settings.metrics_dump_interval,
+        )
+    return _handler
+
+def _admission() -> Optional[AdmissionController]:
+    """进程内共享的准入控制器，MYSQL_MAX_CONCURRENT=0时不做准入控制"""
+    settings = get_settings()
+    if settings.max_concurrent <= 0:
+        return None
+    return get_admission_controller(
+        settings.max_concurrent,
+        settings.queue_size,
+        settings.queue_timeout,
+        settings.metadata_reserved_slots,
+    )
+
+@asynccontextmanager
+async def _admitted(lane: str) -> AsyncIterator[None]:
+    """在指定通道的执行槽位内访问MySQL"""
+    controller = _admission()
+    if controller is None:
+        yield
+        return
+    with stage('admission'):
+        await controller.acquire(lane)
+    try:
+        yield
+    finally:
+        controller.release(lane)
+
+def _rejected_result(e: AdmissionRejected) -> str:
+    """服务器繁忙、调用未被准入时的错误响应"""
+    if e.reason == 'queue_full':
+        message = _get_message(
+            "服务器繁忙：等待队列已满，请稍后重试",
+            "Server busy: the wait queue is full, retry later"
+        )
+    else:
+        message = _get_message(
+            f"服务器繁忙：排队 {e.waited:.1f} 秒后仍未获得执行槽位，请稍后重试",
+            f"Server busy: no execution slot after waiting {e.waited:.1f}s, retry later"
+        )
+    error_result = {
+        "status": "error",
+        "message": message,
+        "reason": e.reason,
+        "lane": e.lane,
+    }
+    return json.dumps(error_result, ensure_ascii=False)
+
+@asynccontextmanager
+async def _lifespan(server: FastMCP):
+    """服务器生命周期：启动时按配置启用统计，关闭时释放流式游标与共享连接池"""
+    try:
+        _get_handler()
+    except ValueError:
+        # 配置错误在首次工具调用时以错误响应报告
+        pass
+    try:
+        yield
+    finally:
+        await close_slow_log()
+        await close_stream_registry()
+        await close_replica_router()
+        await close_shared_pool()
+        await close_metrics()
 
 # 创建FastMCP应用
-mcp = FastMCP("MySQL Database Server")
+mcp = FastMCP("MySQL Database Server", lifespan=_lifespan)
 
 @mcp.tool()
+@instrument('list_databases')
 async def list_databases() -> str:
     """列出MySQL实例中的所有数据库"""
-    handler = MySQLHandler()
+    handler = _get_handler()
     try:
-        databases = await handler.list_databases()
+        async with _admitted('metadata'):
+            databases = await handler.list_databases()
         message = _get_message(
             f"找到 {len(databases)} 个数据库",
             f"Found {len(databases)} database(s)"
@@ -50,6 +119,8 @@ async def list_databases() -> str:
             "databases": databases
         }
         return json.dumps(result, ensure_ascii=False)
+    except AdmissionRejected as e:
+        return _rejected_result(e)
     except Exception as e:
         message = _get_message(
             f"获取数据库列表失败: {str(e)}",
@@ -62,11 +133,13 @@ async def list_databases() -> str:
         return json.dumps(error_result, ensure_ascii=False)
 
 @mcp.tool()
+@instrument('list_tables')
 async def list_tables() -> str:
     """列出当前数据库中的所有表"""
-    handler = MySQLHandler()
+    handler = _get_handler()
     try:
-        tables = await handler.list_tables()
+        async with _admitted('metadata'):
+            tables = await handler.list_tables()
         message = _get_message(
             f"找到 {len(tables)} 个表",
             f"Found {len(tables)} table(s)"
@@ -77,6 +150,8 @@ async def list_tables() -> str:
             "tables": tables
         }
         return json.dumps(result, ensure_ascii=False)
+    except AdmissionRejected as e:
+        return _rejected_result(e)
     except Exception as e:
         message = _get_message(
             f"获取表列表失败: {str(e)}",
@@ -89,16 +164,20 @@ async def list_tables() -> str:
         return json.dumps(error_result, ensure_ascii=False)
 
 @mcp.tool()
+@instrument('describe_table')
 async def describe_table(table_name: str) -> str:
     """描述指定表的结构信息
     
     Args:
         table_name: 要描述的表名
     """
-    handler = MySQLHandler()
+    handler = _get_handler()
     try:
-        result = await handler.describe_table(table_name)
+        async with _admitted('metadata'):
+            result = await handler.describe_table(table_name)
         return result
+    except AdmissionRejected as e:
+        return _rejected_result(e)
     except Exception as e:
         message = _get_message(
             f"描述表 '{table_name}' 失败: {str(e)}",
@@ -111,16 +190,56 @@ async def describe_table(table_name: str) -> str:
         return json.dumps(error_result, ensure_ascii=False)
 
 @mcp.tool()
-async def execute_query(query: str) -> str:
+@instrument('describe_schema')
+async def describe_schema(tables: Optional[List[str]] = None) -> str:
+    """一次性获取当前数据库中全部表（或指定表）的字段、主键、索引和估算行数
+    
+    Args:
+        tables: 要描述的表名列表，省略时返回所有表
+    """
+    handler = _get_handler()
+    try:
+        async with _admitted('metadata'):
+            result = await handler.schema_snapshot(tables)
+        return result
+    except AdmissionRejected as e:
+        return _rejected_result(e)
+    except Exception as e:
+        message = _get_message(
+            f"获取数据库结构失败: {str(e)}",
+            f"Failed to describe schema: {str(e)}"
+        )
+        error_result = {
+            "status": "error",
+            "message": message
+        }
+        return json.dumps(error_result, ensure_ascii=False)
+
+@mcp.tool()
+@instrument('execute_query')
+async def execute_query(
+    query: str, page_size: Optional[int] = None, format: Optional[str] = None, summarize: bool = False
+) -> str:
     """执行SQL查询（默认仅支持SELECT查询，可通过环境变量启用更多操作）
     
     Args:
         query: 要执行的SQL查询语句
+        page_size: 指定时以服务端游标分页返回读查询结果，结果未读完时返回cursor.token，
+            用fetch_next_page继续读取
+        format: 结果格式，objects（默认，每行一个对象）、rows（每行一个值数组）
+            或columnar（每列一个值数组），后两种不重复列名，结果更紧凑
+        summarize: 为true时读取全部结果，只返回每列的计数、NULL数、最小/最大值、均值/方差、
+            近似不同值数与高频值，以及少量抽样行（按format组织）
     """
-    handler = MySQLHandler()
+    handler = _get_handler()
     try:
-        result = await handler.execute_query(query)
+        async with _admitted('query'):
+            result = await handler.execute_query(
+                query, page_size=page_size, result_format=format, summarize=summarize
+            )
         return result
+    except AdmissionRejected as e:
+        return _rejected_result(e)
     except Exception as e:
         message = _get_message(
             f"执行查询失败: {str(e)}",
@@ -132,4 +251,228 @@ async def execute_query(query: str) -> str:
         }
         return json.dumps(error_result, ensure_ascii=False)
 
+@mcp.tool()
+@instrument('execute_queries')
+async def execute_queries(queries: List[str], format: Optional[str] = None) -> str:
+    """并发执行多条互不依赖的只读查询（如多个聚合统计），按输入顺序返回每条查询的结果
+    
+    Args:
+        queries: SQL查询列表，每条单独做安全检查，结果格式与execute_query相同
+        format: 结果格式，objects（默认）、rows或columnar
+    """
+    handler = _get_handler()
+    try:
+        # 每条查询在执行时各自取得query通道的槽位
+        result = await handler.execute_queries(queries, result_format=format, admit=_admitted)
+        return result
+    except Exception as e:
+        message = _get_message(
+            f"批量执行查询失败: {str(e)}",
+            f"Failed to execute queries: {str(e)}"
+        )
+        error_result = {
+            "status": "error",
+            "message": message
+        }
+        return json.dumps(error_result, ensure_ascii=False)
+
+@mcp.tool()
+@instrument('bulk_insert')
+async def bulk_insert(table: str, columns: List[str], rows: List[List[Any]], upsert: bool = False) -> str:
+    """批量插入多行数据（需启用危险操作），按参数绑定打包为多行INSERT并分批提交
+    
+    Args:
+        table: 目标表名
+        columns: 列名列表
+        rows: 行数据，每行是与columns一一对应的值数组
+        upsert: 为true时主键或唯一键冲突的行改为更新（ON DUPLICATE KEY UPDATE）
+    """
+    handler = _get_handler()
+    try:
+        async with _admitted('query'):
+            result = await handler.bulk_insert(table, columns, rows, upsert=upsert)
+        return result
+    except AdmissionRejected as e:
+        return _rejected_result(e)
+    except Exception as e:
+        message = _get_message(
+            f"批量写入失败: {str(e)}",
+            f"Failed to bulk insert: {str(e)}"
+        )
+        error_result = {
+            "status": "error",
+            "message": message
+        }
+        return json.dumps(error_result, ensure_ascii=False)
+
+@mcp.tool()
+@instrument('export_query')
+async def export_query(
+    query: str, file_name: Optional[str] = None, format: str = 'ndjson', compress: bool = False
+) -> str:
+    """将只读查询的完整结果流式写入服务器本地文件（MYSQL_EXPORT_DIR下），返回路径、行数与列信息
+    
+    Args:
+        query: 要导出的只读SQL查询
+        file_name: 文件名（只能包含字母、数字、点、下划线与连字符），省略时自动生成；扩展名自动补全
+        format: ndjson（每行一个JSON对象，默认）或csv（首行为列名）
+        compress: 为true时以gzip压缩写入
+    """
+    handler = _get_handler()
+    try:
+        async with _admitted('query'):
+            result = await handler.export_query(query, file_name, export_format=format, compress=compress)
+        return result
+    except AdmissionRejected as e:
+        return _rejected_result(e)
+    except Exception as e:
+        message = _get_message(
+            f"导出失败: {str(e)}",
+            f"Failed to export: {str(e)}"
+        )
+        error_result = {
+            "status": "error",
+            "message": message
+        }
+        return json.dumps(error_result, ensure_ascii=False)
+
+@mcp.tool()
+@instrument('fetch_next_page')
+async def fetch_next_page(cursor_token: str, page_size: Optional[int] = None) -> str:
+    """读取流式游标的下一页结果
+    
+    Args:
+        cursor_token: execute_query或上一次fetch_next_page返回的cursor.token
+        page_size: 本页最多返回的行数
+    """
+    handler = _get_handler()
+    try:
+        async with _admitted('query'):
+            result = await handler.fetch_page(cursor_token, page_size=page_size)
+        return result
+    except AdmissionRejected as e:
+        return _rejected_result(e)
+    except Exception as e:
+        message = _get_message(
+            f"读取下一页失败: {str(e)}",
+            f"Failed to fetch next page: {str(e)}"
+        )
+        error_result = {
+            "status": "error",
+            "message": message
+        }
+        return json.dumps(error_result, ensure_ascii=False)
+
+@mcp.tool()
+@instrument('close_cursor')
+async def close_cursor(cursor_token: str) -> str:
+    """关闭不再需要的流式游标，立即归还其占用的连接
+    
+    Args:
+        cursor_token: 要关闭的cursor.token
+    """
+    handler = _get_handler()
+    try:
+        closed = await handler.close_cursor(cursor_token)
+        message = _get_message(
+            "游标已关闭" if closed else "游标不存在或已关闭",
+            "Cursor closed" if closed else "Cursor not found or already closed"
+        )
+        return json.dumps({"status": "success", "message": message, "closed": closed}, ensure_ascii=False)
+    except Exception as e:
+        message = _get_message(
+            f"关闭游标失败: {str(e)}",
+            f"Failed to close cursor: {str(e)}"
+        )
+        error_result = {
+            "status": "error",
+            "message": message
+        }
+        return json.dumps(error_result, ensure_ascii=False)
+
+@mcp.tool()
+async def cache_stats() -> str:
+    """查看安全检查判定缓存、表结构元数据缓存与查询结果缓存的统计信息（大小、命中、失效次数）"""
+    handler = _get_handler()
+    try:
+        result = {"status": "success", **handler.cache_stats()}
+        return json.dumps(result, ensure_ascii=False)
+    except Exception as e:
+        message = _get_message(
+            f"获取缓存统计失败: {str(e)}",
+            f"Failed to get cache stats: {str(e)}"
+        )
+        error_result = {
+            "status": "error",
+            "message": message
+        }
+        return json.dumps(error_result, ensure_ascii=False)
+
+@mcp.tool()
+async def server_stats() -> str:
+    """查看各工具分阶段的耗时分位数（p50/p95/p99）与行数、字节数、错误数，
+    以及连接池、流式游标、准入控制（并发数、排队深度、等待时间）、只读副本（健康状态、复制延迟）
+    与成本闸门（检查、拒绝与加LIMIT的查询数）的运行状态"""
+    handler = _get_handler()
+    try:
+        controller = _admission()
+        metrics = get_metrics()
+        router = handler.replicas
+        gate = handler.cost_gate
+        result = {
+            "status": "success",
+            "metrics": metrics.snapshot() if metrics is not None else {"enabled": False},
+            "pool": handler.pool.stats(),
+            "streams": handler.streams.stats(),
+            "admission": controller.stats() if controller is not None else {"enabled": False},
+            "replicas": router.stats() if router is not None else {"enabled": False},
+            "cost_gate": gate.stats() if gate is not None else {"enabled": False},
+        }
+        return json.dumps(result, ensure_ascii=False)
+    except Exception as e:
+        message = _get_message(
+            f"获取服务器状态失败: {str(e)}",
+            f"Failed to get server stats: {str(e)}"
+        )
+        error_result = {
+            "status": "error",
+            "message": message
+        }
+        return json.dumps(error_result, ensure_ascii=False)
+
+@mcp.tool()
+async def slow_queries(limit: int = 20, include_plans: bool = False) -> str:
+    """查看慢查询日志：按查询摘要聚合的次数、累计/平均/最大耗时、行数与字节数，
+    以及自动采集的EXPLAIN执行计划摘要（访问方式、使用的索引、全表扫描的表），用于发现缺失的索引
+    
+    Args:
+        limit: 返回累计耗时最高的摘要数与最近的慢查询记录数（默认20）
+        include_plans: 是否附带完整的EXPLAIN FORMAT=JSON执行计划（默认False）
+    """
+    handler = _get_handler()
+    try:
+        slow_log = handler.slow_log
+        if slow_log is None:
+            result = {
+                "status": "success",
+                "message": _get_message(
+                    "慢查询日志未启用（MYSQL_SLOW_QUERY_MS=0）",
+                    "Slow query log is disabled (MYSQL_SLOW_QUERY_MS=0)"
+                ),
+                "enabled": False,
+            }
+        else:
+            result = {"status": "success", **slow_log.snapshot(limit, include_plans)}
+        return json.dumps(result, ensure_ascii=False, default=str)
+    except Exception as e:
+        message = _get_message(
+            f"获取慢查询日志失败: {str(e)}",
+            f"Failed to get slow query log: {str(e)}"
+        )
+        error_result = {
+            "status": "error",
+            "message": message
+        }
+        return json.dumps(error_result, ensure_ascii=False)
+
 # FastMCP服务器已配置，可通过mcp.run()启动
\ No newline at end of file
@@ -1,16 +1,52 @@
 #!/usr/bin/env python3
 """MySQL MCP Server 主入口点"""
 
+import argparse
 import sys
 import os
 
+def parse_args(argv=None) -> argparse.Namespace:
+    """命令行参数，未指定时读取对应的环境变量"""
+    parser = argparse.ArgumentParser(prog="mysql-python-mcp", description="MySQL MCP Server")
+    parser.add_argument('--transport', choices=('stdio', 'http'), default=os.getenv('MYSQL_MCP_TRANSPORT', 'stdio'),
+                        help="stdio（默认，每个客户端一个进程）或http（多客户端共享的长期服务）")
+    parser.add_argument('--host', help="HTTP监听地址（MYSQL_HTTP_HOST，默认127.0.0.1）")
+    parser.add_argument('--port', type=int, help="HTTP监听端口（MYSQL_HTTP_PORT，默认8000）")
+    parser.add_argument('--workers', type=int, help="HTTP工作进程数（MYSQL_HTTP_WORKERS，默认1）")
+    parser.add_argument('--path', help="MCP端点路径（MYSQL_HTTP_PATH，默认/mcp）")
+    parser.add_argument('--drain-timeout', type=float, help="关闭时等待进行中请求的秒数（MYSQL_HTTP_DRAIN_TIMEOUT，默认30）")
+    return parser.parse_args(argv)
+
 def main():
     """主入口函数"""
+    args = parse_args()
     try:
+        if args.transport == 'http':
+            # 命令行参数写回环境变量：工作进程中的应用工厂从环境变量读取配置
+            for name, value in (
+                ('MYSQL_HTTP_HOST', args.host),
+                ('MYSQL_HTTP_PORT', args.port),
+                ('MYSQL_HTTP_WORKERS', args.workers),
+                ('MYSQL_HTTP_PATH', args.path),
+                ('MYSQL_HTTP_DRAIN_TIMEOUT', args.drain_timeout),
+            ):
+                if value is not None:
+                    os.environ[name] = str(value)
+            print("Starting MySQL FastMCP Server (HTTP)...", file=sys.stderr)
+            from .http_server import run_http
+            run_http()
+            return
+        
         print("Starting MySQL FastMCP Server...", file=sys.stderr)
         
         # 导入并运行FastMCP应用
         from . import mcp
+        from .config import is_chinese_locale
+        from .mysql_handler import warm_imports
+        
+        # 启动时预热：检测语言环境并导入数据库驱动，首次工具调用不再承担这部分开销
+        is_chinese_locale()
+        warm_imports()
         mcp.run()
         
     except KeyboardInterrupt:
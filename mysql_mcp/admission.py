@@ -0,0 +1,164 @@
+"""工具调用的准入控制
+
+所有访问MySQL的工具调用在执行前都要取得一个执行槽位。槽位总数受max_concurrent限制，
+超出时按通道排队：队列已满时立即拒绝，排队超过queue_timeout时超时拒绝。
+metadata通道（列库、列表、表结构）始终保留reserved_metadata个槽位，
+不会因为大量慢查询占满槽位而饿死；query通道最多使用其余的槽位。
+"""
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+# 唤醒排队请求时的通道优先级：元数据调用开销小，优先放行
+LANES = ('metadata', 'query')
+
+
+class AdmissionRejected(Exception):
+    """调用未被准入：reason为queue_full（队列已满）或timeout（排队超时）"""
+
+    def __init__(self, lane: str, reason: str, waited: float = 0.0):
+        super().__init__(f"{lane} lane {reason}")
+        self.lane = lane
+        self.reason = reason
+        self.waited = waited
+
+
+class _Lane:
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.active = 0
+        self.waiters: Deque["asyncio.Future[None]"] = deque()
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "limit": self.limit,
+            "queue_depth": len(self.waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_ms": self.wait_total * 1000 / self.queued if self.queued else 0.0,
+            "max_wait_ms": self.wait_max * 1000,
+        }
+
+
+class AdmissionController:
+    """带通道的全局并发限制
+
+    Args:
+        max_concurrent: 同时执行的工具调用总数上限
+        queue_size: 每个通道最多排队的调用数（0表示饱和时直接拒绝）
+        queue_timeout: 排队等待的最长秒数
+        reserved_metadata: 为metadata通道保留的槽位数
+    """
+
+    def __init__(self, max_concurrent: int, queue_size: int, queue_timeout: float, reserved_metadata: int = 1):
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._lanes = {
+            'metadata': _Lane('metadata', max_concurrent),
+            'query': _Lane('query', max_concurrent - reserved_metadata),
+        }
+
+    def _can_run(self, lane: _Lane) -> bool:
+        return self.active < self.max_concurrent and lane.active < lane.limit
+
+    def _grant(self, lane: _Lane) -> None:
+        self.active += 1
+        lane.active += 1
+        lane.admitted += 1
+
+    async def acquire(self, lane_name: str) -> None:
+        """取得一个执行槽位，未被准入时抛出AdmissionRejected"""
+        lane = self._lanes[lane_name]
+        # 已有排队者时不插队
+        if not lane.waiters and self._can_run(lane):
+            self._grant(lane)
+            return
+        if len(lane.waiters) >= self.queue_size:
+            lane.rejected += 1
+            raise AdmissionRejected(lane.name, 'queue_full')
+
+        loop = asyncio.get_running_loop()
+        waiter: "asyncio.Future[None]" = loop.create_future()
+        lane.waiters.append(waiter)
+        lane.queued += 1
+        start = loop.time()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # 超时或取消的同时已被分配了槽位：交还给下一个排队者
+                self.release(lane_name)
+            else:
+                waiter.cancel()
+                try:
+                    lane.waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                lane.timed_out += 1
+                raise AdmissionRejected(lane.name, 'timeout', loop.time() - start) from None
+            raise
+        finally:
+            waited = loop.time() - start
+            lane.wait_total += waited
+            lane.wait_max = max(lane.wait_max, waited)
+
+    def release(self, lane_name: str) -> None:
+        """归还槽位并按通道优先级唤醒排队者（槽位直接移交，不会被新来的调用抢走）"""
+        lane = self._lanes[lane_name]
+        self.active -= 1
+        lane.active -= 1
+        for name in LANES:
+            waiting = self._lanes[name]
+            while waiting.waiters and self._can_run(waiting):
+                waiter = waiting.waiters.popleft()
+                if waiter.done():
+                    continue
+                self._grant(waiting)
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, lane_name: str) -> AsyncIterator[None]:
+        """在槽位内执行一次工具调用"""
+        await self.acquire(lane_name)
+        try:
+            yield
+        finally:
+            self.release(lane_name)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回全局与各通道的并发、排队深度与等待时间"""
+        return {
+            "active": self.active,
+            "max_concurrent": self.max_concurrent,
+            "queue_size": self.queue_size,
+            "queue_timeout": self.queue_timeout,
+            "lanes": {name: lane.stats() for name, lane in self._lanes.items()},
+        }
+
+
+_shared_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller(
+    max_concurrent: int, queue_size: int, queue_timeout: float, reserved_metadata: int = 1
+) -> AdmissionController:
+    """获取进程内共享的准入控制器，首次调用时按给定参数创建"""
+    global _shared_controller
+    if _shared_controller is None:
+        _shared_controller = AdmissionController(max_concurrent, queue_size, queue_timeout, reserved_metadata)
+    return _shared_controller
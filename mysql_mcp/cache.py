@@ -0,0 +1,105 @@
+"""进程内缓存"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar('V')
+
+
+class LRUCache(Generic[V]):
+    """容量有界的LRU缓存，带命中/未命中计数
+
+    policy用于描述缓存内容所依赖的配置，调用ensure_policy时若配置发生变化则清空缓存。
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.policy: Optional[Hashable] = None
+        self._data: "OrderedDict[Hashable, V]" = OrderedDict()
+
+    def ensure_policy(self, policy: Hashable) -> None:
+        """配置变化时清空缓存"""
+        if policy != self.policy:
+            self.clear()
+            self.policy = policy
+
+    def get(self, key: Hashable) -> Optional[V]:
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: V) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存状态"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class TTLCache(LRUCache[V]):
+    """带过期时间的LRU缓存，条目写入ttl秒后失效（ttl<=0时不缓存）"""
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        super().__init__(maxsize if ttl > 0 else 0)
+        self.ttl = ttl
+        self.invalidations = 0
+        self._clock = clock
+        self._expires: Dict[Hashable, float] = {}
+
+    def get(self, key: Hashable) -> Optional[V]:
+        expires = self._expires.get(key)
+        if expires is not None and self._clock() >= expires:
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return super().get(key)
+
+    def put(self, key: Hashable, value: V) -> None:
+        if self.maxsize <= 0:
+            return
+        if key not in self._data and len(self._data) >= self.maxsize:
+            # 父类将按LRU淘汰最旧的条目
+            self._expires.pop(next(iter(self._data)), None)
+        super().put(key, value)
+        self._expires[key] = self._clock() + self.ttl
+
+    def invalidate(self) -> None:
+        """显式失效全部条目（例如执行了DDL）"""
+        if self._data:
+            self.invalidations += 1
+        self.clear()
+
+    def clear(self) -> None:
+        super().clear()
+        self._expires.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["ttl"] = self.ttl
+        stats["invalidations"] = self.invalidations
+        return stats
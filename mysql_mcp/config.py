@@ -0,0 +1,266 @@
+"""服务器配置：启动时一次性解析环境变量与语言环境"""
+
+import locale
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+def detect_chinese_locale() -> bool:
+    """检测是否为中文语言环境"""
+    try:
+        # 尝试获取系统语言环境
+        lang = locale.getdefaultlocale()[0]
+        if lang and ('zh' in lang.lower() or 'chinese' in lang.lower()):
+            return True
+
+        # 检查环境变量
+        for env_var in ['LANG', 'LANGUAGE', 'LC_ALL', 'LC_MESSAGES']:
+            lang_env = os.getenv(env_var, '')
+            if lang_env and ('zh' in lang_env.lower() or 'chinese' in lang_env.lower()):
+                return True
+
+        return False
+    except Exception:
+        # 如果检测失败，默认使用英文
+        return False
+
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() == 'true'
+
+
+def _parse_hosts(value: str) -> Tuple[Tuple[str, int], ...]:
+    """解析逗号分隔的host[:port]列表，端口默认3306"""
+    hosts = []
+    for item in value.split(','):
+        item = item.strip()
+        if item:
+            host, _, port = item.partition(':')
+            hosts.append((host, int(port) if port else 3306))
+    return tuple(hosts)
+
+
+@dataclass(frozen=True)
+class Settings:
+    """不可变的服务器配置，所有工具共享同一实例"""
+
+    host: str
+    port: int
+    user: str
+    password: str
+    database: str
+    allow_dangerous_operations: bool
+    is_chinese: bool
+    pool_min_size: int = 1
+    pool_max_size: int = 10
+    pool_recycle: int = 3600
+    pool_pre_ping: bool = True
+    safety_cache_size: int = 1024
+    sql_parser: str = 'lexer'
+    stream_max_page_size: int = 1000
+    stream_idle_ttl: float = 60.0
+    stream_max_cursors: int = 4
+    result_max_rows: int = 1000
+    result_max_bytes: int = 1048576
+    result_max_cell_length: int = 4096
+    decimal_as_string: bool = False
+    metadata_cache_ttl: float = 60.0
+    metadata_cache_size: int = 512
+    metadata_cache_validate: bool = False
+    result_cache_bytes: int = 0
+    result_cache_ttl: float = 30.0
+    query_timeout: float = 30.0
+    max_concurrent: int = 10
+    queue_size: int = 64
+    queue_timeout: float = 10.0
+    metadata_reserved_slots: int = 1
+    batch_fanout: int = 4
+    batch_max_queries: int = 50
+    bulk_commit_rows: int = 10000
+    bulk_max_rows: int = 100000
+    bulk_max_statement_bytes: int = 4194304
+    metrics_enabled: bool = True
+    metrics_prometheus_file: str = ''
+    metrics_dump_interval: float = 15.0
+    slow_query_ms: float = 1000.0
+    slow_log_size: int = 100
+    slow_log_file: str = ''
+    slow_log_explain: bool = True
+    replicas: Tuple[Tuple[str, int], ...] = ()
+    replica_max_lag: float = 5.0
+    replica_check_interval: float = 5.0
+    export_dir: str = ''
+    export_chunk_rows: int = 5000
+    export_max_rows: int = 0
+    export_timeout: float = 600.0
+    summary_top_k: int = 5
+    summary_sample_rows: int = 5
+    cost_gate: str = 'off'
+    cost_gate_max_rows: int = 1000000
+    cost_gate_full_scan_rows: int = 100000
+    cost_gate_limit: int = 1000
+    cost_gate_cache_ttl: float = 300.0
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """从环境变量读取配置，缺少必填项时抛出ValueError"""
+        mysql_host = os.getenv('MYSQL_HOST')
+        if not mysql_host:
+            raise ValueError("MYSQL_HOST环境变量未设置")
+
+        if ':' in mysql_host:
+            host, port_str = mysql_host.split(':', 1)
+            port = int(port_str)
+        else:
+            host = mysql_host
+            port = 3306
+
+        user = os.getenv('MYSQL_USER')
+        if not user:
+            raise ValueError("MYSQL_USER环境变量未设置")
+
+        password = os.getenv('MYSQL_PASSWORD')
+        if not password:
+            raise ValueError("MYSQL_PASSWORD环境变量未设置")
+
+        database = os.getenv('MYSQL_DATABASE')
+        if not database:
+            raise ValueError("MYSQL_DATABASE环境变量未设置")
+
+        # 连接池配置
+        pool_min_size = int(os.getenv('MYSQL_POOL_MIN_SIZE', '1'))
+        pool_max_size = int(os.getenv('MYSQL_POOL_MAX_SIZE', '10'))
+        if pool_min_size < 0 or pool_max_size < 1 or pool_min_size > pool_max_size:
+            raise ValueError("MYSQL_POOL_MIN_SIZE/MYSQL_POOL_MAX_SIZE配置无效")
+
+        # SQL安全检查引擎：lexer（单遍词法分析，默认）或 sqlparse（AST）
+        sql_parser = os.getenv('MYSQL_SQL_PARSER', 'lexer').lower()
+        if sql_parser not in ('lexer', 'sqlparse'):
+            raise ValueError("MYSQL_SQL_PARSER只能为lexer或sqlparse")
+
+        query_timeout = float(os.getenv('MYSQL_QUERY_TIMEOUT', '30'))
+        if query_timeout < 0:
+            raise ValueError("MYSQL_QUERY_TIMEOUT不能为负数")
+
+        # 流式游标：每个打开的游标独占一个连接，必须给普通查询留出连接；
+        # 未显式设置时默认值随小连接池收缩（连接池只有1个连接时不允许流式游标）
+        stream_max_cursors_env = os.getenv('MYSQL_STREAM_MAX_CURSORS')
+        if stream_max_cursors_env is None:
+            stream_max_cursors = min(4, pool_max_size - 1)
+        else:
+            stream_max_cursors = int(stream_max_cursors_env)
+            if stream_max_cursors < 0 or stream_max_cursors >= pool_max_size:
+                raise ValueError("MYSQL_STREAM_MAX_CURSORS必须小于MYSQL_POOL_MAX_SIZE")
+
+        # 准入控制：默认并发上限与连接池大小一致，0表示不限制
+        max_concurrent = int(os.getenv('MYSQL_MAX_CONCURRENT', str(pool_max_size)))
+        if max_concurrent < 0:
+            raise ValueError("MYSQL_MAX_CONCURRENT不能为负数")
+        # 未显式设置时默认保留1个槽位，并发上限只有1时不保留
+        metadata_reserved_env = os.getenv('MYSQL_METADATA_RESERVED_SLOTS')
+        if metadata_reserved_env is None:
+            metadata_reserved_slots = max(0, min(1, max_concurrent - 1))
+        else:
+            metadata_reserved_slots = int(metadata_reserved_env)
+            if max_concurrent > 0 and not 0 <= metadata_reserved_slots < max_concurrent:
+                raise ValueError("MYSQL_METADATA_RESERVED_SLOTS必须小于MYSQL_MAX_CONCURRENT")
+
+        # 执行前的EXPLAIN成本闸门：off（默认）、reject或limit
+        cost_gate = os.getenv('MYSQL_COST_GATE', 'off').lower()
+        if cost_gate not in ('off', 'reject', 'limit'):
+            raise ValueError("MYSQL_COST_GATE只能为off、reject或limit")
+
+        return cls(
+            host=host,
+            port=port,
+            user=user,
+            password=password,
+            database=database,
+            allow_dangerous_operations=_env_bool('MYSQL_ALLOW_DANGEROUS', 'false'),
+            is_chinese=is_chinese_locale(),
+            pool_min_size=pool_min_size,
+            pool_max_size=pool_max_size,
+            pool_recycle=int(os.getenv('MYSQL_POOL_RECYCLE', '3600')),
+            pool_pre_ping=_env_bool('MYSQL_POOL_PRE_PING', 'true'),
+            safety_cache_size=int(os.getenv('MYSQL_SAFETY_CACHE_SIZE', '1024')),
+            sql_parser=sql_parser,
+            stream_max_page_size=int(os.getenv('MYSQL_STREAM_MAX_PAGE_SIZE', '1000')),
+            stream_idle_ttl=float(os.getenv('MYSQL_STREAM_IDLE_TTL', '60')),
+            stream_max_cursors=stream_max_cursors,
+            result_max_rows=int(os.getenv('MYSQL_RESULT_MAX_ROWS', '1000')),
+            result_max_bytes=int(os.getenv('MYSQL_RESULT_MAX_BYTES', '1048576')),
+            result_max_cell_length=int(os.getenv('MYSQL_RESULT_MAX_CELL_LENGTH', '4096')),
+            decimal_as_string=_env_bool('MYSQL_DECIMAL_AS_STRING', 'false'),
+            metadata_cache_ttl=float(os.getenv('MYSQL_METADATA_CACHE_TTL', '60')),
+            metadata_cache_size=int(os.getenv('MYSQL_METADATA_CACHE_SIZE', '512')),
+            metadata_cache_validate=_env_bool('MYSQL_METADATA_CACHE_VALIDATE', 'false'),
+            result_cache_bytes=int(os.getenv('MYSQL_RESULT_CACHE_BYTES', '0')),
+            result_cache_ttl=float(os.getenv('MYSQL_RESULT_CACHE_TTL', '30')),
+            query_timeout=query_timeout,
+            max_concurrent=max_concurrent,
+            queue_size=int(os.getenv('MYSQL_QUEUE_SIZE', '64')),
+            queue_timeout=float(os.getenv('MYSQL_QUEUE_TIMEOUT', '10')),
+            metadata_reserved_slots=metadata_reserved_slots,
+            batch_fanout=int(os.getenv('MYSQL_BATCH_FANOUT', '4')),
+            batch_max_queries=int(os.getenv('MYSQL_BATCH_MAX_QUERIES', '50')),
+            bulk_commit_rows=int(os.getenv('MYSQL_BULK_COMMIT_ROWS', '10000')),
+            bulk_max_rows=int(os.getenv('MYSQL_BULK_MAX_ROWS', '100000')),
+            bulk_max_statement_bytes=int(os.getenv('MYSQL_BULK_MAX_STATEMENT_BYTES', '4194304')),
+            metrics_enabled=_env_bool('MYSQL_METRICS', 'true'),
+            metrics_prometheus_file=os.getenv('MYSQL_METRICS_PROMETHEUS_FILE', ''),
+            metrics_dump_interval=float(os.getenv('MYSQL_METRICS_DUMP_INTERVAL', '15')),
+            slow_query_ms=float(os.getenv('MYSQL_SLOW_QUERY_MS', '1000')),
+            slow_log_size=int(os.getenv('MYSQL_SLOW_LOG_SIZE', '100')),
+            slow_log_file=os.getenv('MYSQL_SLOW_LOG_FILE', ''),
+            slow_log_explain=_env_bool('MYSQL_SLOW_LOG_EXPLAIN', 'true'),
+            # 只读副本：逗号分隔的host[:port]，账号与库名与主库相同
+            replicas=_parse_hosts(os.getenv('MYSQL_REPLICAS', '')),
+            replica_max_lag=float(os.getenv('MYSQL_REPLICA_MAX_LAG', '5')),
+            replica_check_interval=float(os.getenv('MYSQL_REPLICA_CHECK_INTERVAL', '5')),
+            # 导出到文件：未设置导出目录时export_query不可用
+            export_dir=os.getenv('MYSQL_EXPORT_DIR', ''),
+            export_chunk_rows=max(1, int(os.getenv('MYSQL_EXPORT_CHUNK_ROWS', '5000'))),
+            export_max_rows=int(os.getenv('MYSQL_EXPORT_MAX_ROWS', '0')),
+            export_timeout=float(os.getenv('MYSQL_EXPORT_TIMEOUT', '600')),
+            summary_top_k=int(os.getenv('MYSQL_SUMMARY_TOP_K', '5')),
+            summary_sample_rows=int(os.getenv('MYSQL_SUMMARY_SAMPLE_ROWS', '5')),
+            cost_gate=cost_gate,
+            cost_gate_max_rows=int(os.getenv('MYSQL_COST_GATE_MAX_ROWS', '1000000')),
+            cost_gate_full_scan_rows=int(os.getenv('MYSQL_COST_GATE_FULL_SCAN_ROWS', '100000')),
+            cost_gate_limit=int(os.getenv('MYSQL_COST_GATE_LIMIT', '1000')),
+            cost_gate_cache_ttl=float(os.getenv('MYSQL_COST_GATE_CACHE_TTL', '300')),
+        )
+
+
+_is_chinese: Optional[bool] = None
+_settings: Optional[Settings] = None
+
+
+def is_chinese_locale() -> bool:
+    """返回缓存的语言环境检测结果（进程内只检测一次）"""
+    global _is_chinese
+    if _is_chinese is None:
+        _is_chinese = detect_chinese_locale()
+    return _is_chinese
+
+
+def get_settings() -> Settings:
+    """返回进程内共享的配置，首次调用时从环境变量解析"""
+    global _settings
+    if _settings is None:
+        _settings = Settings.from_env()
+    return _settings
+
+
+def reload_settings() -> Settings:
+    """重新读取环境变量（包括语言环境），替换共享配置
+
+    之后的工具调用按新配置重建处理器。进程内共享的连接池、副本路由、流式游标注册表、
+    准入控制器、结果/元数据/判定缓存与慢查询日志在首次使用时按当时的配置创建，不随之重建：
+    连接目标、连接池大小、缓存容量、并发上限等配置需要重启进程才生效（成本闸门的阈值除外）。
+    """
+    global _settings, _is_chinese
+    _is_chinese = None
+    _settings = Settings.from_env()
+    return _settings
@@ -0,0 +1,214 @@
+"""按列的结果值转换计划
+
+每个结果集根据cursor.description中的MySQL类型码生成一次转换计划，
+之后按列批量转换：整数和浮点数列原样输出，字符串列只在C层检查类型与长度，
+NOT NULL的DECIMAL/日期列用map整列转换，只有可为NULL的列才逐个判断单元格。
+"""
+
+import datetime
+from operator import itemgetter, methodcaller
+from typing import Any, Callable, List, Optional, Sequence
+
+# MySQL协议中的字段类型码（与pymysql.constants.FIELD_TYPE一致）
+DECIMAL = 0
+TINY = 1
+SHORT = 2
+LONG = 3
+FLOAT = 4
+DOUBLE = 5
+NULL = 6
+TIMESTAMP = 7
+LONGLONG = 8
+INT24 = 9
+DATE = 10
+TIME = 11
+DATETIME = 12
+YEAR = 13
+NEWDATE = 14
+VARCHAR = 15
+BIT = 16
+JSON = 245
+NEWDECIMAL = 246
+ENUM = 247
+SET = 248
+TINY_BLOB = 249
+MEDIUM_BLOB = 250
+LONG_BLOB = 251
+BLOB = 252
+VAR_STRING = 253
+STRING = 254
+GEOMETRY = 255
+
+# 类型码对应的MySQL类型名（用于描述导出文件的列）
+TYPE_NAMES = {
+    DECIMAL: 'DECIMAL', TINY: 'TINYINT', SHORT: 'SMALLINT', LONG: 'INT', FLOAT: 'FLOAT',
+    DOUBLE: 'DOUBLE', NULL: 'NULL', TIMESTAMP: 'TIMESTAMP', LONGLONG: 'BIGINT', INT24: 'MEDIUMINT',
+    DATE: 'DATE', TIME: 'TIME', DATETIME: 'DATETIME', YEAR: 'YEAR', NEWDATE: 'DATE',
+    VARCHAR: 'VARCHAR', BIT: 'BIT', JSON: 'JSON', NEWDECIMAL: 'DECIMAL', ENUM: 'ENUM', SET: 'SET',
+    TINY_BLOB: 'TINYBLOB', MEDIUM_BLOB: 'MEDIUMBLOB', LONG_BLOB: 'LONGBLOB', BLOB: 'BLOB',
+    VAR_STRING: 'VARCHAR', STRING: 'CHAR', GEOMETRY: 'GEOMETRY',
+}
+
+# 驱动已返回JSON原生类型（int/float/str）的列
+NUMERIC_TYPES = frozenset({TINY, SHORT, LONG, FLOAT, DOUBLE, LONGLONG, INT24, YEAR, NULL})
+DECIMAL_TYPES = frozenset({DECIMAL, NEWDECIMAL})
+TEMPORAL_TYPES = frozenset({DATE, DATETIME, TIMESTAMP, NEWDATE})
+# 字符串与BLOB类型：二进制字符集的列（VARBINARY、BLOB等）由驱动返回bytes
+TEXT_TYPES = frozenset({
+    VARCHAR, VAR_STRING, STRING, ENUM, SET, JSON,
+    TINY_BLOB, MEDIUM_BLOB, LONG_BLOB, BLOB, GEOMETRY,
+})
+_STR_ONLY = frozenset({str, type(None)})
+
+ColumnTransform = Callable[[Sequence[Any]], Sequence[Any]]
+
+_isoformat = methodcaller('isoformat')
+
+
+def _format_timedelta(value: datetime.timedelta) -> str:
+    """TIME列（驱动返回timedelta）按MySQL的[-]HH:MM:SS[.ffffff]格式输出"""
+    sign = ''
+    if value < datetime.timedelta(0):
+        sign = '-'
+        value = -value
+    hours, rest = divmod(value.days * 86400 + value.seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    text = f"{sign}{hours:02d}:{minutes:02d}:{seconds:02d}"
+    if value.microseconds:
+        text += f".{value.microseconds:06d}"
+    return text
+
+
+def _decode_bytes(value: bytes) -> str:
+    """二进制值：能按UTF-8解码时返回文本，否则返回十六进制字面量"""
+    try:
+        return value.decode('utf-8')
+    except UnicodeDecodeError:
+        return '0x' + value.hex()
+
+
+def convert_value(value: Any, decimal_as_string: bool = False) -> Any:
+    """通用的单值转换，用于类型码未知的列"""
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return _format_timedelta(value)
+    if isinstance(value, (bytes, bytearray)):
+        return _decode_bytes(bytes(value))
+    # Decimal及其他数值类型
+    if decimal_as_string:
+        return str(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+class ConversionPlan:
+    """一个结果集的按列转换计划
+
+    Args:
+        description: cursor.description
+        decimal_as_string: DECIMAL按字符串输出（无损），否则转换为float
+        max_cell_length: 字符串超过该长度时截断（0表示不截断）
+        native_datetime: 编码器能直接输出ISO格式的日期时间（orjson）时，日期列原样交给编码器
+    """
+
+    def __init__(
+        self,
+        description: Sequence[Sequence[Any]],
+        decimal_as_string: bool = False,
+        max_cell_length: int = 0,
+        native_datetime: bool = False,
+    ):
+        self.columns: List[str] = [desc[0] for desc in description]
+        self.decimal_as_string = decimal_as_string
+        self.max_cell_length = max_cell_length
+        self.native_datetime = native_datetime
+        # 累计被截断的单元格数量（分页读取时跨页累加）
+        self.truncated_cells = 0
+        self._transforms: List[Optional[ColumnTransform]] = [
+            self._transform_for(desc) for desc in description
+        ]
+
+    def _transform_for(self, desc: Sequence[Any]) -> Optional[ColumnTransform]:
+        """根据类型码选择整列转换函数，None表示原样输出"""
+        type_code = desc[1] if len(desc) > 1 else None
+        # description第7项null_ok为False时整列不含NULL，可以省去逐个判断
+        nullable = desc[6] if len(desc) > 6 and desc[6] is not None else True
+
+        if type_code in NUMERIC_TYPES:
+            return None
+        if type_code in TEXT_TYPES:
+            return self._text
+        if type_code in DECIMAL_TYPES:
+            func: Callable[[Any], Any] = str if self.decimal_as_string else float
+            if nullable:
+                return lambda col: [None if v is None else func(v) for v in col]
+            return lambda col: list(map(func, col))
+        if type_code in TEMPORAL_TYPES:
+            if self.native_datetime:
+                # 驱动无法解析的零日期以字符串返回，编码器同样可以直接输出
+                return None
+            return self._temporal_nullable if nullable else self._temporal
+        if type_code == TIME:
+            return lambda col: [v if v is None or isinstance(v, str) else _format_timedelta(v) for v in col]
+        if type_code == BIT:
+            return lambda col: [None if v is None else int.from_bytes(v, 'big') for v in col]
+        return self._generic
+
+    def _text(self, col: Sequence[Any]) -> Sequence[Any]:
+        # 用C层的map(type)检查整列，只有确实包含bytes时才逐个解码
+        if not _STR_ONLY.issuperset(map(type, col)):
+            col = [_decode_bytes(bytes(v)) if isinstance(v, (bytes, bytearray)) else v for v in col]
+        if self.max_cell_length > 0:
+            return self._truncate(col)
+        return col
+
+    def _truncate(self, col: Sequence[Any]) -> Sequence[Any]:
+        limit = self.max_cell_length
+        # 先用map(len)检查整列的最大长度，大多数列无需截断
+        if max(map(len, filter(None, col)), default=0) <= limit:
+            return col
+        out = []
+        for v in col:
+            if v is not None and len(v) > limit:
+                v = v[:limit]
+                self.truncated_cells += 1
+            out.append(v)
+        return out
+
+    def _temporal(self, col: Sequence[Any]) -> Sequence[Any]:
+        try:
+            return list(map(_isoformat, col))
+        except AttributeError:
+            # 驱动无法解析的零日期以字符串返回
+            return self._temporal_nullable(col)
+
+    def _temporal_nullable(self, col: Sequence[Any]) -> Sequence[Any]:
+        return [v if v is None or isinstance(v, str) else v.isoformat() for v in col]
+
+    def _generic(self, col: Sequence[Any]) -> Sequence[Any]:
+        out = [convert_value(v, self.decimal_as_string) for v in col]
+        if self.max_cell_length > 0:
+            limit = self.max_cell_length
+            for i, v in enumerate(out):
+                if isinstance(v, str) and len(v) > limit:
+                    out[i] = v[:limit]
+                    self.truncated_cells += 1
+        return out
+
+    def convert(self, rows: Sequence[Sequence[Any]]) -> List[Sequence[Any]]:
+        """按列转换一批行，返回与columns对应的列值序列"""
+        if not rows:
+            return [[] for _ in self.columns]
+        # 用itemgetter按列取值，比zip(*rows)转置大量行更快
+        return [
+            transform(column) if transform is not None else column
+            for transform, column in (
+                (transform, list(map(itemgetter(i), rows)))
+                for i, transform in enumerate(self._transforms)
+            )
+        ]
@@ -0,0 +1,220 @@
+"""执行前的EXPLAIN成本闸门
+
+开启后（MYSQL_COST_GATE=reject或limit），通过安全检查的单条SELECT先执行EXPLAIN FORMAT=JSON，
+按优化器的估计判断查询会不会拖垮服务器：
+
+- 估计检查的总行数超过MYSQL_COST_GATE_MAX_ROWS
+- 对行数不少于MYSQL_COST_GATE_FULL_SCAN_ROWS的表做全表扫描（ALL）或全索引扫描（index）
+
+命中任一规则时，reject模式拒绝查询并返回结构化的说明；limit模式在LIMIT能真正限制扫描量时
+（没有聚合、DISTINCT、GROUP BY、窗口函数、UNION，执行计划中没有filesort或临时表）
+为查询加上LIMIT MYSQL_COST_GATE_LIMIT后执行，否则同样拒绝。满足上述条件且已带有
+不超过MYSQL_COST_GATE_LIMIT的LIMIT的查询直接放行（EXPLAIN的扫描行数不考虑LIMIT）。
+
+估计结果按（库名, 查询指纹）缓存MYSQL_COST_GATE_CACHE_TTL秒，执行DDL后失效。
+EXPLAIN本身失败时放行，由查询自己报告错误。
+"""
+
+import logging
+import re
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .cache import TTLCache
+from .sql_lexer import analyze, with_row_limit
+
+logger = logging.getLogger(__name__)
+
+# off: 不检查；reject: 超出预算时拒绝；limit: 超出预算时尽量改为加LIMIT执行
+GATE_MODES = ('off', 'reject', 'limit')
+# 成本估计缓存的条目数
+PLAN_CACHE_SIZE = 1024
+# 视为扫描整张表（或整个索引）的访问方式
+SCAN_ACCESS_TYPES = frozenset({'ALL', 'index'})
+
+# 加LIMIT也不能减少扫描量的写法：结果要在读完全部输入后才能产生
+_UNBOUNDED_RE = re.compile(
+    r"""
+      \b(?:COUNT|SUM|AVG|MIN|MAX|GROUP_CONCAT|JSON_ARRAYAGG|JSON_OBJECTAGG
+         |STD|STDDEV|STDDEV_POP|STDDEV_SAMP|VARIANCE|VAR_POP|VAR_SAMP
+         |BIT_AND|BIT_OR|BIT_XOR)\s*\(
+    | \bGROUP\s+BY\b
+    | \bDISTINCT\b
+    | \bOVER\s*\(
+    | \bUNION\b
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+
+Explainer = Callable[[], Awaitable[Any]]
+
+
+def _examined(node: Any) -> float:
+    """估计的检查行数：嵌套循环中每个表的单次扫描行数乘以之前各表连接产生的行数"""
+    if isinstance(node, list):
+        return sum(_examined(item) for item in node)
+    if not isinstance(node, dict):
+        return 0.0
+    if 'nested_loop' in node:
+        total = sum(_examined(value) for key, value in node.items() if key != 'nested_loop')
+        prefix = 1.0
+        for item in node['nested_loop']:
+            table = item.get('table', item) if isinstance(item, dict) else {}
+            per_scan = float(table.get('rows_examined_per_scan') or 0)
+            total += prefix * per_scan + _examined_children(table)
+            produced = table.get('rows_produced_per_join')
+            prefix = float(produced) if produced is not None else prefix * per_scan
+        return total
+    if 'table_name' in node:
+        return float(node.get('rows_examined_per_scan') or 0) + _examined_children(node)
+    return sum(_examined(value) for value in node.values())
+
+
+def _examined_children(table: Dict[str, Any]) -> float:
+    # 表节点下的子查询（物化的派生表、附加的子查询等）
+    return sum(_examined(value) for value in table.values() if isinstance(value, (dict, list)))
+
+
+def _walk(node: Any, found: List[Dict[str, Any]], flags: Dict[str, bool]) -> None:
+    if isinstance(node, dict):
+        if 'table_name' in node and 'access_type' in node:
+            found.append(node)
+        if node.get('using_filesort') or node.get('using_temporary_table'):
+            flags['sorts'] = True
+        for value in node.values():
+            _walk(value, found, flags)
+    elif isinstance(node, list):
+        for value in node:
+            _walk(value, found, flags)
+
+
+def estimate_plan(plan: Any) -> Dict[str, Any]:
+    """从EXPLAIN FORMAT=JSON的结果中提取估计的检查行数、各表的扫描与是否需要排序/临时表
+
+    不认识的计划格式（如explain_json_format_version=2）examined_rows为None。
+    """
+    tables: List[Dict[str, Any]] = []
+    flags = {'sorts': False}
+    _walk(plan, tables, flags)
+    cost = None
+    if isinstance(plan, dict):
+        cost = plan.get('query_block', {}).get('cost_info', {}).get('query_cost')
+    return {
+        "examined_rows": int(_examined(plan)) if tables else None,
+        "query_cost": float(cost) if cost is not None else None,
+        "scans": [
+            {
+                "table": table.get('table_name'),
+                "access_type": table.get('access_type'),
+                "rows": int(table.get('rows_examined_per_scan') or 0),
+            }
+            for table in tables
+            if table.get('access_type') in SCAN_ACCESS_TYPES
+        ],
+        "sorts": flags['sorts'],
+    }
+
+
+class CostGate:
+    """按EXPLAIN估计拒绝或限制高成本查询
+
+    Args:
+        mode: GATE_MODES之一
+        max_rows: 允许的估计检查总行数
+        full_scan_rows: 表的行数达到该值时不允许全表/全索引扫描
+        limit: limit模式下加上的LIMIT
+        cache_ttl: 成本估计的缓存秒数
+    """
+
+    def __init__(self, mode: str, max_rows: int, full_scan_rows: int, limit: int, cache_ttl: float):
+        self.mode = mode
+        self.max_rows = max_rows
+        self.full_scan_rows = full_scan_rows
+        self.limit = limit
+        self.plans: TTLCache[Dict[str, Any]] = TTLCache(PLAN_CACHE_SIZE, cache_ttl)
+        self.checked = 0
+        self.rejected = 0
+        self.limited = 0
+        self.explain_errors = 0
+
+    @staticmethod
+    def applies(query: str) -> bool:
+        """只检查单条SELECT（包括WITH开头的查询）"""
+        statements = analyze(query).statements
+        return len(statements) == 1 and statements[0].keyword in ('SELECT', 'WITH')
+
+    def violations(self, cost: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """估计结果违反的规则"""
+        found = []
+        examined = cost["examined_rows"]
+        if self.max_rows > 0 and examined is not None and examined > self.max_rows:
+            found.append({"rule": "examined_rows", "examined_rows": examined, "max_rows": self.max_rows})
+        if self.full_scan_rows > 0:
+            for scan in cost["scans"]:
+                if scan["rows"] >= self.full_scan_rows:
+                    found.append({"rule": "full_scan", **scan, "max_rows": self.full_scan_rows})
+        return found
+
+    async def check(self, query: str, key: Hashable, explainer: Explainer) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """返回(要执行的查询, 说明)；说明为None表示放行，action为rejected或limited"""
+        self.checked += 1
+        cost = self.plans.get(key)
+        cached = cost is not None
+        if cost is None:
+            try:
+                cost = estimate_plan(await explainer())
+            except Exception as e:
+                self.explain_errors += 1
+                logger.warning(f"成本闸门执行EXPLAIN失败，放行查询: {e}")
+                return query, None
+            self.plans.put(key, cost)
+        found = self.violations(cost)
+        if not found:
+            return query, None
+        # 只有LIMIT能在读到足够的行后结束扫描时，LIMIT才算限制了成本
+        bounded = not cost["sorts"] and not _UNBOUNDED_RE.search(query)
+        limited = with_row_limit(query, self.limit) if bounded and self.limit > 0 else None
+        if limited == query:
+            # 查询已有不超过闸门限制的LIMIT
+            return query, None
+
+        explanation: Dict[str, Any] = {
+            "action": "rejected",
+            "violations": found,
+            "examined_rows": cost["examined_rows"],
+            "query_cost": cost["query_cost"],
+            "scans": cost["scans"],
+            "cached": cached,
+        }
+        if self.mode == 'limit' and limited is not None:
+            self.limited += 1
+            explanation["action"] = "limited"
+            explanation["limit"] = self.limit
+            return limited, explanation
+        self.rejected += 1
+        return query, explanation
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "max_rows": self.max_rows,
+            "full_scan_rows": self.full_scan_rows,
+            "checked": self.checked,
+            "rejected": self.rejected,
+            "limited": self.limited,
+            "explain_errors": self.explain_errors,
+            "plans": self.plans.stats(),
+        }
+
+
+_shared_gate: Optional[CostGate] = None
+
+
+def get_cost_gate(mode: str, max_rows: int, full_scan_rows: int, limit: int, cache_ttl: float) -> CostGate:
+    """获取进程内共享的成本闸门，首次调用时创建；阈值随配置重新加载而更新，已缓存的估计仍然有效"""
+    global _shared_gate
+    if _shared_gate is None:
+        _shared_gate = CostGate(mode, max_rows, full_scan_rows, limit, cache_ttl)
+    else:
+        gate = _shared_gate
+        gate.mode, gate.max_rows, gate.full_scan_rows, gate.limit = mode, max_rows, full_scan_rows, limit
+    return _shared_gate
@@ -0,0 +1,67 @@
+"""查询结果的JSON编码与返回格式
+
+安装了orjson（pip install "mysql-python-mcp[fast]"）时使用其C实现编码，
+否则回退到标准库json；两种编码器都输出紧凑的UTF-8 JSON。
+"""
+
+import json
+from decimal import Decimal
+from typing import Any, Sequence
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+# objects: 每行一个{列名: 值}对象（默认）
+# rows: 每行一个值数组，列名只在columns中出现一次
+# columnar: 每列一个值数组，顺序与columns一致
+RESULT_FORMATS = ('objects', 'rows', 'columnar')
+
+ENCODER = 'orjson' if orjson is not None else 'json'
+# orjson直接输出date/datetime的ISO格式，与isoformat()结果一致
+NATIVE_DATETIME = orjson is not None
+
+
+def _default(obj: Any) -> Any:
+    """处理两种编码器都不能直接序列化的类型"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def encode_json_stdlib(obj: Any) -> str:
+    """标准库编码路径（未安装orjson时使用）"""
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_default)
+
+
+def encode_json(obj: Any) -> str:
+    """将结果编码为JSON字符串，orjson无法处理的值（如超过64位的整数）回退到标准库"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default).decode('utf-8')
+        except TypeError:
+            pass
+    return encode_json_stdlib(obj)
+
+
+def encoded_size(obj: Any) -> int:
+    """obj编码为JSON后的UTF-8字节数"""
+    if orjson is not None:
+        try:
+            return len(orjson.dumps(obj, default=_default))
+        except TypeError:
+            pass
+    text = encode_json_stdlib(obj)
+    return len(text) if text.isascii() else len(text.encode('utf-8'))
+
+
+def shape_columns(columns: Sequence[str], values: Sequence[Sequence[Any]], result_format: str) -> Any:
+    """将按列排列的值（与columns一一对应）转换为指定的返回格式"""
+    if result_format == 'columnar':
+        return list(values)
+    if result_format == 'rows':
+        return list(zip(*values))
+    return [dict(zip(columns, row)) for row in zip(*values)]
@@ -0,0 +1,142 @@
+"""将查询结果流式写入本地文件
+
+结果通过服务端游标（SSCursor）按块读取，每块转换、编码后交给后台线程写入文件，
+写入与读取下一块重叠进行；内存中最多同时存在两块数据，与结果集总行数无关。
+文件先写为<name>.part，成功后通过硬链接原子地发布为最终文件名（目标已存在时失败，不覆盖），
+失败时删除，导出目录中不会留下不完整的文件。
+"""
+
+import asyncio
+import csv
+import gzip
+import io
+import os
+import re
+import secrets
+import time
+from typing import IO, Any, Dict, List, Optional, Sequence
+
+from .converters import TYPE_NAMES
+from .encoding import encode_json, shape_columns
+
+# ndjson: 每行一个{列名: 值}对象；csv: 首行为列名，NULL写为空字段
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+_FILE_NAME_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$')
+# 写文件的缓冲区大小
+WRITE_BUFFER = 1 << 20
+
+
+class ExportError(ValueError):
+    """导出参数无效（文件名、格式或目标文件已存在）"""
+
+
+def export_path(directory: str, file_name: Optional[str], fmt: str, compress: bool) -> str:
+    """导出文件的绝对路径：只允许导出目录下的普通文件名，扩展名按格式与压缩方式补全"""
+    extension = f".{fmt}" + (".gz" if compress else "")
+    if not file_name:
+        file_name = time.strftime("export-%Y%m%d-%H%M%S-") + secrets.token_hex(3)
+    if not _FILE_NAME_RE.match(file_name) or '..' in file_name:
+        raise ExportError(file_name)
+    if not file_name.endswith(extension):
+        file_name += extension
+    return os.path.join(os.path.abspath(directory), file_name)
+
+
+def column_schema(description: Sequence[Sequence[Any]]) -> List[Dict[str, Any]]:
+    """由cursor.description生成列的名称、MySQL类型与是否可为NULL"""
+    return [
+        {
+            "name": desc[0],
+            "type": TYPE_NAMES.get(desc[1], str(desc[1])) if len(desc) > 1 else None,
+            "nullable": bool(desc[6]) if len(desc) > 6 and desc[6] is not None else True,
+        }
+        for desc in description
+    ]
+
+
+def encode_ndjson(columns: Sequence[str], values: Sequence[Sequence[Any]]) -> bytes:
+    """按列排列的值编码为NDJSON行"""
+    lines = [encode_json(row) for row in shape_columns(columns, values, 'objects')]
+    if not lines:
+        return b''
+    lines.append('')
+    return "\n".join(lines).encode('utf-8')
+
+
+def encode_csv(values: Sequence[Sequence[Any]], header: Optional[Sequence[str]] = None) -> bytes:
+    """按列排列的值编码为CSV行（RFC 4180引号规则，\\r\\n换行）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header is not None:
+        writer.writerow(header)
+    writer.writerows(zip(*values))
+    return buffer.getvalue().encode('utf-8')
+
+
+class ExportWriter:
+    """在后台线程中写入（并可选gzip压缩）编码好的数据块"""
+
+    def __init__(self, path: str, compress: bool):
+        self.path = path
+        self.part_path = f"{path}.part"
+        self.compress = compress
+        self.bytes_written = 0
+        self._file: Optional[IO[bytes]] = None
+        self._pending: Optional["asyncio.Future[None]"] = None
+
+    def open(self) -> None:
+        if os.path.exists(self.path):
+            raise ExportError(os.path.basename(self.path))
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        raw = open(self.part_path, 'xb', buffering=WRITE_BUFFER)
+        self._file = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6) if self.compress else raw
+
+    async def write(self, data: bytes) -> None:
+        """等待上一块写完后提交这一块，调用方随即可以读取下一块"""
+        if self._pending is not None:
+            await self._pending
+        self._pending = None
+        if data:
+            self.bytes_written += len(data)
+            self._pending = asyncio.get_running_loop().run_in_executor(None, self._file.write, data)
+
+    def _close_file(self) -> None:
+        if self._file is None:
+            return
+        fileobj = self._file.fileobj if isinstance(self._file, gzip.GzipFile) else None
+        self._file.close()
+        if fileobj is not None:
+            fileobj.close()
+        self._file = None
+
+    async def finish(self) -> int:
+        """写完剩余数据并将文件发布到最终路径，返回文件字节数
+
+        导出期间最终路径上出现了同名文件时抛出ExportError，不覆盖该文件；.part文件由abort删除。
+        """
+        if self._pending is not None:
+            await self._pending
+            self._pending = None
+        await asyncio.get_running_loop().run_in_executor(None, self._close_file)
+        # os.replace会静默覆盖已存在的文件；link在目标存在时原子地失败
+        try:
+            os.link(self.part_path, self.path)
+        except FileExistsError:
+            raise ExportError(os.path.basename(self.path))
+        os.remove(self.part_path)
+        return os.path.getsize(self.path)
+
+    async def abort(self) -> None:
+        """放弃导出并删除未完成的文件"""
+        if self._pending is not None:
+            try:
+                await self._pending
+            except Exception:
+                pass
+            self._pending = None
+        try:
+            self._close_file()
+        finally:
+            if os.path.exists(self.part_path):
+                os.remove(self.part_path)
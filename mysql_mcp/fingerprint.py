@@ -0,0 +1,159 @@
+"""SQL查询指纹：将不影响安全判定的字面量替换为占位符"""
+
+import re
+
+# 注释、双引号串、反引号标识符按原样保留；单引号字符串与数字是可替换的候选字面量
+_TOKEN_RE = re.compile(
+    r"""
+      (?P<comment>/\*.*?(?:\*/|\Z)|--[^\r\n]*|\#[^\r\n]*)
+    | (?P<quoted>"[^"]*(?:"|\Z)|`[^`]*(?:`|\Z))
+    | (?P<string>'[^']*(?:'|\Z))
+    | (?P<number>(?<![\w.])\d+(?:\.\d+)?(?:[eE][+-]?\d+)?(?![\w.]))
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# 字面量内容中出现这些片段时，安全检查的结果（或错误消息）可能依赖于字面量本身
+_SENSITIVE_RE = re.compile(r"UNION|@@|OUTFILE|DUMPFILE|LOAD_FILE|USE|FROM|JOIN|INTO|UPDATE", re.I)
+# 紧跟在这些关键字之后的字面量会被数据库上下文检查的正则捕获到错误消息中
+_CONTEXT_KEYWORD_RE = re.compile(r"(?:^|\W)(?:FROM|JOIN|INTO|UPDATE|USE)$", re.I)
+_INERT_CONTENT_RE = re.compile(r"[ -&(-\[\]-~]*")  # 可打印ASCII，不含引号与反斜杠
+_QUOTE_CHARS = ("'", '"', '`', '\\')
+
+_WHITESPACE_RE = re.compile(r"\s")
+_SIGNS_ONLY_RE = re.compile(r"[\s+-]*")
+
+PLACEHOLDER = "?"
+
+
+def _follows_context_keyword(query: str, run_start: int) -> bool:
+    """字面量所在的非空白片段是否紧跟FROM/JOIN/INTO/UPDATE/USE"""
+    # 只检查片段之前的有限窗口，保证长查询中逐个字面量的检查开销恒定
+    window_start = max(0, run_start - 256)
+    prefix = query[window_start:run_start]
+    stripped = prefix.rstrip()
+    if len(stripped) == len(prefix):
+        return False
+    if not stripped and window_start > 0:
+        # 空白超出窗口，无法确定前一个单词，保守处理
+        return True
+    return _CONTEXT_KEYWORD_RE.search(stripped[-8:]) is not None
+
+
+def fingerprint(query: str) -> str:
+    """返回查询的指纹
+
+    只有当替换后安全检查与数据库上下文检查的结果（包括错误消息）必然不变时，
+    字面量才会被替换为占位符；任何可能产生歧义的写法（转义、注释或标识符中的引号、
+    敏感关键字等）都会让整个查询按原样作为指纹。
+    """
+    parts = []
+    last = 0
+    prev_end = 0
+    # 当前语句中字面量之前是否只有空白、注释和正负号（此时字面量会成为语句的首个词法单元）
+    leading = True
+    # 最近一个空白字符的位置，用于定位字面量所在的非空白片段
+    last_ws = -1
+    for match in _TOKEN_RE.finditer(query):
+        kind = match.lastgroup
+        text = match.group()
+        start, end = match.span()
+
+        for ws in _WHITESPACE_RE.finditer(query, prev_end, start):
+            last_ws = ws.start()
+        code = query[prev_end:start]
+        if ';' in code:
+            leading = True
+            code = code[code.rindex(';') + 1:]
+        if _SIGNS_ONLY_RE.fullmatch(code) is None:
+            leading = False
+        run_start = last_ws + 1
+        for ws in _WHITESPACE_RE.finditer(query, start, end):
+            last_ws = ws.start()
+        prev_end = end
+
+        if kind == 'comment' or kind == 'quoted':
+            # 保留区域中出现其他引号会让不同解析器对字面量边界产生分歧
+            inner = text[1:-1] if kind == 'quoted' else text
+            if any(q in inner for q in _QUOTE_CHARS):
+                return query
+            if kind == 'quoted':
+                leading = False
+            continue
+
+        if kind == 'string':
+            content = text[1:-1]
+            if (
+                len(text) < 2
+                or not text.endswith("'")
+                or _INERT_CONTENT_RE.fullmatch(content) is None
+                or _SENSITIVE_RE.search(content)
+            ):
+                return query
+            if start > 0 and (query[start - 1].isalnum() or query[start - 1] in "_'"):
+                # N'..'、X'..'、_utf8'..' 等带前缀的字面量保持原样
+                return query
+            if end < len(query) and query[end] in ".'":
+                return query
+
+        starts_statement = leading
+        leading = False
+        if starts_statement or _follows_context_keyword(query, run_start):
+            continue
+
+        parts.append(query[last:start])
+        parts.append(PLACEHOLDER)
+        last = end
+
+    if not parts:
+        return query
+    parts.append(query[last:])
+    return "".join(parts)
+
+
+# 摘要文本使用的词法单元：注释去掉，字符串、数字与十六进制字面量替换为占位符
+_DIGEST_TOKEN_RE = re.compile(
+    r"""
+      (?P<comment>/\*(?!\+)[\s\S]*?(?:\*/|\Z)|--(?=\s|$)[^\r\n]*|\#[^\r\n]*)
+    | (?P<ident>`(?:[^`]|``)*(?:`|\Z))
+    | (?P<literal>
+          (?:_[a-z0-9]+|[NnXxBb])?'(?:[^'\\]|\\[\s\S]|'')*(?:'|\Z)
+        | "(?:[^"\\]|\\[\s\S]|"")*(?:"|\Z)
+        | 0[xX][0-9a-fA-F]+ | 0[bB][01]+
+        | (?<![\w.$])\d+(?:\.\d*)?(?:[eE][+-]?\d+)?(?![\w$])
+        | (?<![\w.$])\.\d+(?:[eE][+-]?\d+)?(?![\w$])
+      )
+    | (?P<space>\s+)
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+# 占位符列表（IN列表、VALUES多行）折叠为一项，参数个数不同的同一查询归为一组
+_PLACEHOLDER_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_ROWS_RE = re.compile(r"(\(\.\.\.\)|\(\?\))(?:\s*,\s*\1)+")
+
+
+def digest_text(query: str) -> str:
+    """返回用于聚合统计的查询摘要
+
+    与fingerprint()不同，摘要不参与安全判定：所有字面量都替换为占位符、
+    注释去掉、空白合并、IN列表折叠，同一形状的查询（只是参数不同）得到相同摘要。
+    """
+    parts = []
+    last = 0
+    for match in _DIGEST_TOKEN_RE.finditer(query):
+        kind = match.lastgroup
+        if kind == 'ident':
+            continue
+        gap = query[last:match.start()]
+        if gap:
+            parts.append(gap)
+        if kind == 'literal':
+            parts.append(PLACEHOLDER)
+        elif parts and not parts[-1].endswith(' '):
+            # 注释与空白都合并为一个空格
+            parts.append(' ')
+        last = match.end()
+    parts.append(query[last:])
+    text = "".join(parts).strip().rstrip(';').strip()
+    text = _PLACEHOLDER_LIST_RE.sub('(...)', text)
+    return _VALUES_ROWS_RE.sub(r'\1', text)
@@ -0,0 +1,62 @@
+"""HTTP（streamable HTTP）传输
+
+一个长期运行的部署同时为多个客户端服务，不必每个客户端各启动一个stdio进程。
+uvicorn在同一端口上启动MYSQL_HTTP_WORKERS个工作进程，由内核在它们之间分配连接；
+每个工作进程导入一次服务器，拥有自己的共享连接池、准入控制与缓存。
+
+多个工作进程时使用无状态模式（每个请求独立处理，不依赖某个进程中的会话），
+page_size返回的流式游标仍只存在于打开它的工作进程中。
+
+收到SIGTERM/SIGINT时停止接受新连接，等待进行中的请求最多MYSQL_HTTP_DRAIN_TIMEOUT秒，
+然后按生命周期关闭流式游标与连接池。
+"""
+
+import os
+from typing import Any
+
+# 未设置时的默认值，__main__会把命令行参数写回这些环境变量，供工作进程中的create_app读取
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+DEFAULT_PATH = '/mcp'
+DEFAULT_DRAIN_TIMEOUT = 30
+
+
+def http_workers() -> int:
+    return max(1, int(os.getenv('MYSQL_HTTP_WORKERS', '1')))
+
+
+def is_stateless() -> bool:
+    """默认只有一个工作进程时保留会话，多个工作进程时无状态"""
+    value = os.getenv('MYSQL_HTTP_STATELESS', '').lower()
+    if value:
+        return value in ('1', 'true', 'yes', 'on')
+    return http_workers() > 1
+
+
+def create_app() -> Any:
+    """uvicorn在每个工作进程中调用的应用工厂"""
+    from . import mcp
+    from .config import is_chinese_locale
+    from .mysql_handler import warm_imports
+
+    is_chinese_locale()
+    warm_imports()
+    return mcp.http_app(path=os.getenv('MYSQL_HTTP_PATH', DEFAULT_PATH), stateless_http=is_stateless())
+
+
+def run_http() -> None:
+    """按MYSQL_HTTP_*配置启动HTTP服务器，阻塞直到关闭"""
+    import uvicorn
+
+    uvicorn.run(
+        f"{__name__}:create_app",
+        factory=True,
+        host=os.getenv('MYSQL_HTTP_HOST', DEFAULT_HOST),
+        port=int(os.getenv('MYSQL_HTTP_PORT', str(DEFAULT_PORT))),
+        workers=http_workers(),
+        timeout_graceful_shutdown=int(float(os.getenv('MYSQL_HTTP_DRAIN_TIMEOUT', str(DEFAULT_DRAIN_TIMEOUT)))),
+        # 每个请求一行的访问日志在高并发下开销明显，工具调用的统计见server_stats
+        access_log=False,
+        # 客户端通过长连接连续调用工具，空闲连接保持久一些
+        timeout_keep_alive=30,
+    )
@@ -0,0 +1,248 @@
+"""工具调用的分阶段耗时统计
+
+每次工具调用的总耗时与各阶段（安全检查、准入排队、借用连接、MySQL执行、值转换、
+JSON编码等）的耗时记录在按2倍递增分桶的内存直方图中，用于估算p50/p95/p99；
+同时按工具累计返回行数、响应字节数与错误数。
+
+关闭统计（MYSQL_METRICS=false）时stage()返回共享的空上下文管理器，不做任何计时。
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+# 直方图桶的上界（秒）：1微秒起按2倍递增到约134秒，最后一个桶收纳更长的耗时
+BUCKET_BOUNDS: Tuple[float, ...] = tuple(1e-6 * 2 ** i for i in range(28))
+QUANTILES = (0.5, 0.95, 0.99)
+
+# 当前工具调用的名称，阶段耗时与计数归属到该工具（并发子任务继承调用方的上下文）
+_current_tool: ContextVar[str] = ContextVar('mysql_mcp_tool', default='other')
+_NULL_TIMER = nullcontext()
+
+F = TypeVar('F', bound=Callable[..., Awaitable[Any]])
+
+
+class Histogram:
+    """固定分桶的耗时直方图"""
+
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """按桶内线性插值估算分位数"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKET_BOUNDS[i - 1] if i > 0 else 0.0
+                upper = BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "count": self.count,
+            "mean_ms": self.sum * 1000 / self.count if self.count else 0.0,
+        }
+        for q in QUANTILES:
+            result[f"p{int(q * 100)}_ms"] = self.quantile(q) * 1000
+        result["max_ms"] = self.max * 1000
+        return result
+
+
+class Metrics:
+    """按(工具, 阶段)记录耗时直方图，按(工具, 名称)记录计数"""
+
+    def __init__(self) -> None:
+        self.started = time.time()
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self.counters: Dict[Tuple[str, str], int] = {}
+
+    def observe(self, tool: str, stage: str, seconds: float) -> None:
+        key = (tool, stage)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+    def add(self, tool: str, name: str, n: int = 1) -> None:
+        key = (tool, name)
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    def snapshot(self) -> Dict[str, Any]:
+        """按工具组织的统计摘要"""
+        tools: Dict[str, Dict[str, Any]] = {}
+        for (tool, stage), histogram in sorted(self.histograms.items()):
+            tools.setdefault(tool, {"stages": {}, "counters": {}})["stages"][stage] = histogram.summary()
+        for (tool, name), value in sorted(self.counters.items()):
+            tools.setdefault(tool, {"stages": {}, "counters": {}})["counters"][name] = value
+        return {"uptime_seconds": time.time() - self.started, "tools": tools}
+
+    def prometheus_text(self) -> str:
+        """Prometheus文本格式（可由node_exporter的textfile collector采集）"""
+        lines: List[str] = [
+            "# HELP mysql_mcp_stage_seconds Tool call latency by stage.",
+            "# TYPE mysql_mcp_stage_seconds histogram",
+        ]
+        for (tool, stage), histogram in sorted(self.histograms.items()):
+            labels = f'tool="{tool}",stage="{stage}"'
+            cumulative = 0
+            for bound, n in zip(BUCKET_BOUNDS, histogram.counts):
+                cumulative += n
+                lines.append(f'mysql_mcp_stage_seconds_bucket{{{labels},le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'mysql_mcp_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f'mysql_mcp_stage_seconds_sum{{{labels}}} {histogram.sum:.9g}')
+            lines.append(f'mysql_mcp_stage_seconds_count{{{labels}}} {histogram.count}')
+        names = sorted({name for _, name in self.counters})
+        for name in names:
+            lines.append(f"# TYPE mysql_mcp_{name}_total counter")
+            for (tool, counter_name), value in sorted(self.counters.items()):
+                if counter_name == name:
+                    lines.append(f'mysql_mcp_{name}_total{{tool="{tool}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+class _StageTimer:
+    __slots__ = ('metrics', 'tool', 'stage', 'start')
+
+    def __init__(self, metrics: Metrics, tool: str, stage: str):
+        self.metrics = metrics
+        self.tool = tool
+        self.stage = stage
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.metrics.observe(self.tool, self.stage, time.perf_counter() - self.start)
+
+
+class _ErrorCounter(logging.Handler):
+    """将mysql_mcp各模块记录的错误日志计入当前工具的errors计数"""
+
+    def __init__(self, metrics: Metrics):
+        super().__init__(logging.ERROR)
+        self.metrics = metrics
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.metrics.add(_current_tool.get(), 'errors')
+
+
+_metrics: Optional[Metrics] = None
+_error_counter: Optional[_ErrorCounter] = None
+_dump_task: Optional["asyncio.Task[None]"] = None
+_dump_path: Optional[str] = None
+
+
+def get_metrics() -> Optional[Metrics]:
+    """当前的统计对象，未启用时返回None"""
+    return _metrics
+
+
+def configure_metrics(enabled: bool, prometheus_file: str = '', dump_interval: float = 15.0) -> Optional[Metrics]:
+    """启用或关闭统计；指定prometheus_file时在后台定期写出Prometheus文本（需要运行中的事件循环）"""
+    global _metrics, _error_counter, _dump_task, _dump_path
+    package_logger = logging.getLogger('mysql_mcp')
+    if not enabled:
+        if _error_counter is not None:
+            package_logger.removeHandler(_error_counter)
+        _metrics = _error_counter = None
+        return None
+
+    if _metrics is None:
+        _metrics = Metrics()
+        _error_counter = _ErrorCounter(_metrics)
+        package_logger.addHandler(_error_counter)
+    if prometheus_file and (_dump_task is None or _dump_task.done()):
+        _dump_path = prometheus_file
+        _dump_task = asyncio.get_running_loop().create_task(_dump_loop(prometheus_file, dump_interval))
+    return _metrics
+
+
+def write_prometheus(path: str) -> None:
+    """原子地写出Prometheus文本，采集方不会读到写了一半的文件"""
+    if _metrics is None:
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(_metrics.prometheus_text())
+    os.replace(tmp, path)
+
+
+async def _dump_loop(path: str, interval: float) -> None:
+    while True:
+        await asyncio.sleep(max(1.0, interval))
+        try:
+            write_prometheus(path)
+        except OSError as e:
+            logger.warning(f"写出Prometheus统计失败: {e}")
+
+
+async def close_metrics() -> None:
+    """停止后台写出任务并写出最后一次统计（服务器关闭时调用）"""
+    global _dump_task
+    if _dump_task is not None:
+        _dump_task.cancel()
+        _dump_task = None
+        if _dump_path:
+            try:
+                write_prometheus(_dump_path)
+            except OSError as e:
+                logger.warning(f"写出Prometheus统计失败: {e}")
+
+
+def stage(name: str):
+    """为当前工具的一个阶段计时的上下文管理器"""
+    metrics = _metrics
+    if metrics is None:
+        return _NULL_TIMER
+    return _StageTimer(metrics, _current_tool.get(), name)
+
+
+def add(name: str, n: int = 1) -> None:
+    """累加当前工具的计数（rows、bytes等）"""
+    metrics = _metrics
+    if metrics is not None:
+        metrics.add(_current_tool.get(), name, n)
+
+
+def instrument(tool: str) -> Callable[[F], F]:
+    """工具函数装饰器：记录调用次数与总耗时，并让内部的阶段计时归属到该工具"""
+    def decorator(fn: F) -> F:
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            metrics = _metrics
+            if metrics is None:
+                return await fn(*args, **kwargs)
+            token = _current_tool.set(tool)
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                metrics.observe(tool, 'total', time.perf_counter() - start)
+                _current_tool.reset(token)
+        return wrapper  # type: ignore[return-value]
+    return decorator
@@ -1,15 +1,170 @@
-import os
 import re
-import asyncio
-import aiomysql
 import json
-import sqlparse
-import locale
+import asyncio
+import time
+from contextlib import asynccontextmanager
 from decimal import Decimal
-from sqlparse import sql, tokens as T
-from typing import List, Dict, Any, Optional
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 import logging
 
+from .admission import AdmissionRejected
+from .cache import LRUCache, TTLCache
+from .config import Settings, get_settings
+from .converters import ConversionPlan
+from .cost_gate import CostGate, get_cost_gate
+from .encoding import NATIVE_DATETIME, RESULT_FORMATS, encode_json, encoded_size, shape_columns
+from .export import EXPORT_FORMATS, ExportError, ExportWriter, column_schema, encode_csv, encode_ndjson, export_path
+from .fingerprint import fingerprint
+from .metrics import add as add_metric, stage
+from .pool import ConnectionPool, get_shared_pool
+from .replicas import ReplicaRouter, get_replica_router, needs_primary
+from .result_cache import ResultCache, get_result_cache, is_cacheable
+from .slow_log import SlowQueryLog, get_slow_log
+from .sql_lexer import QueryAnalysis, Statement, analyze, normalize_query, with_execution_time, with_row_limit
+from .streaming import StreamRegistry, StreamSession, get_stream_registry
+from .summary import SUMMARY_CHUNK_ROWS, ResultSummary
+
+if TYPE_CHECKING:
+    from sqlparse import sql
+
+logger = logging.getLogger(__name__)
+
+# 默认安全模式下允许的SQL命令
+SAFE_COMMANDS = frozenset({'SELECT', 'SHOW', 'DESCRIBE', 'DESC', 'EXPLAIN'})
+
+# SELECT语句中禁止出现的片段及其描述
+DANGEROUS_SELECT_CONSTRUCTS = (
+    ('INTO OUTFILE', 'SELECT INTO OUTFILE'),
+    ('INTO DUMPFILE', 'SELECT INTO DUMPFILE'),
+    ('LOAD_FILE(', '文件读取函数LOAD_FILE'),
+    ('@@', '系统变量访问'),
+)
+
+# 数据库上下文检查使用的模式
+DATABASE_PATTERNS = (
+    re.compile(r'\b(?:FROM|JOIN|INTO|UPDATE)\s+([^\s\.]+)\.', re.IGNORECASE),  # 表名前有数据库名
+    re.compile(r'\bUSE\s+([^\s;]+)', re.IGNORECASE),  # USE database
+)
+
+# 库结构快照：三条查询合并为一次多语句请求，结果均按表名排序以便分组
+SCHEMA_SNAPSHOT_QUERIES = (
+    "SELECT TABLE_NAME, TABLE_TYPE, ENGINE, TABLE_ROWS, TABLE_COMMENT "
+    "FROM information_schema.TABLES WHERE {where} ORDER BY TABLE_NAME",
+    "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, COLUMN_DEFAULT, EXTRA "
+    "FROM information_schema.COLUMNS WHERE {where} ORDER BY TABLE_NAME, ORDINAL_POSITION",
+    "SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, COLUMN_NAME, INDEX_TYPE "
+    "FROM information_schema.STATISTICS WHERE {where} ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX",
+)
+
+# 客户端期限比服务器端MAX_EXECUTION_TIME晚一点触发：SELECT通常先由服务器中止，连接仍可复用
+CLIENT_TIMEOUT_GRACE = 1.0
+# 服务器因MAX_EXECUTION_TIME中止查询时的错误码（ER_QUERY_TIMEOUT）
+ER_QUERY_TIMEOUT = 3024
+
+# 表名与列名只允许普通标识符（防止SQL注入）
+IDENTIFIER_RE = re.compile(r'^[a-zA-Z_][a-zA-Z0-9_]*$')
+
+# 批量写入的语句为max_allowed_packet中的包头等开销留出的字节数
+PACKET_OVERHEAD = 1024
+
+# 按字节预算转换结果时每次转换的行数
+CONVERT_CHUNK_ROWS = 512
+
+# (安全性判定, 数据库上下文判定)
+Verdict = Tuple[Tuple[bool, str], Tuple[bool, str]]
+
+_verdict_cache: Optional[LRUCache[Verdict]] = None
+
+
+def get_verdict_cache(maxsize: int = 1024) -> LRUCache[Verdict]:
+    """进程内共享的SQL安全判定缓存，按查询指纹索引"""
+    global _verdict_cache
+    if _verdict_cache is None:
+        _verdict_cache = LRUCache(maxsize)
+    return _verdict_cache
+
+
+# 会改变表结构、库列表或权限的命令，执行后使元数据缓存失效
+SCHEMA_CHANGING_COMMANDS = frozenset({
+    'CREATE', 'ALTER', 'DROP', 'RENAME', 'TRUNCATE', 'GRANT', 'REVOKE', 'IMPORT', 'CALL',
+})
+
+_metadata_cache: Optional[TTLCache[Tuple[Any, Any]]] = None
+
+
+def get_metadata_cache(maxsize: int = 512, ttl: float = 60.0) -> TTLCache[Tuple[Any, Any]]:
+    """进程内共享的库/表元数据缓存，条目为(结构签名, 查询结果)"""
+    global _metadata_cache
+    if _metadata_cache is None:
+        _metadata_cache = TTLCache(maxsize, ttl)
+    return _metadata_cache
+
+
+def changes_schema(query: str) -> bool:
+    """查询中是否有会改变元数据的语句"""
+    return any(
+        statement.keyword.split(' ', 1)[0] in SCHEMA_CHANGING_COMMANDS
+        for statement in analyze(query).statements
+    )
+
+
+_EXPLAIN_ANALYZE_RE = re.compile(r"(?:EXPLAIN|DESCRIBE|DESC)\s+ANALYZE\b")
+
+
+def is_read_only(query: str) -> bool:
+    """查询是否只有一条只读语句
+
+    多语句查询即使以SELECT开头也可能包含写操作，按写操作执行（显式事务，执行后使缓存失效）。
+    EXPLAIN DELETE只显示执行计划，EXPLAIN ANALYZE则会真正执行其中的语句。
+    """
+    analysis = analyze(query)
+    if len(analysis.statements) != 1:
+        return False
+    statement = analysis.statements[0]
+    if statement.keyword not in SAFE_COMMANDS:
+        return False
+    if statement.nested_dml is None:
+        return True
+    return statement.keyword in ('EXPLAIN', 'DESCRIBE', 'DESC') and _EXPLAIN_ANALYZE_RE.match(
+        analysis.statement_upper(statement).lstrip()
+    ) is None
+
+
+# 只读语句也可能在连接上留下会话状态：命名锁与用户变量
+_SESSION_STATE_RE = re.compile(r"\bGET_LOCK\s*\(|(?<!@)@(?!@)", re.IGNORECASE)
+
+
+def leaves_session_state(query: str) -> bool:
+    """执行后连接上是否可能留有会话状态，归还连接池前需要重置会话
+
+    非只读查询（写事务、SET、LOCK TABLES、临时表等）一律视为会留下状态。
+    """
+    return not is_read_only(query) or _SESSION_STATE_RE.search(query) is not None
+
+
+_VERSION_RE = re.compile(r"(\d+)\.(\d+)\.(\d+)")
+
+
+def supports_row_alias(version: str) -> bool:
+    """服务器是否支持INSERT ... VALUES ... AS alias ON DUPLICATE KEY UPDATE（MySQL 8.0.19+）
+
+    8.0.20起VALUES()引用新值的写法已弃用；MariaDB不支持行别名，仍使用VALUES()。
+    """
+    match = _VERSION_RE.match(version)
+    if match is None or 'mariadb' in version.lower():
+        return False
+    return tuple(int(part) for part in match.groups()) >= (8, 0, 19)
+
+
+class QueryTimeout(Exception):
+    """查询超过MYSQL_QUERY_TIMEOUT，已被中止"""
+
+
+def warm_imports() -> None:
+    """预先导入较重的依赖（aiomysql、sqlparse），避免首次工具调用时承担导入开销"""
+    import aiomysql  # noqa: F401
+    import sqlparse  # noqa: F401
+
 
 class DecimalEncoder(json.JSONEncoder):
     """自定义JSON编码器，用于处理Decimal类型"""
@@ -23,90 +178,177 @@ class DecimalEncoder(json.JSONEncoder):
 class MySQLHandler:
     """MySQL数据库处理器，提供安全的数据库操作"""
     
-    def __init__(self):
-        # 检测系统语言环境
-        self.is_chinese = self._detect_chinese_locale()
-        mysql_host = os.getenv('MYSQL_HOST')
-        if not mysql_host:
-            raise ValueError("MYSQL_HOST环境变量未设置")
-        
-        if ':' in mysql_host:
-            self.host, port_str = mysql_host.split(':', 1)
-            self.port = int(port_str)
-        else:
-            self.host = mysql_host
-            self.port = 3306
-            
-        self.user = os.getenv('MYSQL_USER')
-        if not self.user:
-            raise ValueError("MYSQL_USER环境变量未设置")
-            
-        self.password = os.getenv('MYSQL_PASSWORD')
-        if not self.password:
-            raise ValueError("MYSQL_PASSWORD环境变量未设置")
-            
-        self.database = os.getenv('MYSQL_DATABASE')
-        if not self.database:
-            raise ValueError("MYSQL_DATABASE环境变量未设置")
-            
-        self.allow_dangerous_operations = os.getenv('MYSQL_ALLOW_DANGEROUS', 'false').lower() == 'true'
-        
-        # 危险操作的关键词列表
-        self.dangerous_keywords = [
-            'DROP', 'DELETE', 'UPDATE', 'INSERT', 'ALTER', 'CREATE', 'TRUNCATE',
-            'REPLACE', 'GRANT', 'REVOKE', 'FLUSH', 'RESET', 'START', 'STOP',
-            'KILL', 'CHANGE', 'SET', 'LOAD', 'LOCK', 'UNLOCK'
-        ]
-        
-        self.logger = logging.getLogger(__name__)
+    # 危险操作的关键词列表
+    dangerous_keywords = (
+        'DROP', 'DELETE', 'UPDATE', 'INSERT', 'ALTER', 'CREATE', 'TRUNCATE',
+        'REPLACE', 'GRANT', 'REVOKE', 'FLUSH', 'RESET', 'START', 'STOP',
+        'KILL', 'CHANGE', 'SET', 'LOAD', 'LOCK', 'UNLOCK'
+    )
     
-    def _detect_chinese_locale(self) -> bool:
-        """检测是否为中文语言环境"""
-        try:
-            # 尝试获取系统语言环境
-            lang = locale.getdefaultlocale()[0]
-            if lang and ('zh' in lang.lower() or 'chinese' in lang.lower()):
-                return True
-            
-            # 检查环境变量
-            for env_var in ['LANG', 'LANGUAGE', 'LC_ALL', 'LC_MESSAGES']:
-                lang_env = os.getenv(env_var, '')
-                if lang_env and ('zh' in lang_env.lower() or 'chinese' in lang_env.lower()):
-                    return True
-            
-            return False
-        except Exception:
-            # 如果检测失败，默认使用英文
-            return False
+    def __init__(self, settings: Optional[Settings] = None):
+        # 配置与语言环境在启动时解析一次，所有处理器共享
+        self.settings = settings if settings is not None else get_settings()
+        self.is_chinese = self.settings.is_chinese
+        self.host = self.settings.host
+        self.port = self.settings.port
+        self.user = self.settings.user
+        self.password = self.settings.password
+        self.database = self.settings.database
+        self.allow_dangerous_operations = self.settings.allow_dangerous_operations
+        self.logger = logger
+        # 调用被取消后在后台执行的KILL QUERY任务
+        self._kill_tasks: set = set()
+        # 服务器的max_allowed_packet与是否支持行别名（见supports_row_alias），首次批量写入时读取
+        self._max_allowed_packet: Optional[int] = None
+        self._row_alias = False
     
     def _get_message(self, zh_msg: str, en_msg: str) -> str:
         """根据语言环境返回对应消息"""
         return zh_msg if self.is_chinese else en_msg
     
-    async def get_connection(self) -> aiomysql.Connection:
-        """获取数据库连接"""
-        try:
-            connection = await aiomysql.connect(
-                host=self.host,
-                port=self.port,
-                user=self.user,
-                password=self.password,
-                db=self.database,
-                autocommit=False,
-                charset='utf8mb4'
-            )
-            return connection
-        except Exception as e:
-            self.logger.error(f"连接数据库失败: {e}")
-            raise Exception(f"无法连接到数据库: {str(e)}")
+    @property
+    def pool(self) -> ConnectionPool:
+        """进程内共享的连接池"""
+        return get_shared_pool(
+            host=self.host,
+            port=self.port,
+            user=self.user,
+            password=self.password,
+            database=self.database,
+            minsize=self.settings.pool_min_size,
+            maxsize=self.settings.pool_max_size,
+            recycle=self.settings.pool_recycle,
+            pre_ping=self.settings.pool_pre_ping,
+        )
+    
+    def connection(self, reset: bool = False):
+        """从共享连接池借用数据库连接（异步上下文管理器），reset为True时归还前重置会话"""
+        return self.pool.acquire(reset=reset)
+    
+    @property
+    def replicas(self) -> Optional[ReplicaRouter]:
+        """只读副本路由，未配置MYSQL_REPLICAS时返回None"""
+        settings = self.settings
+        if not settings.replicas:
+            return None
+        return get_replica_router(
+            settings.replicas,
+            settings.replica_max_lag,
+            settings.replica_check_interval,
+            user=self.user,
+            password=self.password,
+            database=self.database,
+            minsize=settings.pool_min_size,
+            maxsize=settings.pool_max_size,
+            recycle=settings.pool_recycle,
+            pre_ping=settings.pool_pre_ping,
+        )
+    
+    def routes_to_replica(self, query: str) -> bool:
+        """只读查询能否发往副本：按默认安全模式的规则判定为安全，且不需要主库的锁或会话状态"""
+        if self.allow_dangerous_operations:
+            # 危险模式下安全检查直接放行，这里按默认模式的规则重新判定
+            is_safe, _ = self._check_analysis_safety(analyze(query))
+            if not is_safe:
+                return False
+        return not needs_primary(query)
+    
+    def _read_router(self, query: str) -> Optional[ReplicaRouter]:
+        """只读查询使用的副本路由；未配置副本或查询需要留在主库时返回None"""
+        router = self.replicas
+        if router is None or not self.routes_to_replica(query):
+            return None
+        return router
+    
+    @asynccontextmanager
+    async def _read_connection(self, query: str):
+        """借用执行只读查询的连接，返回(所属连接池, 连接)：可以时发往副本，否则使用主库"""
+        router = self._read_router(query)
+        reset = leaves_session_state(query)
+        if router is None:
+            async with self.pool.acquire(reset=reset) as connection:
+                yield self.pool, connection
+            return
+        async with router.acquire(self.pool, reset=reset) as (pool, connection):
+            yield pool, connection
+    
+    def check_query(self, query: str) -> Verdict:
+        """返回查询的安全性与数据库上下文判定，相同指纹的查询直接复用缓存结果"""
+        if self.settings.safety_cache_size <= 0:
+            return self._check_query_uncached(query)
+        
+        cache = get_verdict_cache(self.settings.safety_cache_size)
+        # 判定结果依赖于危险模式、目标数据库和消息语言，任一变化都使缓存失效
+        cache.ensure_policy(
+            (self.allow_dangerous_operations, self.database, self.is_chinese, self.settings.sql_parser)
+        )
+        key = fingerprint(query)
+        verdict = cache.get(key)
+        if verdict is None:
+            verdict = self._check_query_uncached(query)
+            cache.put(key, verdict)
+        return verdict
+    
+    def _check_query_uncached(self, query: str) -> Verdict:
+        """安全性检查与数据库上下文检查共用同一次词法分析结果"""
+        if self.allow_dangerous_operations or self.settings.sql_parser == 'sqlparse':
+            return self.is_query_safe(query), self.validate_database_context(query)
+        analysis = analyze(query)
+        return self._check_analysis_safety(analysis), self.validate_database_context(query, analysis)
     
     def is_query_safe(self, query: str) -> tuple[bool, str]:
-        """使用AST语法树检查查询是否安全"""
+        """检查查询是否安全（默认使用单遍词法分析，可通过MYSQL_SQL_PARSER=sqlparse切换为AST）"""
         # 如果允许危险操作，直接返回安全
         if self.allow_dangerous_operations:
             return True, ""
         
+        if self.settings.sql_parser == 'sqlparse':
+            return self._is_query_safe_sqlparse(query)
+        return self._check_analysis_safety(analyze(query))
+    
+    def _check_analysis_safety(self, analysis: QueryAnalysis) -> tuple[bool, str]:
+        """基于词法分析结果检查每条语句，规则与AST检查一致"""
+        if not analysis.statements:
+            return False, "无法解析SQL查询"
+        
+        for statement in analysis.statements:
+            is_safe, error_msg = self._check_lexed_statement(analysis, statement)
+            if not is_safe:
+                return False, error_msg
+        
+        return True, ""
+    
+    def _check_lexed_statement(self, analysis: QueryAnalysis, statement: Statement) -> tuple[bool, str]:
+        """检查词法分析得到的单条语句"""
+        if statement.keyword not in SAFE_COMMANDS:
+            return False, self._disallowed_command_message(statement.keyword)
+        
+        if statement.keyword == 'SELECT':
+            is_safe, error_msg = self._check_select_text(analysis.statement_upper(statement))
+            if not is_safe:
+                return False, error_msg
+            if statement.nested_dml is not None:
+                return False, self._nested_dml_message(statement.nested_dml)
+        
+        return True, ""
+    
+    def _disallowed_command_message(self, sql_keyword: str) -> str:
+        return self._get_message(
+            f"不允许的SQL命令: {sql_keyword}。仅允许SELECT、SHOW、DESCRIBE、EXPLAIN查询，除非在环境变量中启用危险操作。",
+            f"Disallowed SQL command: {sql_keyword}. Only SELECT, SHOW, DESCRIBE, EXPLAIN queries are allowed unless dangerous operations are enabled via environment variable."
+        )
+    
+    def _nested_dml_message(self, keyword: str) -> str:
+        return self._get_message(
+            f"在SELECT语句中检测到危险的{keyword}操作",
+            f"Detected dangerous {keyword} operation in SELECT statement"
+        )
+    
+    def _is_query_safe_sqlparse(self, query: str) -> tuple[bool, str]:
+        """使用sqlparse的AST语法树检查查询是否安全"""
         try:
+            import sqlparse
+            
             # 解析SQL为AST
             parsed = sqlparse.parse(query)
             
@@ -125,7 +367,7 @@ class MySQLHandler:
             # 如果解析失败，出于安全考虑拒绝查询
             return False, f"SQL解析失败，查询被拒绝: {str(e)}"
     
-    def _check_statement_safety(self, statement: sql.Statement) -> tuple[bool, str]:
+    def _check_statement_safety(self, statement: "sql.Statement") -> tuple[bool, str]:
         """检查单个SQL语句的安全性"""
         # 获取语句类型（第一个非空白token）
         first_token = None
@@ -140,15 +382,8 @@ class MySQLHandler:
         # 获取SQL命令关键字
         sql_keyword = self._extract_sql_keyword(first_token)
         
-        # 定义允许的SQL命令
-        safe_commands = {'SELECT', 'SHOW', 'DESCRIBE', 'DESC', 'EXPLAIN'}
-        
-        if sql_keyword not in safe_commands:
-            error_msg = self._get_message(
-                f"不允许的SQL命令: {sql_keyword}。仅允许SELECT、SHOW、DESCRIBE、EXPLAIN查询，除非在环境变量中启用危险操作。",
-                f"Disallowed SQL command: {sql_keyword}. Only SELECT, SHOW, DESCRIBE, EXPLAIN queries are allowed unless dangerous operations are enabled via environment variable."
-            )
-            return False, error_msg
+        if sql_keyword not in SAFE_COMMANDS:
+            return False, self._disallowed_command_message(sql_keyword)
         
         # 对SELECT语句进行深度安全检查
         if sql_keyword == 'SELECT':
@@ -158,6 +393,8 @@ class MySQLHandler:
     
     def _extract_sql_keyword(self, token) -> str:
         """提取SQL关键字"""
+        from sqlparse import tokens as T
+        
         if hasattr(token, 'ttype') and token.ttype is T.Keyword.DML:
             return token.value.upper()
         elif hasattr(token, 'ttype') and token.ttype is T.Keyword:
@@ -171,19 +408,19 @@ class MySQLHandler:
         # 兜底：直接取token值
         return str(token).upper().strip()
     
-    def _check_select_safety(self, statement: sql.Statement) -> tuple[bool, str]:
+    def _check_select_safety(self, statement: "sql.Statement") -> tuple[bool, str]:
         """检查SELECT语句的安全性"""
-        statement_str = str(statement).upper()
+        is_safe, error_msg = self._check_select_text(str(statement).upper())
+        if not is_safe:
+            return False, error_msg
         
+        # 使用AST检查嵌套的危险操作
+        return self._check_nested_dangerous_operations(statement)
+    
+    def _check_select_text(self, statement_str: str) -> tuple[bool, str]:
+        """检查SELECT语句文本（已转为大写）中的危险片段"""
         # 检查危险的SELECT操作
-        dangerous_constructs = [
-            ('INTO OUTFILE', 'SELECT INTO OUTFILE'),
-            ('INTO DUMPFILE', 'SELECT INTO DUMPFILE'),
-            ('LOAD_FILE(', '文件读取函数LOAD_FILE'),
-            ('@@', '系统变量访问'),
-        ]
-        
-        for construct, description in dangerous_constructs:
+        for construct, description in DANGEROUS_SELECT_CONSTRUCTS:
             if construct in statement_str:
                 error_msg = self._get_message(
                     f"检测到危险的{description}操作，查询被拒绝",
@@ -201,11 +438,12 @@ class MySQLHandler:
             )
             return False, error_msg
         
-        # 使用AST检查嵌套的危险操作
-        return self._check_nested_dangerous_operations(statement)
+        return True, ""
     
-    def _check_nested_dangerous_operations(self, statement: sql.Statement) -> tuple[bool, str]:
+    def _check_nested_dangerous_operations(self, statement: "sql.Statement") -> tuple[bool, str]:
         """递归检查嵌套的危险操作，如UNION注入"""
+        from sqlparse import tokens as T
+        
         def check_token_recursively(token):
             # 检查当前token
             if hasattr(token, 'ttype'):
@@ -213,11 +451,7 @@ class MySQLHandler:
                     keyword = token.value.upper()
                     dangerous_dml = {'INSERT', 'UPDATE', 'DELETE', 'DROP', 'ALTER', 'CREATE', 'TRUNCATE'}
                     if keyword in dangerous_dml:
-                        error_msg = self._get_message(
-                            f"在SELECT语句中检测到危险的{keyword}操作",
-                            f"Detected dangerous {keyword} operation in SELECT statement"
-                        )
-                        return False, error_msg
+                        return False, self._nested_dml_message(keyword)
             
             # 递归检查子token
             if hasattr(token, 'tokens'):
@@ -236,9 +470,10 @@ class MySQLHandler:
         
         return True, ""
     
-    def validate_database_context(self, query: str) -> tuple[bool, str]:
+    def validate_database_context(self, query: str, analysis: Optional[QueryAnalysis] = None) -> tuple[bool, str]:
         """验证查询是否在允许的数据库上下文中执行"""
-        query_upper = query.strip().upper()
+        # 已有词法分析结果时复用其大写文本，避免再次整体转换
+        query_upper = analysis.upper.strip() if analysis is not None else query.strip().upper()
         
         # 检查是否尝试切换数据库
         if 'USE ' in query_upper:
@@ -246,185 +481,1196 @@ class MySQLHandler:
         
         # 检查是否尝试访问其他数据库
         # 这个检查比较复杂，这里做简单的模式匹配
-        database_patterns = [
-            r'\b(?:FROM|JOIN|INTO|UPDATE)\s+([^\s\.]+)\.', # 表名前有数据库名
-            r'\bUSE\s+([^\s;]+)',  # USE database
-        ]
-        
-        for pattern in database_patterns:
-            matches = re.findall(pattern, query, re.IGNORECASE)
-            for match in matches:
-                if match.lower() != self.database.lower():
-                    return False, f"不允许访问其他数据库 '{match}'。只能在配置的数据库 '{self.database}' 中操作。"
+        database = self.database.lower()
+        for pattern in DATABASE_PATTERNS:
+            for match in pattern.finditer(query):
+                if match.group(1).lower() != database:
+                    return False, f"不允许访问其他数据库 '{match.group(1)}'。只能在配置的数据库 '{self.database}' 中操作。"
         
         return True, ""
     
+    @property
+    def metadata_cache(self) -> Optional[TTLCache[Tuple[Any, Any]]]:
+        """元数据缓存，MYSQL_METADATA_CACHE_TTL<=0时返回None"""
+        if self.settings.metadata_cache_ttl <= 0:
+            return None
+        cache = get_metadata_cache(self.settings.metadata_cache_size, self.settings.metadata_cache_ttl)
+        cache.ensure_policy((self.host, self.port, self.user, self.database))
+        return cache
+    
+    def invalidate_metadata(self) -> None:
+        """使库/表元数据缓存与成本闸门的执行计划缓存全部失效"""
+        if self.metadata_cache is not None:
+            self.metadata_cache.invalidate()
+        if self.cost_gate is not None:
+            self.cost_gate.plans.invalidate()
+    
+    @property
+    def result_cache(self) -> Optional[ResultCache]:
+        """只读查询结果缓存，MYSQL_RESULT_CACHE_BYTES<=0（默认）时返回None"""
+        settings = self.settings
+        if settings.result_cache_bytes <= 0 or settings.result_cache_ttl <= 0:
+            return None
+        cache = get_result_cache(settings.result_cache_bytes, settings.result_cache_ttl)
+        # 响应内容还取决于结果预算与值转换相关的配置
+        cache.ensure_policy((
+            self.host, self.port, self.user, self.database,
+            settings.result_max_rows, settings.result_max_bytes,
+            settings.result_max_cell_length, settings.decimal_as_string,
+        ))
+        return cache
+    
+    @property
+    def slow_log(self) -> Optional[SlowQueryLog]:
+        """慢查询日志，MYSQL_SLOW_QUERY_MS<=0时返回None"""
+        settings = self.settings
+        if settings.slow_query_ms <= 0:
+            return None
+        return get_slow_log(
+            settings.slow_query_ms / 1000,
+            settings.slow_log_size,
+            settings.slow_log_file,
+            settings.slow_log_explain,
+        )
+    
+    async def explain_json(self, query: str) -> Any:
+        """执行EXPLAIN FORMAT=JSON，返回解析后的执行计划；只读查询可以时在副本上执行"""
+        async def run():
+            async with self._read_connection(query) as (_, connection):
+                async with connection.cursor() as cursor:
+                    await cursor.execute(f"EXPLAIN FORMAT=JSON {query}")
+                    row = await cursor.fetchone()
+            return json.loads(row[0]) if row else None
+        
+        timeout = self.settings.query_timeout
+        return await asyncio.wait_for(run(), timeout) if timeout > 0 else await run()
+    
+    def _record_slow(self, query: str, active: Dict[str, Any], status: str, result: Optional[str] = None) -> None:
+        """执行时间（从借到连接起）超过阈值时记入慢查询日志"""
+        slow_log = self.slow_log
+        if slow_log is None or 'started' not in active:
+            return
+        duration = time.perf_counter() - active['started']
+        if duration < slow_log.threshold:
+            return
+        size = active.get('bytes')
+        if size is None and isinstance(result, str):
+            size = len(result) if result.isascii() else len(result.encode('utf-8'))
+        slow_log.record(
+            query, duration, active.get('rows'), size, status,
+            explainer=lambda: self.explain_json(query),
+        )
+    
+    @property
+    def cost_gate(self) -> Optional[CostGate]:
+        """执行前的EXPLAIN成本闸门，MYSQL_COST_GATE=off（默认）时返回None"""
+        settings = self.settings
+        if settings.cost_gate == 'off':
+            return None
+        return get_cost_gate(
+            settings.cost_gate,
+            settings.cost_gate_max_rows,
+            settings.cost_gate_full_scan_rows,
+            settings.cost_gate_limit,
+            settings.cost_gate_cache_ttl,
+        )
+    
+    async def _check_cost(self, query: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """通过安全检查的查询在执行前经过成本闸门，返回(要执行的查询, 闸门说明)；说明为None表示放行"""
+        gate = self.cost_gate
+        if gate is None or not gate.applies(query):
+            return query, None
+        with stage('cost_gate'):
+            return await gate.check(query, (self.database, fingerprint(query)), lambda: self.explain_json(query))
+    
+    def _cost_rejection(self, gate: Dict[str, Any]) -> str:
+        reasons = []
+        for violation in gate["violations"]:
+            if violation["rule"] == "examined_rows":
+                reasons.append(self._get_message(
+                    f"估计检查 {violation['examined_rows']} 行，超过上限 {violation['max_rows']}",
+                    f"estimated {violation['examined_rows']} examined rows exceeds {violation['max_rows']}"
+                ))
+            else:
+                table_scan = violation['access_type'] == 'ALL'
+                reasons.append(self._get_message(
+                    f"对表 {violation['table']} 的 {violation['rows']} 行做全{'表' if table_scan else '索引'}扫描",
+                    f"full {'table' if table_scan else 'index'} scan of {violation['rows']} rows on {violation['table']}"
+                ))
+        return encode_json({
+            "status": "error",
+            "message": self._get_message(
+                f"查询被成本闸门拒绝: {'；'.join(reasons)}。请添加使用索引的过滤条件或LIMIT",
+                f"Query rejected by cost gate: {'; '.join(reasons)}. Add an indexed filter or a LIMIT"
+            ),
+            "cost_gate": gate,
+        })
+    
+    @staticmethod
+    def _with_cost_note(result: str, gate: Optional[Dict[str, Any]]) -> str:
+        """在JSON对象响应中附上成本闸门的说明（查询被加上了LIMIT时）"""
+        if gate is None or not (result.startswith('{') and result.endswith('}')):
+            return result
+        return f'{result[:-1]},"cost_gate":{encode_json(gate)}}}'
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """安全检查判定缓存、元数据缓存、结果缓存与成本闸门执行计划缓存的命中统计"""
+        metadata = self.metadata_cache
+        results = self.result_cache
+        gate = self.cost_gate
+        return {
+            "safety_verdicts": get_verdict_cache(self.settings.safety_cache_size).stats(),
+            "metadata": metadata.stats() if metadata is not None else {"enabled": False},
+            "results": results.stats() if results is not None else {"enabled": False},
+            "cost_gate_plans": gate.plans.stats() if gate is not None else {"enabled": False},
+        }
+    
+    async def _schema_signature(self, connection) -> Tuple[Any, ...]:
+        """当前库的结构签名：表数量与最近的CREATE_TIME/UPDATE_TIME
+        
+        MySQL 8.0中这两列受information_schema_stats_expiry缓存影响，
+        需要及时感知变化时应将其设为0。
+        """
+        async with connection.cursor() as cursor:
+            await cursor.execute(
+                "SELECT COUNT(*), MAX(CREATE_TIME), MAX(UPDATE_TIME) "
+                "FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s",
+                (self.database,),
+            )
+            return tuple(await cursor.fetchone())
+    
+    async def _cached_metadata(self, key: Tuple[str, ...], loader, validate: bool = True):
+        """读取元数据：命中未过期的缓存时不访问数据库
+        
+        启用MYSQL_METADATA_CACHE_VALIDATE时，命中后还会比较结构签名，签名变化则整体失效。
+        loader接收连接并返回查询结果；空结果不缓存。
+        借用连接、比较签名与加载受MYSQL_QUERY_TIMEOUT限制，超时时KILL QUERY并抛出QueryTimeout。
+        """
+        cache = self.metadata_cache
+        validate = validate and cache is not None and self.settings.metadata_cache_validate
+        entry = cache.get(key) if cache is not None else None
+        if entry is not None and not validate:
+            return entry[1]
+        
+        async def run(active: Dict[str, Any]):
+            async with self.connection() as connection:
+                # 只记线程ID供超时时KILL QUERY；不记开始时刻，元数据查询不进入慢查询日志
+                active['thread_id'] = connection.thread_id()
+                signature = await self._schema_signature(connection) if validate else None
+                if entry is not None:
+                    if entry[0] == signature:
+                        return entry
+                    cache.invalidate()
+                with stage('execute'):
+                    return signature, await loader(connection)
+        
+        try:
+            loaded = await self._with_deadline(f"metadata {key}", run)
+        except QueryTimeout:
+            raise QueryTimeout(self._timeout_message()) from None
+        if loaded is not entry and cache is not None and loaded[1]:
+            cache.put(key, loaded)
+        return loaded[1]
+    
     async def list_databases(self) -> List[str]:
         """列出所有数据库（仅显示当前用户有权限的）"""
-        connection = None
-        try:
-            connection = await self.get_connection()
+        async def load(connection):
             async with connection.cursor() as cursor:
                 await cursor.execute("SHOW DATABASES")
-                databases = await cursor.fetchall()
-                db_list = [db[0] for db in databases]
-                # 突出显示当前配置的数据库
-                result = []
-                for db in db_list:
-                    if db == self.database:
-                        result.append(f"{db} (当前配置的数据库)")
-                    else:
-                        result.append(db)
-                return result
+                return tuple(db[0] for db in await cursor.fetchall())
+        
+        try:
+            # 库列表不受当前库表结构签名影响，依赖TTL与DDL失效
+            db_list = await self._cached_metadata(('databases',), load, validate=False)
+            # 突出显示当前配置的数据库
+            result = []
+            for db in db_list:
+                if db == self.database:
+                    result.append(f"{db} (当前配置的数据库)")
+                else:
+                    result.append(db)
+            return result
         except Exception as e:
             self.logger.error(f"列出数据库失败: {e}")
             raise Exception(f"获取数据库列表失败: {str(e)}")
-        finally:
-            if connection:
-                await connection.ensure_closed()
     
     async def list_tables(self) -> List[str]:
         """列出当前数据库中的所有表"""
-        connection = None
-        try:
-            connection = await self.get_connection()
+        async def load(connection):
             async with connection.cursor() as cursor:
                 await cursor.execute("SHOW TABLES")
-                tables = await cursor.fetchall()
-                return [table[0] for table in tables]
+                return tuple(table[0] for table in await cursor.fetchall())
+        
+        try:
+            return list(await self._cached_metadata(('tables',), load))
         except Exception as e:
             self.logger.error(f"列出表失败: {e}")
             raise Exception(f"获取表列表失败: {str(e)}")
-        finally:
-            if connection:
-                await connection.ensure_closed()
     
     async def describe_table(self, table_name: str) -> str:
         """描述表结构"""
-        connection = None
+        async def load(connection):
+            async with connection.cursor() as cursor:
+                await cursor.execute(f"DESCRIBE `{table_name}`")
+                return tuple(await cursor.fetchall())
+        
         try:
             # 验证表名（防止SQL注入）
-            if not re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', table_name):
+            if not IDENTIFIER_RE.match(table_name):
                 raise Exception("无效的表名格式")
             
-            connection = await self.get_connection()
-            async with connection.cursor() as cursor:
-                await cursor.execute(f"DESCRIBE `{table_name}`")
-                columns = await cursor.fetchall()
-                
-                if not columns:
-                    error_msg = self._get_message(
-                        f"表 '{table_name}' 不存在或无权限访问",
-                        f"Table '{table_name}' does not exist or access denied"
-                    )
-                    error_result = {
-                        "status": "error",
-                        "message": error_msg
-                    }
-                    return json.dumps(error_result, ensure_ascii=False, cls=DecimalEncoder)
-                
-                # 构建结构化的JSON响应
-                column_info = []
-                for column in columns:
-                    field, type_info, null, key, default, extra = column
-                    column_info.append({
-                        "field": field,
-                        "type": type_info,
-                        "null": null,
-                        "key": key,
-                        "default": default,
-                        "extra": extra
-                    })
-                
-                success_msg = self._get_message(
-                    f"表 '{table_name}' 包含 {len(columns)} 个字段",
-                    f"Table '{table_name}' contains {len(columns)} field(s)"
+            columns = await self._cached_metadata(('describe', table_name), load)
+            
+            if not columns:
+                error_msg = self._get_message(
+                    f"表 '{table_name}' 不存在或无权限访问",
+                    f"Table '{table_name}' does not exist or access denied"
                 )
-                result = {
-                    "status": "success",
-                    "message": success_msg,
-                    "table_name": table_name,
-                    "columns": column_info
+                error_result = {
+                    "status": "error",
+                    "message": error_msg
                 }
-                
-                return json.dumps(result, ensure_ascii=False, cls=DecimalEncoder)
+                return json.dumps(error_result, ensure_ascii=False, cls=DecimalEncoder)
+            
+            # 构建结构化的JSON响应
+            column_info = [self._column_record(*column) for column in columns]
+            
+            success_msg = self._get_message(
+                f"表 '{table_name}' 包含 {len(columns)} 个字段",
+                f"Table '{table_name}' contains {len(columns)} field(s)"
+            )
+            result = {
+                "status": "success",
+                "message": success_msg,
+                "table_name": table_name,
+                "columns": column_info
+            }
+            
+            return json.dumps(result, ensure_ascii=False, cls=DecimalEncoder)
         except Exception as e:
             self.logger.error(f"描述表结构失败: {e}")
             raise Exception(f"获取表 '{table_name}' 结构失败: {str(e)}")
-        finally:
-            if connection:
-                await connection.ensure_closed()
     
-    async def execute_query(self, query: str) -> str:
-        """执行SQL查询"""
-        connection = None
+    @staticmethod
+    def _column_record(field, type_info, null, key, default, extra) -> Dict[str, Any]:
+        """单个字段的描述，字段顺序与DESCRIBE的结果列一致"""
+        return {
+            "field": field,
+            "type": type_info,
+            "null": null,
+            "key": key,
+            "default": default,
+            "extra": extra
+        }
+    
+    async def _load_schema_rows(self, connection, tables: Tuple[str, ...]) -> Tuple[Tuple[Any, ...], ...]:
+        """在一次往返中读取TABLES、COLUMNS、STATISTICS三个结果集"""
+        condition = "TABLE_SCHEMA = %s"
+        params: List[Any] = [self.database]
+        if tables:
+            condition += f" AND TABLE_NAME IN ({', '.join(['%s'] * len(tables))})"
+            params.extend(tables)
+        query = "; ".join(template.format(where=condition) for template in SCHEMA_SNAPSHOT_QUERIES)
+        
+        results = []
+        async with connection.cursor() as cursor:
+            await cursor.execute(query, params * len(SCHEMA_SNAPSHOT_QUERIES))
+            results.append(tuple(await cursor.fetchall()))
+            while await cursor.nextset():
+                results.append(tuple(await cursor.fetchall()))
+        if len(results) != len(SCHEMA_SNAPSHOT_QUERIES):
+            raise Exception(f"information_schema返回了{len(results)}个结果集")
+        return tuple(results)
+    
+    @staticmethod
+    def _iter_schema_tables(table_rows, column_rows, index_rows):
+        """按表分组三个结果集（均已按表名排序），逐表生成快照记录"""
+        columns: Dict[str, List[Dict[str, Any]]] = {}
+        for table, *column in column_rows:
+            columns.setdefault(table, []).append(MySQLHandler._column_record(*column))
+        
+        indexes: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for table, index_name, non_unique, column_name, index_type in index_rows:
+            index = indexes.setdefault(table, {}).get(index_name)
+            if index is None:
+                index = indexes[table][index_name] = {
+                    "name": index_name,
+                    "unique": not int(non_unique),
+                    "type": index_type,
+                    "columns": [],
+                }
+            # 函数索引没有列名
+            index["columns"].append(column_name)
+        
+        for name, table_type, engine, table_rows_estimate, comment in table_rows:
+            table_indexes = list(indexes.pop(name, {}).values())
+            primary = next((i["columns"] for i in table_indexes if i["name"] == 'PRIMARY'), [])
+            yield {
+                "name": name,
+                "type": table_type,
+                "engine": engine,
+                # InnoDB的TABLE_ROWS是统计估算值，视图为null
+                "approx_rows": table_rows_estimate,
+                "comment": comment,
+                "columns": columns.pop(name, []),
+                "primary_key": primary,
+                "indexes": table_indexes,
+            }
+    
+    async def schema_snapshot(self, tables: Optional[List[str]] = None) -> str:
+        """一次性返回全部（或指定）表的字段、主键、索引与估算行数"""
+        try:
+            requested = tuple(dict.fromkeys(tables or ()))
+            
+            async def load(connection):
+                return await self._load_schema_rows(connection, requested)
+            
+            table_rows, column_rows, index_rows = await self._cached_metadata(('snapshot', requested), load)
+            
+            found = {row[0] for row in table_rows}
+            missing = [name for name in requested if name not in found]
+            message = self._get_message(
+                f"数据库 '{self.database}' 包含 {len(table_rows)} 个表",
+                f"Database '{self.database}' contains {len(table_rows)} table(s)"
+            )
+            header = {
+                "status": "success",
+                "message": message,
+                "database": self.database,
+                "table_count": len(table_rows),
+                "missing": missing,
+            }
+            # 逐表编码后拼接，大型库不必先构建整个快照的嵌套结构再统一编码
+            parts = [encode_json(header)[:-1], ',"tables":[']
+            for i, table in enumerate(self._iter_schema_tables(table_rows, column_rows, index_rows)):
+                if i:
+                    parts.append(',')
+                parts.append(encode_json(table))
+            parts.append(']}')
+            return ''.join(parts)
+        except Exception as e:
+            self.logger.error(f"获取库结构快照失败: {e}")
+            raise Exception(f"获取数据库结构失败: {str(e)}")
+    
+    def _conversion_plan(self, description, rows) -> ConversionPlan:
+        """根据cursor.description为结果集生成一次按列转换计划"""
+        if not description:
+            width = len(rows[0]) if rows else 0
+            description = [(f"column_{i}",) for i in range(width)]
+        return ConversionPlan(
+            description,
+            decimal_as_string=self.settings.decimal_as_string,
+            max_cell_length=self.settings.result_max_cell_length,
+            native_datetime=NATIVE_DATETIME,
+        )
+    
+    def _convert_rows(
+        self, plan: ConversionPlan, rows, max_bytes: int = 0, result_format: str = 'objects'
+    ) -> Tuple[Any, int]:
+        """按转换计划转换结果行并组织为指定格式，返回结果与实际包含的行数
+        
+        max_bytes大于0时按块转换并累计编码后的大小，超出预算的块内再逐行确定截断位置。
+        """
+        columns = plan.columns
+        if max_bytes <= 0 or not rows:
+            return shape_columns(columns, plan.convert(rows), result_format), len(rows)
+        
+        used = encoded_size(columns) + 2
+        chunks = []
+        count = 0
+        for start in range(0, len(rows), CONVERT_CHUNK_ROWS):
+            batch = rows[start:start + CONVERT_CHUNK_ROWS]
+            values = plan.convert(batch)
+            shaped = shape_columns(columns, values, result_format)
+            size = encoded_size(shaped)
+            if used + size <= max_bytes:
+                used += size
+                chunks.append(shaped)
+                count += len(batch)
+                continue
+            # 超出预算的块：逐行累计
+            kept = 0
+            for row in shape_columns(columns, values, 'objects' if result_format == 'objects' else 'rows'):
+                used += encoded_size(row) + 1
+                if used > max_bytes:
+                    break
+                kept += 1
+            if kept:
+                chunks.append(shape_columns(columns, [v[:kept] for v in values], result_format))
+                count += kept
+            break
+        
+        if len(chunks) == 1:
+            return chunks[0], count
+        if result_format == 'columnar':
+            merged = [[] for _ in columns]
+            for chunk in chunks:
+                for column, part in zip(merged, chunk):
+                    column.extend(part)
+            return merged, count
+        return [row for chunk in chunks for row in chunk], count
+    
+    def _invalid_format_message(self, result_format: str) -> str:
+        return encode_json({
+            "status": "error",
+            "message": self._get_message(
+                f"不支持的返回格式 '{result_format}'，可选: {', '.join(RESULT_FORMATS)}",
+                f"Unsupported result format '{result_format}', expected one of: {', '.join(RESULT_FORMATS)}"
+            ),
+        })
+    
+    async def _estimate_total_rows(self, connection, query: str) -> Optional[int]:
+        """用EXPLAIN估算原查询的结果行数（连接/过滤后的基数估计），失败时返回None"""
+        if not query.lstrip().upper().startswith('SELECT'):
+            return None
+        try:
+            async with connection.cursor() as cursor:
+                await cursor.execute(f"EXPLAIN {query}")
+                plan = await cursor.fetchall()
+                names = [desc[0] for desc in cursor.description or ()]
+            if not plan or 'rows' not in names:
+                return None
+            id_idx = names.index('id') if 'id' in names else None
+            rows_idx = names.index('rows')
+            filtered_idx = names.index('filtered') if 'filtered' in names else None
+            first_id = plan[0][id_idx] if id_idx is not None else None
+            estimate = 1.0
+            for step in plan:
+                # 只统计最外层SELECT（与第一行相同的id）参与连接的各表
+                if id_idx is not None and step[id_idx] != first_id:
+                    continue
+                if step[rows_idx] is None:
+                    continue
+                filtered = step[filtered_idx] if filtered_idx is not None and step[filtered_idx] is not None else 100
+                estimate *= float(step[rows_idx]) * float(filtered) / 100
+            return int(estimate)
+        except Exception as e:
+            self.logger.warning(f"估算结果行数失败: {e}")
+            return None
+    
+    @property
+    def streams(self) -> StreamRegistry:
+        """进程内共享的流式游标注册表"""
+        return get_stream_registry(
+            idle_ttl=self.settings.stream_idle_ttl,
+            max_cursors=self.settings.stream_max_cursors,
+        )
+    
+    def _clamp_page_size(self, page_size: Optional[int]) -> int:
+        if not page_size or page_size < 1:
+            return self.settings.stream_max_page_size
+        return min(page_size, self.settings.stream_max_page_size)
+    
+    def _page_result(self, session: StreamSession, rows) -> str:
+        """构造一页流式结果，结果未读完时附带续传令牌"""
+        first_row = session.rows_fetched - len(rows) + 1
+        if session.plan is None:
+            session.plan = self._conversion_plan(session.description, rows)
+        plan = session.plan
+        truncated_before = plan.truncated_cells
+        with stage('convert'):
+            data, _ = self._convert_rows(plan, rows, result_format=session.result_format)
+        add_metric('rows', len(rows))
+        if rows:
+            success_msg = self._get_message(
+                f"查询执行成功，返回第 {first_row}-{session.rows_fetched} 行结果",
+                f"Query executed successfully, returned rows {first_row}-{session.rows_fetched}"
+            )
+        else:
+            success_msg = self._get_message("查询执行成功，但没有返回结果", "Query executed successfully, but no results returned")
+        with stage('encode'):
+            response = encode_json({
+                "status": "success",
+                "message": success_msg,
+                "format": session.result_format,
+                "columns": plan.columns,
+                "data": data,
+                "truncated_cells": plan.truncated_cells - truncated_before,
+                "cursor": {
+                    "token": None if session.done else session.token,
+                    "has_more": not session.done,
+                    "rows_fetched": session.rows_fetched,
+                    "idle_ttl": self.settings.stream_idle_ttl,
+                },
+            })
+        add_metric('bytes', len(response))
+        return response
+    
+    async def _execute_streaming(self, query: str, page_size: Optional[int], result_format: str) -> str:
+        """通过服务端游标执行查询，只读取第一页"""
+        streams = self.streams
+        if not streams.has_capacity():
+            await streams.reap()
+        if not streams.has_capacity():
+            return self._get_message(
+                f"查询被拒绝: 打开的流式游标已达上限 ({streams.max_cursors})，请先读完或关闭已有游标",
+                f"Query rejected: too many open stream cursors ({streams.max_cursors}), finish or close an existing cursor first"
+            )
+        page_size = self._clamp_page_size(page_size)
+        
+        async def run(active: Dict[str, Any]):
+            with stage('execute'):
+                return await streams.open(
+                    self.pool, query, page_size, result_format=result_format, active=active,
+                    reset=leaves_session_state(query), router=self._read_router(query),
+                )
+        
+        # 打开游标与读取第一页受MYSQL_QUERY_TIMEOUT限制，超时或取消时KILL QUERY并丢弃连接。
+        # 不加MAX_EXECUTION_TIME提示：服务器按整条语句计时，会在翻页途中中止游标
+        session, rows = await self._with_deadline(query, run)
+        return self._page_result(session, rows)
+    
+    async def fetch_page(self, cursor_token: str, page_size: Optional[int] = None) -> str:
+        """读取流式游标的下一页"""
+        try:
+            with stage('execute'):
+                session, rows = await self.streams.fetch(cursor_token, self._clamp_page_size(page_size))
+        except KeyError:
+            return json.dumps({
+                "status": "error",
+                "message": self._get_message(
+                    "游标不存在或已因空闲超时关闭，请重新执行查询",
+                    "Cursor not found or closed after idle timeout, please re-run the query"
+                ),
+            }, ensure_ascii=False)
+        except Exception as e:
+            self.logger.error(f"读取游标失败: {e}")
+            return f"查询执行失败: {str(e)}"
+        return self._page_result(session, rows)
+    
+    async def close_cursor(self, cursor_token: str) -> bool:
+        """关闭流式游标并归还连接，返回游标是否存在"""
+        return await self.streams.close(cursor_token)
+    
+    async def execute_query(
+        self,
+        query: str,
+        page_size: Optional[int] = None,
+        result_format: Optional[str] = None,
+        summarize: bool = False,
+    ) -> str:
+        """执行SQL查询；指定page_size时以服务端游标分页读取读查询的结果
+        
+        result_format可选objects（默认）、rows或columnar，见encoding.RESULT_FORMATS。
+        summarize为True时读取全部结果但只返回每列的统计摘要与少量抽样行（见summary）。
+        """
+        result_format = result_format or 'objects'
+        if result_format not in RESULT_FORMATS:
+            return self._invalid_format_message(result_format)
         try:
-            # 安全性检查
-            is_safe, safety_msg = self.is_query_safe(query)
+            # 安全性检查与数据库上下文检查（按查询指纹缓存）
+            with stage('validate'):
+                (is_safe, safety_msg), (is_valid_context, context_msg) = self.check_query(query)
             if not is_safe:
                 rejected_msg = self._get_message("查询被拒绝", "Query rejected")
                 return f"{rejected_msg}: {safety_msg}"
             
-            # 数据库上下文检查
-            is_valid_context, context_msg = self.validate_database_context(query)
             if not is_valid_context:
                 rejected_msg = self._get_message("查询被拒绝", "Query rejected")
                 return f"{rejected_msg}: {context_msg}"
             
-            connection = await self.get_connection()
+            # 只有单条只读语句走读路径，其余按写操作执行
+            is_read_query = is_read_only(query)
+            
+            if summarize and not is_read_query:
+                return self._get_message("摘要模式只支持只读查询", "Summarize mode only supports read-only queries")
+            if not is_read_query:
+                return await self._with_deadline(query, lambda active: self._execute_write(query, active))
+            
+            # 成本闸门：按EXPLAIN的估计拒绝或限制高成本的SELECT
+            query, gate = await self._check_cost(query)
+            if gate is not None and gate["action"] == "rejected":
+                return self._cost_rejection(gate)
+            
+            if summarize:
+                result = await self._with_deadline(
+                    query, lambda active: self._execute_summary(query, result_format, active)
+                )
+            elif page_size is not None:
+                result = await self._execute_streaming(query, page_size, result_format)
+            else:
+                result = await self._read_query(query, result_format)
+            return self._with_cost_note(result, gate)
+        
+        except QueryTimeout:
+            return self._timeout_message()
+        except Exception as e:
+            self.logger.error(f"执行查询失败: {e}")
+            return f"查询执行失败: {str(e)}"
+    
+    async def execute_queries(self, queries: List[str], result_format: Optional[str] = None, admit=None) -> str:
+        """并发执行多条互不依赖的只读查询，按输入顺序返回每条查询的结果或错误
+        
+        每条查询单独做安全检查与数据库上下文检查，最多MYSQL_BATCH_FANOUT条同时在各自的连接上执行。
+        admit(lane)返回异步上下文管理器时，每条查询在执行前各自取得准入槽位。
+        """
+        result_format = result_format or 'objects'
+        if result_format not in RESULT_FORMATS:
+            return self._invalid_format_message(result_format)
+        max_queries = self.settings.batch_max_queries
+        if not queries or len(queries) > max_queries:
+            return encode_json({
+                "status": "error",
+                "message": self._get_message(
+                    f"查询数量必须在1到{max_queries}之间",
+                    f"Expected between 1 and {max_queries} queries"
+                ),
+            })
+        
+        fanout = asyncio.Semaphore(max(1, self.settings.batch_fanout))
+        
+        async def run(query: str) -> Tuple[bool, str]:
+            async with fanout:
+                if admit is None:
+                    return await self._batch_item(query, result_format)
+                try:
+                    async with admit('query'):
+                        return await self._batch_item(query, result_format)
+                except AdmissionRejected as e:
+                    return False, encode_json({
+                        "status": "error",
+                        "message": self._get_message("服务器繁忙，未获得执行槽位", "Server busy, no execution slot available"),
+                        "reason": e.reason,
+                    })
+        
+        outcomes = await asyncio.gather(*(run(query) for query in queries))
+        results = [result for _, result in outcomes]
+        failed = sum(1 for ok, _ in outcomes if not ok)
+        header = encode_json({
+            "status": "success",
+            "message": self._get_message(
+                f"执行了 {len(results)} 条查询，{len(results) - failed} 条成功，{failed} 条失败",
+                f"Ran {len(results)} quer{'y' if len(results) == 1 else 'ies'}: "
+                f"{len(results) - failed} succeeded, {failed} failed"
+            ),
+            "format": result_format,
+        })
+        # 各条结果已是编码好的JSON对象，直接拼接，不再解码重编码
+        return f'{header[:-1]},"results":[{",".join(results)}]}}'
+    
+    async def _batch_item(self, query: str, result_format: str) -> Tuple[bool, str]:
+        """批量执行中的一条查询，返回(是否成功, 编码后的JSON对象)，错误也以JSON对象返回"""
+        def error(message: str) -> Tuple[bool, str]:
+            return False, encode_json({"status": "error", "message": message})
+        
+        with stage('validate'):
+            (is_safe, safety_msg), (is_valid_context, context_msg) = self.check_query(query)
+        if not is_safe or not is_valid_context:
+            rejected_msg = self._get_message("查询被拒绝", "Query rejected")
+            return error(f"{rejected_msg}: {safety_msg if not is_safe else context_msg}")
+        if not is_read_only(query):
+            return error(self._get_message(
+                "批量执行只支持只读查询，写操作请使用execute_query",
+                "Batches only run read-only queries, use execute_query for writes"
+            ))
+        try:
+            query, gate = await self._check_cost(query)
+            if gate is not None and gate["action"] == "rejected":
+                return False, self._cost_rejection(gate)
+            return True, self._with_cost_note(await self._read_query(query, result_format), gate)
+        except QueryTimeout:
+            return error(self._timeout_message())
+        except Exception as e:
+            self.logger.error(f"执行查询失败: {e}")
+            return error(self._get_message(f"查询执行失败: {str(e)}", f"Query failed: {str(e)}"))
+    
+    async def _read_query(self, query: str, result_format: str) -> str:
+        """在查询期限内执行只读查询，可缓存的查询经过结果缓存"""
+        def load():
+            return self._with_deadline(query, lambda active: self._execute_read(query, result_format, active))
+        
+        cache = self.result_cache
+        if cache is not None and is_cacheable(query):
+            key = (self.database, normalize_query(query), result_format)
+            return await cache.get_or_load(key, load)
+        return await load()
+    
+    def _timeout_message(self, timeout: Optional[float] = None) -> str:
+        timeout = self.settings.query_timeout if timeout is None else timeout
+        return self._get_message(
+            f"查询执行超时：超过 {timeout:g} 秒，已中止",
+            f"Query timed out after {timeout:g}s and was cancelled"
+        )
+    
+    async def _max_statement_bytes(self, connection) -> int:
+        """批量写入时单条多行INSERT语句的字节上限：不超过服务器的max_allowed_packet
+
+        同一次往返读取服务器版本，决定upsert是否使用行别名。
+        """
+        if self._max_allowed_packet is None:
             async with connection.cursor() as cursor:
-                await cursor.execute(query)
-                
-                # 如果是SELECT查询，获取结果
-                if query.strip().upper().startswith(('SELECT', 'SHOW', 'DESCRIBE', 'EXPLAIN')):
-                    results = await cursor.fetchall()
-                    
-                    if not results:
-                        no_results_msg = self._get_message("查询执行成功，但没有返回结果", "Query executed successfully, but no results returned")
-                        return json.dumps({"status": "success", "message": no_results_msg, "data": []}, ensure_ascii=False, cls=DecimalEncoder)
-                    
-                    # 获取列名
-                    columns = [desc[0] for desc in cursor.description] if cursor.description else []
-                    
-                    # 转换为字典列表格式
-                    data = []
-                    for row in results:
-                        row_dict = {}
-                        for i, value in enumerate(row):
-                            col_name = columns[i] if i < len(columns) else f"column_{i}"
-                            # 处理特殊类型
-                            if value is None:
-                                row_dict[col_name] = None
-                            elif isinstance(value, Decimal):
-                                # 将Decimal转换为float，保持数值精度
-                                row_dict[col_name] = float(value)
-                            elif hasattr(value, 'isoformat'):  # datetime对象
-                                row_dict[col_name] = value.isoformat()
-                            else:
-                                row_dict[col_name] = value
-                        data.append(row_dict)
-                    
-                    success_msg = self._get_message(
-                        f"查询执行成功，返回 {len(data)} 行结果", 
-                        f"Query executed successfully, returned {len(data)} row(s)"
+                await cursor.execute("SELECT @@max_allowed_packet, VERSION()")
+                packet, version = await cursor.fetchone()
+            self._row_alias = supports_row_alias(str(version))
+            self._max_allowed_packet = int(packet)
+        return max(1, min(self.settings.bulk_max_statement_bytes, self._max_allowed_packet - PACKET_OVERHEAD))
+    
+    async def bulk_insert(
+        self, table: str, columns: List[str], rows: List[List[Any]], upsert: bool = False
+    ) -> str:
+        """参数绑定的批量插入/更新（仅危险模式）
+        
+        行数据通过executemany绑定参数，由驱动打包为不超过max_allowed_packet的多行INSERT；
+        每MYSQL_BULK_COMMIT_ROWS行提交一次，每次提交的分块受MYSQL_QUERY_TIMEOUT限制。
+        upsert为True时使用ON DUPLICATE KEY UPDATE覆盖所有给定列（MySQL 8.0.19+引用行别名，否则用VALUES()）。
+        """
+        def error(message: str, **extra: Any) -> str:
+            return encode_json({"status": "error", "message": message, **extra})
+        
+        if not self.allow_dangerous_operations:
+            return error(self._get_message(
+                "批量写入需要启用危险操作（MYSQL_ALLOW_DANGEROUS=true）",
+                "Bulk insert requires dangerous operations to be enabled (MYSQL_ALLOW_DANGEROUS=true)"
+            ))
+        invalid = [name for name in [table, *columns] if not IDENTIFIER_RE.match(name)]
+        if invalid or not columns or len(set(columns)) != len(columns):
+            return error(self._get_message(
+                f"无效的表名或列名: {', '.join(invalid) or '列名为空或重复'}",
+                f"Invalid table or column names: {', '.join(invalid) or 'empty or duplicate columns'}"
+            ))
+        max_rows = self.settings.bulk_max_rows
+        if not rows or len(rows) > max_rows:
+            return error(self._get_message(
+                f"行数必须在1到{max_rows}之间",
+                f"Expected between 1 and {max_rows} rows"
+            ))
+        width = len(columns)
+        bad = next((i for i, row in enumerate(rows) if not isinstance(row, (list, tuple)) or len(row) != width), None)
+        if bad is not None:
+            return error(self._get_message(
+                f"第 {bad} 行的值数量与列数（{width}）不一致",
+                f"Row {bad} does not have {width} value(s)"
+            ))
+        
+        column_list = ", ".join(f"`{name}`" for name in columns)
+        prefix = f"INSERT INTO `{table}` ({column_list}) VALUES "
+        values = f"({', '.join(['%s'] * width)})"
+        commit_rows = self.settings.bulk_commit_rows or len(rows)
+        
+        start = time.perf_counter()
+        committed = 0
+        affected = 0
+        commits = 0
+        try:
+            async with self.connection() as connection:
+                max_statement = await self._max_statement_bytes(connection)
+                postfix = ""
+                if upsert and self._row_alias:
+                    postfix = " AS new ON DUPLICATE KEY UPDATE " + ", ".join(
+                        f"`{name}` = new.`{name}`" for name in columns
                     )
-                    return json.dumps({
-                        "status": "success",
-                        "message": success_msg,
-                        "columns": columns,
-                        "data": data
-                    }, ensure_ascii=False, cls=DecimalEncoder)
+                elif upsert:
+                    postfix = " ON DUPLICATE KEY UPDATE " + ", ".join(
+                        f"`{name}` = VALUES(`{name}`)" for name in columns
+                    )
+                sql = prefix + values + postfix
+                
+                async def write_chunk(chunk: List[List[Any]], active: Dict[str, Any]) -> int:
+                    # 只记线程ID供超时时KILL QUERY；语句是带占位符的模板，不进入慢查询日志
+                    active['thread_id'] = connection.thread_id()
+                    await connection.begin()
+                    try:
+                        with stage('execute'):
+                            async with connection.cursor() as cursor:
+                                # 驱动将VALUES子句打包为多行INSERT，每条语句不超过该长度
+                                cursor.max_stmt_length = max_statement
+                                if self._row_alias and upsert:
+                                    # executemany只打包以ON DUPLICATE开头的后缀，行别名写法会退化为逐行执行，
+                                    # 这里直接调用它内部的多行打包
+                                    count = await cursor._do_execute_many(
+                                        prefix, values, postfix, chunk, max_statement, connection.encoding
+                                    )
+                                else:
+                                    count = await cursor.executemany(sql, chunk)
+                            await connection.commit()
+                    except asyncio.CancelledError:
+                        # 超时后语句可能仍在执行：关闭连接（服务器回滚未提交的事务），不再用于后续分块
+                        connection.close()
+                        raise
+                    except Exception:
+                        await connection.rollback()
+                        raise
+                    return count or 0
+                
+                for offset in range(0, len(rows), commit_rows):
+                    chunk = rows[offset:offset + commit_rows]
+                    # 期限按提交分块计算：每块是一个事务，超时只中止当前块
+                    try:
+                        affected += await self._with_deadline(
+                            sql, lambda active, chunk=chunk: write_chunk(chunk, active)
+                        )
+                    except QueryTimeout:
+                        raise QueryTimeout(self._timeout_message()) from None
+                    committed += len(chunk)
+                    commits += 1
+                    add_metric('rows', len(chunk))
+        except Exception as e:
+            self.logger.error(f"批量写入失败: {e}")
+            return error(
+                self._get_message(
+                    f"批量写入失败，已提交 {committed} 行: {str(e)}",
+                    f"Bulk insert failed after committing {committed} row(s): {str(e)}"
+                ),
+                rows_committed=committed,
+            )
+        finally:
+            if self.result_cache is not None:
+                self.result_cache.invalidate()
+        
+        elapsed = time.perf_counter() - start
+        return encode_json({
+            "status": "success",
+            "message": self._get_message(
+                f"写入 {committed} 行，提交 {commits} 次",
+                f"Wrote {committed} row(s) in {commits} commit(s)"
+            ),
+            "table": table,
+            "rows_committed": committed,
+            "affected_rows": affected,
+            "commits": commits,
+            "elapsed_ms": elapsed * 1000,
+            "rows_per_second": committed / elapsed if elapsed > 0 else None,
+        })
+    
+    async def export_query(
+        self, query: str, file_name: Optional[str] = None, export_format: str = 'ndjson', compress: bool = False
+    ) -> str:
+        """将只读查询的完整结果流式写入MYSQL_EXPORT_DIR下的NDJSON或CSV文件
+        
+        结果通过服务端游标每次读取MYSQL_EXPORT_CHUNK_ROWS行，转换编码后由后台线程写入（可选gzip），
+        写入与读取下一块重叠进行，内存占用与结果集大小无关。期限为MYSQL_EXPORT_TIMEOUT；
+        超时、出错或调用被取消时删除未完成的文件。
+        """
+        def error(message: str, **extra: Any) -> str:
+            return encode_json({"status": "error", "message": message, **extra})
+        
+        directory = self.settings.export_dir
+        if not directory:
+            return error(self._get_message(
+                "未配置导出目录（MYSQL_EXPORT_DIR），无法导出到文件",
+                "Exporting is disabled, set MYSQL_EXPORT_DIR to enable it"
+            ))
+        if export_format not in EXPORT_FORMATS:
+            return error(self._get_message(
+                f"不支持的导出格式 '{export_format}'，可选: {', '.join(EXPORT_FORMATS)}",
+                f"Unsupported export format '{export_format}', expected one of: {', '.join(EXPORT_FORMATS)}"
+            ))
+        with stage('validate'):
+            (is_safe, safety_msg), (is_valid_context, context_msg) = self.check_query(query)
+        if not is_safe or not is_valid_context:
+            rejected_msg = self._get_message("查询被拒绝", "Query rejected")
+            return error(f"{rejected_msg}: {safety_msg if not is_safe else context_msg}")
+        if not is_read_only(query):
+            return error(self._get_message("只能导出只读查询的结果", "Only read-only queries can be exported"))
+        
+        try:
+            path = export_path(directory, file_name, export_format, compress)
+            writer = ExportWriter(path, compress)
+            writer.open()
+        except ExportError as e:
+            return error(self._get_message(
+                f"无效的文件名或文件已存在: {e}",
+                f"Invalid file name or file already exists: {e}"
+            ))
+        except OSError as e:
+            return error(self._get_message(f"无法创建导出文件: {e}", f"Cannot create export file: {e}"))
+        
+        timeout = self.settings.export_timeout
+        start = time.perf_counter()
+        try:
+            outcome = await self._with_deadline(
+                query, lambda active: self._export_rows(query, writer, export_format, active), timeout=timeout
+            )
+            size = await writer.finish()
+        except BaseException as e:
+            await writer.abort()
+            if isinstance(e, QueryTimeout):
+                return error(self._timeout_message(timeout))
+            if isinstance(e, ExportError):
+                return error(self._get_message(f"文件已存在: {e}", f"File already exists: {e}"))
+            if not isinstance(e, Exception):
+                raise
+            self.logger.error(f"导出查询结果失败: {e}")
+            return error(self._get_message(f"导出失败: {str(e)}", f"Export failed: {str(e)}"))
+        
+        elapsed = time.perf_counter() - start
+        rows = outcome["rows"]
+        add_metric('bytes', size)
+        if outcome["truncated"]:
+            message = self._get_message(
+                f"已导出前 {rows} 行（达到MYSQL_EXPORT_MAX_ROWS上限）到 {path}",
+                f"Exported the first {rows} row(s) (MYSQL_EXPORT_MAX_ROWS reached) to {path}"
+            )
+        else:
+            message = self._get_message(f"已导出 {rows} 行到 {path}", f"Exported {rows} row(s) to {path}")
+        return encode_json({
+            "status": "success",
+            "message": message,
+            "path": path,
+            "format": export_format,
+            "compressed": compress,
+            "rows": rows,
+            "bytes": size,
+            "uncompressed_bytes": writer.bytes_written,
+            "columns": outcome["columns"],
+            "truncated": outcome["truncated"],
+            "elapsed_ms": elapsed * 1000,
+            "rows_per_second": rows / elapsed if elapsed > 0 else None,
+        })
+    
+    @asynccontextmanager
+    async def _unbuffered_cursor(self, query: str, active: Dict[str, Any], timeout: float):
+        """借用只读连接并通过SSCursor执行查询，结果由调用方逐块读取，不在内存中缓冲
+        
+        调用方读完全部结果后将active["drained"]设为True；否则结束时关闭该连接，
+        未读完的无缓冲结果会让连接处于不可复用的状态。
+        """
+        import aiomysql
+        
+        async with self._read_connection(query) as (pool, connection):
+            active['thread_id'] = connection.thread_id()
+            active['pool'] = pool
+            active['started'] = time.perf_counter()
+            cursor = connection.cursor(aiomysql.SSCursor)
+            try:
+                with stage('execute'):
+                    await cursor.execute(with_execution_time(query, int(timeout * 1000)))
+                yield cursor
+            finally:
+                if active.pop('drained', False):
+                    await cursor.close()
                 else:
-                    # 对于非SELECT查询（如果允许的话）
-                    affected_rows = cursor.rowcount
-                    await connection.commit()
-                    return f"查询执行成功，影响了 {affected_rows} 行。"
-                    
+                    connection.close()
+        del active['thread_id']
+    
+    async def _export_rows(
+        self, query: str, writer: ExportWriter, export_format: str, active: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """通过SSCursor按块读取结果并交给writer，返回行数、列信息与是否截断"""
+        chunk_rows = self.settings.export_chunk_rows
+        max_rows = self.settings.export_max_rows
+        rows = 0
+        truncated = False
+        async with self._unbuffered_cursor(query, active, self.settings.export_timeout) as cursor:
+            description = cursor.description or ()
+            # 导出的文件不截断单元格；CSV中的DECIMAL按字符串写出以保留精度
+            plan = ConversionPlan(
+                description,
+                decimal_as_string=self.settings.decimal_as_string or export_format == 'csv',
+                native_datetime=NATIVE_DATETIME and export_format == 'ndjson',
+            )
+            if export_format == 'csv':
+                await writer.write(encode_csv((), header=plan.columns))
+            while True:
+                limit = chunk_rows
+                if max_rows > 0:
+                    if rows >= max_rows:
+                        truncated = bool(await cursor.fetchmany(1))
+                        active['drained'] = not truncated
+                        break
+                    limit = min(chunk_rows, max_rows - rows)
+                with stage('execute'):
+                    batch = await cursor.fetchmany(limit)
+                if not batch:
+                    active['drained'] = True
+                    break
+                with stage('convert'):
+                    values = plan.convert(batch)
+                with stage('encode'):
+                    if export_format == 'csv':
+                        data = encode_csv(values)
+                    else:
+                        data = encode_ndjson(plan.columns, values)
+                # 等待上一块写完后提交本块，随后读取下一块
+                await writer.write(data)
+                rows += len(batch)
+                active['rows'] = rows
+                add_metric('rows', len(batch))
+        active['bytes'] = writer.bytes_written
+        return {"rows": rows, "columns": column_schema(description), "truncated": truncated}
+    
+    async def _with_deadline(self, query: str, run, timeout: Optional[float] = None):
+        """在期限内（默认MYSQL_QUERY_TIMEOUT）执行run(active)
+        
+        run借到连接后将其线程ID记入active["thread_id"]、所属连接池记入active["pool"]（默认主库）、
+        开始执行的时刻记入active["started"]、结果行数记入active["rows"]。超时或工具调用被取消时，
+        在旁路连接上对该线程执行KILL QUERY，使服务器立即停止执行并释放连接。执行时间超过慢查询阈值时记入慢查询日志。
+        """
+        if timeout is None:
+            timeout = self.settings.query_timeout
+        active: Dict[str, Any] = {}
+        try:
+            if timeout > 0:
+                result = await asyncio.wait_for(run(active), timeout + CLIENT_TIMEOUT_GRACE)
+            else:
+                result = await run(active)
+            self._record_slow(query, active, 'ok', result)
+            return result
+        except asyncio.TimeoutError:
+            self._record_slow(query, active, 'timeout')
+            if 'thread_id' in active:
+                await active.get('pool', self.pool).kill_query(active['thread_id'])
+            raise QueryTimeout()
+        except asyncio.CancelledError:
+            if 'thread_id' in active:
+                # 当前任务已被取消，KILL QUERY放到后台完成（在执行查询的那台服务器上）
+                pool = active.get('pool', self.pool)
+                task = asyncio.get_running_loop().create_task(pool.kill_query(active['thread_id']))
+                self._kill_tasks.add(task)
+                task.add_done_callback(self._kill_tasks.discard)
+            raise
         except Exception as e:
-            if connection:
+            if e.args and e.args[0] == ER_QUERY_TIMEOUT:
+                self._record_slow(query, active, 'timeout')
+                raise QueryTimeout() from e
+            self._record_slow(query, active, 'error')
+            raise
+    
+    async def _execute_write(self, query: str, active: Dict[str, Any]) -> str:
+        """在显式事务中执行非只读查询（仅在允许危险操作时到达这里）
+
+        语句可能留下会话状态（SET、LOCK TABLES、GET_LOCK、临时表），归还连接前重置会话。
+        """
+        async with self.connection(reset=True) as connection:
+            active['thread_id'] = connection.thread_id()
+            active['started'] = time.perf_counter()
+            await connection.begin()
+            try:
+                with stage('execute'):
+                    async with connection.cursor() as cursor:
+                        await cursor.execute(query)
+                        affected_rows = active['rows'] = cursor.rowcount
+                    await connection.commit()
+            except Exception:
                 await connection.rollback()
-            self.logger.error(f"执行查询失败: {e}")
-            return f"查询执行失败: {str(e)}"
-        finally:
-            if connection:
-                await connection.ensure_closed()
\ No newline at end of file
+                raise
+            finally:
+                # DDL会隐式提交，失败时也可能已部分生效
+                if changes_schema(query):
+                    self.invalidate_metadata()
+                if self.result_cache is not None:
+                    self.result_cache.invalidate()
+            return f"查询执行成功，影响了 {affected_rows} 行。"
+    
+    async def _execute_summary(self, query: str, result_format: str, active: Dict[str, Any]) -> str:
+        """通过SSCursor读取全部结果并逐块累计每列的统计量，内存占用与结果行数无关"""
+        settings = self.settings
+        async with self._unbuffered_cursor(query, active, settings.query_timeout) as cursor:
+            description = cursor.description or ()
+            summary = ResultSummary(
+                description, settings.summary_top_k, settings.summary_sample_rows, settings.decimal_as_string
+            )
+            while True:
+                with stage('execute'):
+                    batch = await cursor.fetchmany(SUMMARY_CHUNK_ROWS)
+                if not batch:
+                    active['drained'] = True
+                    break
+                with stage('summarize'):
+                    summary.update(batch)
+                active['rows'] = summary.rows
+                add_metric('rows', len(batch))
+        
+        with stage('convert'):
+            columns = summary.stats()
+            plan = self._conversion_plan(description, summary.sample.rows)
+            sample = shape_columns(plan.columns, plan.convert(summary.sample.rows), result_format)
+        with stage('encode'):
+            response = encode_json({
+                "status": "success",
+                "message": self._get_message(
+                    f"查询执行成功，汇总了 {summary.rows} 行结果",
+                    f"Query executed successfully, summarized {summary.rows} row(s)"
+                ),
+                "mode": "summary",
+                "format": result_format,
+                "rows": summary.rows,
+                "columns": columns,
+                "sample": sample,
+            })
+        add_metric('bytes', len(response))
+        return response
+    
+    async def _execute_read(self, query: str, result_format: str, active: Dict[str, Any]) -> str:
+        """执行只读查询，按行数与字节预算返回编码后的响应"""
+        async with self._read_connection(query) as (pool, connection):
+            active['thread_id'] = connection.thread_id()
+            active['pool'] = pool
+            active['started'] = time.perf_counter()
+            # 结果行数预算：对单条SELECT注入或收紧LIMIT，多取一行用于判断是否截断
+            max_rows = self.settings.result_max_rows
+            sql = query
+            if max_rows > 0:
+                sql = with_row_limit(query, max_rows + 1) or query
+            # 服务器端期限：SELECT超时后由MySQL自行中止
+            sql = with_execution_time(sql, int(self.settings.query_timeout * 1000))
+            
+            with stage('execute'):
+                async with connection.cursor() as cursor:
+                    await cursor.execute(sql)
+                    if max_rows > 0:
+                        results = await cursor.fetchmany(max_rows + 1)
+                    else:
+                        results = await cursor.fetchall()
+                    description = cursor.description
+            
+            row_truncated = max_rows > 0 and len(results) > max_rows
+            if row_truncated:
+                results = results[:max_rows]
+                with stage('explain'):
+                    estimated_total = await self._estimate_total_rows(connection, query)
+            else:
+                estimated_total = len(results)
+        del active['thread_id']
+        
+        if not results:
+            no_results_msg = self._get_message("查询执行成功，但没有返回结果", "Query executed successfully, but no results returned")
+            return encode_json({
+                "status": "success",
+                "message": no_results_msg,
+                "format": result_format,
+                "data": [],
+                "truncated": False,
+                "rows_returned": 0,
+                "estimated_total": 0,
+            })
+        
+        # 按列转换值并组织为请求的格式，超出响应大小预算时停止
+        with stage('convert'):
+            plan = self._conversion_plan(description, results)
+            data, rows_returned = self._convert_rows(
+                plan, results, max_bytes=self.settings.result_max_bytes, result_format=result_format
+            )
+        add_metric('rows', rows_returned)
+        active['rows'] = rows_returned
+        truncated = row_truncated or rows_returned < len(results)
+        if truncated and estimated_total is not None:
+            estimated_total = max(estimated_total, len(results))
+        
+        if truncated:
+            total_text = estimated_total if estimated_total is not None else "?"
+            success_msg = self._get_message(
+                f"查询执行成功，结果超出大小限制，返回前 {rows_returned} 行结果（估计共 {total_text} 行），可使用page_size分页读取",
+                f"Query executed successfully, result exceeds the size budget; returned the first {rows_returned} row(s) "
+                f"of an estimated {total_text}, use page_size to page through the rest"
+            )
+        else:
+            success_msg = self._get_message(
+                f"查询执行成功，返回 {rows_returned} 行结果", 
+                f"Query executed successfully, returned {rows_returned} row(s)"
+            )
+        with stage('encode'):
+            response = encode_json({
+                "status": "success",
+                "message": success_msg,
+                "format": result_format,
+                "columns": plan.columns,
+                "data": data,
+                "truncated": truncated,
+                "rows_returned": rows_returned,
+                "estimated_total": estimated_total,
+                "truncated_cells": plan.truncated_cells,
+            })
+        add_metric('bytes', len(response))
+        return response
+
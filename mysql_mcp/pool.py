@@ -0,0 +1,220 @@
+"""进程内共享的MySQL连接池"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Optional
+
+from .metrics import stage
+
+if TYPE_CHECKING:
+    import aiomysql
+
+# pymysql.constants.COMMAND未定义该命令（MySQL 5.7.3+ / MariaDB 10.2.4+）
+COM_RESET_CONNECTION = 0x1F
+
+
+class ConnectionPool:
+    """基于aiomysql.create_pool的连接池封装
+
+    连接池在首次借用连接时惰性创建（需要运行中的事件循环），
+    所有工具调用共享同一组热连接，避免每次调用都重新进行TCP握手和认证。
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        database: str,
+        minsize: int = 1,
+        maxsize: int = 10,
+        recycle: int = 3600,
+        pre_ping: bool = True,
+        ping_idle_seconds: float = 5.0,
+        reset_timeout: float = 5.0,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.database = database
+        self.minsize = minsize
+        self.maxsize = maxsize
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        # 仅对空闲超过该时长的连接做预检，连续调用不额外付出一次往返
+        self.ping_idle_seconds = ping_idle_seconds
+        self.reset_timeout = reset_timeout
+
+        self._pool: Optional["aiomysql.Pool"] = None
+        self._lock = asyncio.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    async def _ensure_pool(self) -> "aiomysql.Pool":
+        """确保底层连接池已创建"""
+        if self._pool is not None:
+            return self._pool
+        async with self._lock:
+            if self._pool is None:
+                import aiomysql
+
+                self._pool = await aiomysql.create_pool(
+                    minsize=self.minsize,
+                    maxsize=self.maxsize,
+                    pool_recycle=self.recycle,
+                    host=self.host,
+                    port=self.port,
+                    user=self.user,
+                    password=self.password,
+                    db=self.database,
+                    # 读操作不开启隐式事务，归还连接时不会因事务未结束而被关闭；
+                    # 只有单条只读语句走读路径（见mysql_handler.is_read_only），
+                    # 写操作与多语句查询由调用方显式begin/commit
+                    autocommit=True,
+                    charset='utf8mb4',
+                )
+        return self._pool
+
+    async def _ping(self, pool: "aiomysql.Pool", conn: "aiomysql.Connection") -> "aiomysql.Connection":
+        """对空闲过久的连接做预检，失效时丢弃并重新借用"""
+        loop = asyncio.get_running_loop()
+        if loop.time() - conn.last_usage < self.ping_idle_seconds:
+            return conn
+        try:
+            await conn.ping(reconnect=False)
+            return conn
+        except Exception as e:
+            self.logger.warning(f"连接预检失败，重新获取连接: {e}")
+            conn.close()
+            await pool.release(conn)
+            return await pool.acquire()
+
+    async def lease(self) -> "aiomysql.Connection":
+        """借出一个连接，调用方负责通过release归还（用于跨工具调用持有连接）"""
+        try:
+            with stage('acquire'):
+                pool = await self._ensure_pool()
+                conn = await pool.acquire()
+                if self.pre_ping:
+                    conn = await self._ping(pool, conn)
+            return conn
+        except Exception as e:
+            self.logger.error(f"连接数据库失败: {e}")
+            raise Exception(f"无法连接到数据库: {str(e)}")
+
+    async def _reset_session(self, conn: "aiomysql.Connection") -> None:
+        """用COM_RESET_CONNECTION清空会话状态，再恢复连接池建立连接时的设置
+
+        重置会回滚未提交事务，释放命名锁（GET_LOCK）与表锁，删除临时表，
+        用户变量清空、会话变量恢复为全局值，因此需重新设置字符集、autocommit与默认库。
+        """
+        await conn._execute_command(COM_RESET_CONNECTION, "")
+        await conn._read_ok_packet()
+        async with conn.cursor() as cursor:
+            await cursor.execute("SET NAMES utf8mb4, autocommit = 1")
+        if self.database:
+            await conn.select_db(self.database)
+
+    async def release(self, conn: "aiomysql.Connection", discard: bool = False, reset: bool = False) -> None:
+        """归还借出的连接；discard为True时先关闭连接，连接池不再复用它
+
+        reset为True表示连接上可能留有会话状态（写事务、命名锁、用户变量等），
+        归还前先重置会话，避免下一个借用者继承；重置失败时改为丢弃连接。
+        """
+        if reset and not discard and self._pool is not None:
+            try:
+                await asyncio.wait_for(self._reset_session(conn), self.reset_timeout)
+            except Exception as e:
+                self.logger.warning(f"重置会话失败，丢弃连接: {e}")
+                discard = True
+        if discard or self._pool is None:
+            conn.close()
+        if self._pool is not None:
+            await self._pool.release(conn)
+
+    @asynccontextmanager
+    async def acquire(self, reset: bool = False) -> AsyncIterator["aiomysql.Connection"]:
+        """从连接池借用一个连接，使用完毕后自动归还（reset含义见release）"""
+        conn = await self.lease()
+        discard = False
+        try:
+            yield conn
+        except asyncio.CancelledError:
+            # 查询被取消时连接可能停在读取结果的中途，不能再交给其他调用
+            discard = True
+            raise
+        finally:
+            await self.release(conn, discard=discard, reset=reset)
+
+    async def kill_query(self, thread_id: int, timeout: float = 5.0) -> bool:
+        """在独立的新连接上执行KILL QUERY，中止指定连接上正在执行的语句
+
+        不从连接池借用连接：超时往往发生在连接池紧张的时候。返回是否成功发出。
+        """
+        import aiomysql
+
+        try:
+            conn = await asyncio.wait_for(
+                aiomysql.connect(
+                    host=self.host,
+                    port=self.port,
+                    user=self.user,
+                    password=self.password,
+                    autocommit=True,
+                    charset='utf8mb4',
+                ),
+                timeout,
+            )
+        except Exception as e:
+            self.logger.warning(f"无法建立连接以中止查询 (thread {thread_id}): {e}")
+            return False
+        try:
+            async with conn.cursor() as cursor:
+                await asyncio.wait_for(cursor.execute(f"KILL QUERY {int(thread_id)}"), timeout)
+            return True
+        except Exception as e:
+            # 查询已结束时服务器返回Unknown thread id，同样视为无需处理
+            self.logger.warning(f"中止查询失败 (thread {thread_id}): {e}")
+            return False
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回连接池当前状态"""
+        if self._pool is None:
+            return {"size": 0, "free": 0, "minsize": self.minsize, "maxsize": self.maxsize}
+        return {
+            "size": self._pool.size,
+            "free": self._pool.freesize,
+            "minsize": self.minsize,
+            "maxsize": self.maxsize,
+        }
+
+    async def close(self) -> None:
+        """关闭连接池并等待所有连接释放"""
+        async with self._lock:
+            if self._pool is not None:
+                self._pool.close()
+                await self._pool.wait_closed()
+                self._pool = None
+
+
+_shared_pool: Optional[ConnectionPool] = None
+
+
+def get_shared_pool(**kwargs: Any) -> ConnectionPool:
+    """获取进程内共享的连接池，首次调用时按给定参数创建"""
+    global _shared_pool
+    if _shared_pool is None:
+        _shared_pool = ConnectionPool(**kwargs)
+    return _shared_pool
+
+
+async def close_shared_pool() -> None:
+    """关闭进程内共享的连接池（服务器关闭时调用）"""
+    global _shared_pool
+    if _shared_pool is not None:
+        pool, _shared_pool = _shared_pool, None
+        await pool.close()
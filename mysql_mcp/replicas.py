@@ -0,0 +1,250 @@
+"""只读副本路由
+
+配置了MYSQL_REPLICAS时，按默认安全模式规则判定为安全的只读查询发往副本，
+写操作、DDL与依赖主库会话状态的读（加锁读、GET_LOCK、LAST_INSERT_ID等）留在主库。
+流式游标通过lease借出连接，跨调用持有到结果读完或游标关闭。
+
+每个副本有独立的连接池。路由选择当前未完成请求最少的健康副本；后台定期探测每个副本
+（SHOW REPLICA STATUS，旧版本回退到SHOW SLAVE STATUS），复制延迟超过max_lag、
+复制线程停止或连接失败的副本暂停使用，直到下一次探测恢复。没有可用副本或借用副本连接
+失败时自动回退到主库。
+"""
+
+import asyncio
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from .pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# 只能在主库执行的读：加锁读与依赖当前会话或主库写入结果的函数
+_PRIMARY_ONLY_RE = re.compile(
+    r"""
+      \bFOR\s+(?:UPDATE|SHARE)\b
+    | \bLOCK\s+IN\s+SHARE\s+MODE\b
+    | \b(?:GET_LOCK|RELEASE_LOCK|RELEASE_ALL_LOCKS|IS_FREE_LOCK|IS_USED_LOCK
+         |LAST_INSERT_ID|FOUND_ROWS|ROW_COUNT)\s*\(
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+
+# 连接断开类错误：副本可能已不可用，立即暂停使用而不是等到下一次探测
+_CONNECTION_ERRORS = frozenset({2003, 2006, 2013, 2055})
+# MySQL 8.0.22之前没有SHOW REPLICA STATUS（语法错误）
+ER_PARSE_ERROR = 1064
+_LAG_COLUMNS = ('Seconds_Behind_Source', 'Seconds_Behind_Master')
+
+
+def needs_primary(query: str) -> bool:
+    """只读查询是否仍需在主库执行"""
+    return _PRIMARY_ONLY_RE.search(query) is not None
+
+
+class Replica:
+    """一个副本的连接池与健康状态"""
+
+    def __init__(self, pool: ConnectionPool):
+        self.pool = pool
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.outstanding = 0
+        self.routed = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_check: Optional[float] = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.pool.host}:{self.pool.port}"
+
+    def mark_down(self, error: str) -> None:
+        self.healthy = False
+        self.failures += 1
+        self.last_error = error
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "host": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "outstanding": self.outstanding,
+            "routed": self.routed,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_check_age": time.monotonic() - self.last_check if self.last_check is not None else None,
+            "pool": self.pool.stats(),
+        }
+
+
+class ReplicaRouter:
+    """最少未完成请求的副本路由，带延迟阈值、后台探测与主库回退
+
+    Args:
+        replicas: 各副本的连接池
+        max_lag: 允许的最大复制延迟（秒）
+        check_interval: 健康与延迟探测的间隔（秒）
+    """
+
+    def __init__(self, replicas: Sequence[ConnectionPool], max_lag: float, check_interval: float):
+        self.replicas: List[Replica] = [Replica(pool) for pool in replicas]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.primary_reads = 0
+        self.failovers = 0
+        self._next = 0
+        self._probe_task: Optional["asyncio.Task[None]"] = None
+
+    def _ensure_probing(self) -> None:
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop())
+
+    def _eligible(self, replica: Replica) -> bool:
+        return replica.healthy and replica.lag is not None and replica.lag <= self.max_lag
+
+    def choose(self) -> Optional[Replica]:
+        """未完成请求最少的可用副本；相同时轮流选择，避免总落在第一个副本上"""
+        self._ensure_probing()
+        count = len(self.replicas)
+        best: Optional[Replica] = None
+        for i in range(count):
+            replica = self.replicas[(self._next + i) % count]
+            if self._eligible(replica) and (best is None or replica.outstanding < best.outstanding):
+                best = replica
+        self._next = (self._next + 1) % count
+        return best
+
+    @asynccontextmanager
+    async def acquire(self, primary: ConnectionPool, reset: bool = False) -> AsyncIterator[Tuple[ConnectionPool, Any]]:
+        """借用一个只读连接，返回(所属连接池, 连接)；无可用副本或副本连接失败时使用主库
+
+        reset传给ConnectionPool.acquire，归还前重置会话。
+        """
+        replica = self.choose()
+        if replica is not None:
+            replica.outstanding += 1
+            entered = False
+            try:
+                async with replica.pool.acquire(reset=reset) as conn:
+                    entered = True
+                    replica.routed += 1
+                    yield replica.pool, conn
+                return
+            except Exception as e:
+                if entered:
+                    if e.args and e.args[0] in _CONNECTION_ERRORS:
+                        replica.mark_down(str(e))
+                    raise
+                replica.mark_down(str(e))
+                self.failovers += 1
+                logger.warning(f"副本 {replica.name} 不可用，改用主库: {e}")
+            finally:
+                replica.outstanding -= 1
+        self.primary_reads += 1
+        async with primary.acquire(reset=reset) as conn:
+            yield primary, conn
+
+    async def lease(self, primary: ConnectionPool) -> Tuple[ConnectionPool, Any]:
+        """借出一个只读连接供跨工具调用持有（流式游标），返回(所属连接池, 连接)
+
+        选择与回退规则同acquire；调用方通过返回的连接池release归还。
+        """
+        replica = self.choose()
+        if replica is not None:
+            try:
+                conn = await replica.pool.lease()
+            except Exception as e:
+                replica.mark_down(str(e))
+                self.failovers += 1
+                logger.warning(f"副本 {replica.name} 不可用，改用主库: {e}")
+            else:
+                replica.routed += 1
+                return replica.pool, conn
+        self.primary_reads += 1
+        return primary, await primary.lease()
+
+    async def _probe_loop(self) -> None:
+        while True:
+            await asyncio.gather(*(self._probe(replica) for replica in self.replicas))
+            await asyncio.sleep(max(0.5, self.check_interval))
+
+    async def _probe(self, replica: Replica) -> None:
+        """读取副本的复制延迟并更新健康状态"""
+        try:
+            lag = await asyncio.wait_for(self._read_lag(replica.pool), max(1.0, self.check_interval))
+        except Exception as e:
+            if replica.healthy or replica.last_check is None:
+                logger.warning(f"副本 {replica.name} 探测失败: {e}")
+            replica.mark_down(str(e) or type(e).__name__)
+            replica.lag = None
+        else:
+            replica.lag = lag
+            replica.healthy = lag is not None
+            replica.last_error = None if lag is not None else "replication is not running"
+        replica.last_check = time.monotonic()
+
+    async def _read_lag(self, pool: ConnectionPool) -> Optional[float]:
+        """复制延迟（秒）；不是副本时为0，复制线程停止时为None"""
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                try:
+                    await cursor.execute("SHOW REPLICA STATUS")
+                except Exception as e:
+                    if not (e.args and e.args[0] == ER_PARSE_ERROR):
+                        raise
+                    await cursor.execute("SHOW SLAVE STATUS")
+                row = await cursor.fetchone()
+                names = [desc[0] for desc in cursor.description or ()]
+        if row is None:
+            return 0.0
+        for column in _LAG_COLUMNS:
+            if column in names:
+                value = row[names.index(column)]
+                return float(value) if value is not None else None
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_lag": self.max_lag,
+            "check_interval": self.check_interval,
+            "primary_reads": self.primary_reads,
+            "failovers": self.failovers,
+            "replicas": [replica.stats() for replica in self.replicas],
+        }
+
+    async def close(self) -> None:
+        """停止探测并关闭各副本的连接池"""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+        for replica in self.replicas:
+            await replica.pool.close()
+
+
+_shared_router: Optional[ReplicaRouter] = None
+
+
+def get_replica_router(
+    replicas: Sequence[Tuple[str, int]], max_lag: float, check_interval: float, **pool_kwargs: Any
+) -> ReplicaRouter:
+    """获取进程内共享的副本路由，首次调用时为每个副本创建连接池"""
+    global _shared_router
+    if _shared_router is None:
+        pools = [ConnectionPool(host=host, port=port, **pool_kwargs) for host, port in replicas]
+        _shared_router = ReplicaRouter(pools, max_lag, check_interval)
+    return _shared_router
+
+
+async def close_replica_router() -> None:
+    """关闭进程内共享的副本路由（服务器关闭时调用）"""
+    global _shared_router
+    if _shared_router is not None:
+        router, _shared_router = _shared_router, None
+        await router.close()
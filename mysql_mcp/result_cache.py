@@ -0,0 +1,180 @@
+"""只读查询的结果缓存
+
+缓存execute_query对SELECT生成的完整响应，按响应字节总数限制容量（LRU淘汰），
+每个条目在写入ttl秒后过期。相同的查询同时到达时只有一个请求访问数据库，
+其余请求等待同一个结果（single-flight）。危险模式下执行任何写操作都会清空缓存。
+"""
+
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional
+
+from .sql_lexer import analyze
+
+# 结果依赖于执行时刻、会话或锁的查询不缓存（字符串中出现这些单词时同样不缓存，宁缺毋滥）
+_VOLATILE_RE = re.compile(
+    r"""
+      \b(?:
+          NOW | SYSDATE | CURDATE | CURTIME | CURRENT_(?:DATE|TIME|TIMESTAMP|USER|ROLE)
+        | LOCALTIME(?:STAMP)? | UTC_(?:DATE|TIME|TIMESTAMP) | UNIX_TIMESTAMP
+        | RAND | RANDOM_BYTES | UUID(?:_SHORT)? | CONNECTION_ID | LAST_INSERT_ID
+        | FOUND_ROWS | ROW_COUNT | SLEEP | BENCHMARK | GET_LOCK | RELEASE_LOCK
+        | RELEASE_ALL_LOCKS | IS_FREE_LOCK | IS_USED_LOCK | USER | SESSION_USER
+        | SYSTEM_USER | DATABASE | SCHEMA | NEXTVAL | LASTVAL
+      )\b
+    | \bFOR\s+(?:UPDATE|SHARE)\b
+    | \bLOCK\s+IN\s+SHARE\s+MODE\b
+    | @
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+_SELECT_RE = re.compile(r"\s*\(*\s*SELECT\b", re.IGNORECASE)
+
+
+def is_cacheable(query: str) -> bool:
+    """查询是否为结果可以复用的单条只读SELECT（多语句查询可能在SELECT之后写入）"""
+    return (
+        _SELECT_RE.match(query) is not None
+        and _VOLATILE_RE.search(query) is None
+        and len(analyze(query).statements) == 1
+    )
+
+
+class _Entry(NamedTuple):
+    value: str
+    size: int
+    expires: float
+
+
+class ResultCache:
+    """按字节数限制容量的TTL结果缓存，带single-flight合并
+
+    Args:
+        max_bytes: 所有缓存响应的UTF-8字节数上限，超过上限的单个响应不缓存
+        ttl: 条目写入后的有效秒数
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.policy: Optional[Hashable] = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._inflight: Dict[Hashable, "asyncio.Task[str]"] = {}
+        # 每次失效递增；失效之前开始的查询结果不再写入缓存
+        self._generation = 0
+
+    def ensure_policy(self, policy: Hashable) -> None:
+        """连接目标或结果格式相关的配置变化时清空缓存"""
+        if policy != self.policy:
+            self.clear()
+            self.policy = policy
+
+    def get(self, key: Hashable) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None and self._clock() >= entry.expires:
+            self._remove(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.bytes_saved += entry.size
+        return entry.value
+
+    def put(self, key: Hashable, value: str) -> None:
+        size = len(value) if value.isascii() else len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        self._remove(key)
+        while self._entries and self.bytes + size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.evictions += 1
+        self._entries[key] = _Entry(value, size, self._clock() + self.ttl)
+        self.bytes += size
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[str]]) -> str:
+        """命中时直接返回；否则执行loader，同一键的并发请求共享一次执行
+
+        loader抛出的异常会传给所有等待者，且不写入缓存。
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            generation = self._generation
+            task = asyncio.get_running_loop().create_task(loader())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._loaded(key, generation, t))
+        else:
+            self.coalesced += 1
+        # shield：某个调用方被取消时不影响其他等待同一结果的调用方
+        return await asyncio.shield(task)
+
+    def _loaded(self, key: Hashable, generation: int, task: "asyncio.Task[str]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        if generation == self._generation:
+            self.put(key, task.result())
+
+    def invalidate(self) -> None:
+        """清空缓存（执行了写操作），正在进行的查询结果也不再写入"""
+        if self._entries:
+            self.invalidations += 1
+        self.clear()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+        # 之后到达的相同查询重新执行，不再合并到清空之前开始的查询上
+        self._inflight.clear()
+        self._generation += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存状态"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "coalesced": self.coalesced,
+            "bytes_saved": self.bytes_saved,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "in_flight": len(self._inflight),
+        }
+
+
+_shared_cache: Optional[ResultCache] = None
+
+
+def get_result_cache(max_bytes: int, ttl: float) -> ResultCache:
+    """获取进程内共享的结果缓存，首次调用时按给定参数创建"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = ResultCache(max_bytes, ttl)
+    return _shared_cache
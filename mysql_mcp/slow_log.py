@@ -0,0 +1,286 @@
+"""慢查询日志
+
+execute_query（及execute_queries中的每条查询）在MySQL上的执行时间超过阈值时，
+记录查询摘要、耗时、行数与响应字节数：最近的记录保存在固定大小的环形缓冲区中，
+可选地逐行追加到NDJSON文件（在线程池中写入，慢磁盘不阻塞事件循环）；同时按摘要聚合次数与耗时。
+
+每个摘要首次变慢（或上次的执行计划已过期）时，在后台借用连接池中的连接执行
+EXPLAIN FORMAT=JSON并附在记录上，查询本身不等待EXPLAIN完成。
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from .fingerprint import digest_text
+from .sql_lexer import analyze
+
+logger = logging.getLogger(__name__)
+
+# 聚合统计最多保留的摘要数，超出时淘汰最久未出现的摘要
+MAX_DIGESTS = 1000
+# 同一摘要的执行计划在这么多秒后重新采集（数据量与索引可能已变化）
+EXPLAIN_REFRESH = 300.0
+# 同时在后台执行的EXPLAIN数量上限，超出时跳过本次采集（不占用过多连接）
+MAX_PENDING_EXPLAINS = 2
+# 记录中保存的查询文本的最大长度
+MAX_QUERY_TEXT = 4096
+
+# EXPLAIN支持的语句（EXPLAIN不会真正执行写语句）
+EXPLAINABLE_COMMANDS = frozenset({'SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT', 'REPLACE'})
+
+Explainer = Callable[[], Awaitable[Any]]
+
+
+def is_explainable(query: str) -> bool:
+    """查询是否为可以EXPLAIN的单条语句"""
+    statements = analyze(query).statements
+    return len(statements) == 1 and statements[0].keyword in EXPLAINABLE_COMMANDS
+
+
+def _walk_tables(node: Any, tables: List[Dict[str, Any]]) -> None:
+    if isinstance(node, dict):
+        if 'table_name' in node and 'access_type' in node:
+            tables.append(node)
+        for value in node.values():
+            _walk_tables(value, tables)
+    elif isinstance(node, list):
+        for value in node:
+            _walk_tables(value, tables)
+
+
+def summarize_plan(plan: Any) -> Dict[str, Any]:
+    """从EXPLAIN FORMAT=JSON的结果中提取各表的访问方式、使用的索引与扫描行数
+
+    full_scans列出访问方式为ALL（全表扫描）的表，通常意味着缺少合适的索引。
+    """
+    tables: List[Dict[str, Any]] = []
+    _walk_tables(plan, tables)
+    cost = None
+    if isinstance(plan, dict):
+        cost = plan.get('query_block', {}).get('cost_info', {}).get('query_cost')
+    return {
+        "query_cost": float(cost) if cost is not None else None,
+        "tables": [
+            {
+                "table": table.get('table_name'),
+                "access_type": table.get('access_type'),
+                "possible_keys": table.get('possible_keys'),
+                "key": table.get('key'),
+                "rows_examined_per_scan": table.get('rows_examined_per_scan'),
+                "filtered": table.get('filtered'),
+            }
+            for table in tables
+        ],
+        "full_scans": [table.get('table_name') for table in tables if table.get('access_type') == 'ALL'],
+    }
+
+
+class _Digest:
+    """一个查询摘要的聚合统计"""
+
+    __slots__ = (
+        'digest', 'count', 'total', 'max', 'rows', 'bytes', 'timeouts', 'errors',
+        'first_seen', 'last_seen', 'example', 'plan', 'plan_at', 'plan_error',
+    )
+
+    def __init__(self, digest: str, now: float):
+        self.digest = digest
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.first_seen = now
+        self.last_seen = now
+        self.example = ''
+        self.plan: Any = None
+        self.plan_at = 0.0
+        self.plan_error: Optional[str] = None
+
+    def stats(self, include_plan: bool) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "digest": self.digest,
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "avg_ms": self.total * 1000 / self.count if self.count else 0.0,
+            "max_ms": self.max * 1000,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "example": self.example,
+            "plan_summary": summarize_plan(self.plan) if self.plan is not None else None,
+        }
+        if self.plan_error is not None:
+            result["plan_error"] = self.plan_error
+        if include_plan:
+            result["plan"] = self.plan
+        return result
+
+
+class SlowQueryLog:
+    """慢查询的环形缓冲区、NDJSON文件与按摘要的聚合
+
+    Args:
+        threshold: 记录的耗时阈值（秒）
+        capacity: 环形缓冲区保存的最近记录数
+        log_file: 追加NDJSON记录的文件路径，为空时不写文件
+        explain: 是否在后台采集EXPLAIN FORMAT=JSON
+    """
+
+    def __init__(self, threshold: float, capacity: int, log_file: str = '', explain: bool = True):
+        self.threshold = threshold
+        self.capacity = capacity
+        self.log_file = log_file
+        self.explain = explain
+        self.recorded = 0
+        self.explains = 0
+        self.explains_skipped = 0
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=max(1, capacity))
+        self._digests: "OrderedDict[str, _Digest]" = OrderedDict()
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self._explaining: Set[str] = set()
+        # 线程池中的多次追加串行执行，较长的记录不会与其他记录交错
+        self._write_lock = threading.Lock()
+
+    def record(
+        self,
+        query: str,
+        duration: float,
+        rows: Optional[int] = None,
+        size: Optional[int] = None,
+        status: str = 'ok',
+        explainer: Optional[Explainer] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """耗时达到阈值时记录一次执行，返回记录（未达到阈值时返回None）
+
+        explainer()执行EXPLAIN FORMAT=JSON并返回解析后的执行计划，只在需要采集时才在后台调用。
+        """
+        if duration < self.threshold:
+            return None
+        now = time.time()
+        digest = digest_text(query)
+        entry: Dict[str, Any] = {
+            "time": now,
+            "digest": digest,
+            "query": query[:MAX_QUERY_TEXT],
+            "duration_ms": duration * 1000,
+            "rows": rows,
+            "bytes": size,
+            "status": status,
+        }
+        self.recorded += 1
+        self._entries.append(entry)
+
+        aggregate = self._digests.get(digest)
+        if aggregate is None:
+            aggregate = self._digests[digest] = _Digest(digest, now)
+            if len(self._digests) > MAX_DIGESTS:
+                self._digests.popitem(last=False)
+        else:
+            self._digests.move_to_end(digest)
+        aggregate.count += 1
+        aggregate.total += duration
+        aggregate.max = max(aggregate.max, duration)
+        aggregate.rows += rows or 0
+        aggregate.bytes += size or 0
+        aggregate.timeouts += status == 'timeout'
+        aggregate.errors += status == 'error'
+        aggregate.last_seen = now
+        aggregate.example = entry["query"]
+
+        run_explain = None
+        if (
+            self.explain
+            and explainer is not None
+            and digest not in self._explaining
+            and now - aggregate.plan_at >= EXPLAIN_REFRESH
+            and is_explainable(query)
+        ):
+            if len(self._explaining) >= MAX_PENDING_EXPLAINS:
+                self.explains_skipped += 1
+            else:
+                run_explain = explainer
+                self._explaining.add(digest)
+        if run_explain is not None or self.log_file:
+            task = asyncio.get_running_loop().create_task(self._finish(entry, aggregate, run_explain))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return entry
+
+    async def _finish(self, entry: Dict[str, Any], aggregate: _Digest, run_explain: Optional[Explainer]) -> None:
+        """后台采集执行计划并写出NDJSON记录"""
+        if run_explain is not None:
+            try:
+                plan = await run_explain()
+                aggregate.plan = plan
+                aggregate.plan_error = None
+                entry["plan_summary"] = summarize_plan(plan)
+                self.explains += 1
+            except Exception as e:
+                aggregate.plan_error = str(e)
+                entry["plan_error"] = str(e)
+                logger.warning(f"采集慢查询执行计划失败: {e}")
+            finally:
+                aggregate.plan_at = time.time()
+                self._explaining.discard(aggregate.digest)
+        if self.log_file:
+            line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._append, line)
+            except OSError as e:
+                logger.warning(f"写入慢查询日志失败: {e}")
+
+    def _append(self, line: str) -> None:
+        """在线程池中追加一行NDJSON记录"""
+        with self._write_lock:
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    def snapshot(self, limit: int = 20, include_plans: bool = False) -> Dict[str, Any]:
+        """按累计耗时排序的摘要聚合，以及最近的慢查询记录（新的在前）"""
+        limit = max(1, limit)
+        top = sorted(self._digests.values(), key=lambda d: d.total, reverse=True)[:limit]
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "recorded": self.recorded,
+            "digests": len(self._digests),
+            "explains": self.explains,
+            "explains_skipped": self.explains_skipped,
+            "top": [aggregate.stats(include_plans) for aggregate in top],
+            "recent": list(self._entries)[-limit:][::-1],
+        }
+
+    async def close(self) -> None:
+        """取消尚未完成的后台EXPLAIN"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_shared_log: Optional[SlowQueryLog] = None
+
+
+def get_slow_log(threshold: float, capacity: int, log_file: str = '', explain: bool = True) -> SlowQueryLog:
+    """获取进程内共享的慢查询日志，首次调用时按给定参数创建"""
+    global _shared_log
+    if _shared_log is None:
+        _shared_log = SlowQueryLog(threshold, capacity, log_file, explain)
+    return _shared_log
+
+
+async def close_slow_log() -> None:
+    """服务器关闭时取消后台EXPLAIN"""
+    if _shared_log is not None:
+        await _shared_log.close()
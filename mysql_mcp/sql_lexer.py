@@ -0,0 +1,335 @@
+"""单遍线性SQL词法分析，为安全检查提供语句划分、首关键字与嵌套DML信息
+
+词法规则以MySQL服务器的实际行为为准：
+- 单引号/双引号字符串支持反斜杠转义和重复引号转义，反引号标识符支持重复反引号；
+- ``#`` 与 ``-- ``（后跟空白）开始单行注释，``/* */`` 为多行注释；
+- ``/*!...*/`` 可执行注释中的内容按代码处理（MySQL会执行其中的语句）；
+- 顶层分号总是结束一条语句（连接开启了MULTI_STATEMENTS）。
+
+除字符串、注释与分号外的普通字符由正则引擎批量跳过，Python层的工作量只与
+语句数量和INSERT/UPDATE/DELETE出现次数成正比，因此长查询的校验开销保持线性。
+"""
+
+import re
+from typing import List, NamedTuple, Optional
+
+# 字符串、标识符与注释：内容中的分号和关键字都不参与分析
+_QUOTED = r"""
+      '(?:[^'\\]|\\[\s\S]|'')*'
+    | "(?:[^"\\]|\\[\s\S]|"")*"
+    | `(?:[^`]|``)*`
+"""
+_COMMENT = r"""
+      \#[^\r\n]*(?:\r\n|\r|\n|$)
+    | --(?=\s|$)[^\r\n]*(?:\r\n|\r|\n|$)
+    | /\*(?![!])[\s\S]*?\*/
+"""
+
+# 批量跳过不影响判定的内容：普通字符、引号内容、注释、非DML单词
+_SKIP_RE = re.compile(
+    r"""
+    (?:
+        [^'"`\#;/\-\w$]+
+      | """ + _QUOTED + r"""
+      | """ + _COMMENT + r"""
+      | /\*![0-9]*          # 可执行注释的开头，其内容按代码继续分析
+      | /(?!\*)
+      | -(?!-(?:\s|$))
+      | (?!(?:INSERT|UPDATE|DELETE)(?![\w$]))[\w$]+
+    )+
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+
+_EVENT_RE = re.compile(
+    r"""
+      (?P<semi>;)
+    | (?P<dml>(?:INSERT|UPDATE|DELETE)(?![\w$]))
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+
+# 由多个单词组成的关键字，作为一个整体出现在错误消息中
+_MULTIWORD_KEYWORDS = r"""
+        CREATE\s+OR\s+REPLACE\b
+      | END\s+(?:IF|LOOP|WHILE|FOR|CASE)\b
+      | IF\s+(?:NOT\s+)?EXISTS\b
+      | NOT\s+NULL\b
+      | (?:ASC|DESC)\s+NULLS\s+(?:FIRST|LAST)\b
+      | NULLS\s+(?:FIRST|LAST)\b
+      | UNION\s+ALL\b
+      | (?:GROUP|ORDER)\s+BY\b
+      | PRIMARY\s+KEY\b
+      | HANDLER\s+FOR\b
+      | DOUBLE\s+PRECISION\b
+      | (?:(?:LEFT|RIGHT|FULL)\s+)?(?:(?:INNER|OUTER|STRAIGHT)\s+)JOIN\b
+      | (?:LEFT|RIGHT|FULL|CROSS|NATURAL)\s+JOIN\b
+      | NOT\s+(?:LIKE|ILIKE|RLIKE|REGEXP)\b
+      | REGEXP\s+BINARY\b
+"""
+
+# 语句的首个词法单元（用于确定SQL命令），注释也视为有效单元
+_FIRST_TOKEN_RE = re.compile(
+    r"""
+    \s*
+    (?P<tok>
+        /\*[\s\S]*?(?:\*/|$)
+      | \#[^\r\n]*(?:\r\n|\r|\n|$)
+      | --(?=\s|$)[^\r\n]*(?:\r\n|\r|\n|$)
+      | """ + _QUOTED + r"""
+      | """ + _MULTIWORD_KEYWORDS + r"""
+      | -?\d+(?:\.\d*)?(?:E-?\d+)?(?![\w$])
+      | [\w$]+
+      | [;:()\[\],.]
+      | [<>=~!]+
+      | [+/@\#%^&|-]+
+      | \S
+    )
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+
+# 分号之后同一行内的空白和单行注释仍归属上一条语句
+_TRAILING_RE = re.compile(
+    r"""
+    (?:
+        [^\S\r\n]+
+      | \#[^\r\n]*(?:\r\n|\r|\n|$)
+      | --(?=\s|$)[^\r\n]*(?:\r\n|\r|\n|$)
+    )*
+    """,
+    re.VERBOSE,
+)
+
+_QUALIFIER_RE = re.compile(r"\s*\.(?!\d)")
+_DML_PREFIX_CHARS = frozenset(".@$\\")
+
+
+class Statement(NamedTuple):
+    """一条语句：在原查询中的范围、SQL命令和第一个嵌套的危险DML关键字"""
+
+    start: int
+    end: int
+    keyword: str
+    nested_dml: Optional[str]
+
+
+class QueryAnalysis(NamedTuple):
+    """单遍分析结果，安全检查与数据库上下文检查共用"""
+
+    query: str
+    upper: str
+    statements: List[Statement]
+
+    def statement_upper(self, statement: Statement) -> str:
+        """语句的大写文本（仅在大写转换改变长度时才需要单独转换）"""
+        if len(self.upper) == len(self.query):
+            return self.upper[statement.start:statement.end]
+        return self.query[statement.start:statement.end].upper()
+
+
+def _is_dml_keyword(query: str, start: int, end: int) -> bool:
+    """INSERT/UPDATE/DELETE是否作为关键字出现（而非函数名、限定名或变量）"""
+    if start > 0 and query[start - 1] in _DML_PREFIX_CHARS:
+        return False
+    if end < len(query) and query[end] == '(':
+        return False
+    return _QUALIFIER_RE.match(query, end) is None
+
+
+def _first_token(query: str, pos: int) -> Optional[str]:
+    match = _FIRST_TOKEN_RE.match(query, pos)
+    if match is None:
+        return None
+    return match.group('tok')
+
+
+def analyze(query: str) -> QueryAnalysis:
+    """对查询做一次线性扫描，返回语句划分与每条语句的关键信息"""
+    statements: List[Statement] = []
+    length = len(query)
+    start = 0
+    nested_dml: Optional[str] = None
+    pos = 0
+
+    while pos < length:
+        skipped = _SKIP_RE.match(query, pos)
+        if skipped is not None:
+            pos = skipped.end()
+        event = _EVENT_RE.match(query, pos)
+        if event is None:
+            # 无法闭合的引号或注释开头：与普通字符一样跳过一个字符后继续
+            pos += 1
+            continue
+        if event.lastgroup == 'dml':
+            if nested_dml is None and _is_dml_keyword(query, event.start(), event.end()):
+                nested_dml = event.group().upper()
+            pos = event.end()
+            continue
+
+        # 分号：结束当前语句，同一行的空白和单行注释归入当前语句
+        end = _TRAILING_RE.match(query, event.end()).end()
+        keyword = _first_token(query, start)
+        statements.append(Statement(start, end, (keyword or ';').upper().strip(), nested_dml))
+        start = pos = end
+        nested_dml = None
+
+    # 结尾只有空白时不构成语句
+    keyword = _first_token(query, start)
+    if keyword is not None:
+        statements.append(Statement(start, length, keyword.upper().strip(), nested_dml))
+
+    return QueryAnalysis(query, query.upper(), statements)
+
+
+_NORMALIZE_RE = re.compile(
+    r"""
+      (?P<keep>""" + _QUOTED + r"""|/\*[\s\S]*?\*/)
+    | (?P<space>\s+)
+    """,
+    re.VERBOSE,
+)
+
+
+def normalize_query(query: str) -> str:
+    """将查询规范化为缓存键：合并引号与块注释之外的连续空白，去掉首尾空白和结尾的分号
+
+    只做不改变语义的变换；关键字大小写、字面量与注释（可能是优化器提示）均保留。
+    单行注释包含换行语义，出现时按原样保留空白。
+    """
+    if '#' in query or '--' in query:
+        normalized = query.strip()
+    else:
+        normalized = _NORMALIZE_RE.sub(
+            lambda m: m.group('keep') if m.lastgroup == 'keep' else ' ', query
+        ).strip()
+    while normalized.endswith(';'):
+        normalized = normalized[:-1].rstrip()
+    return normalized
+
+
+# 行数上限注入：只关心括号深度、分号以及顶层的LIMIT/FOR/LOCK/INTO，
+# 其余代码（包括空白）按片段批量跳过
+_LIMIT_SCAN_RE = re.compile(
+    r"""
+      (?P<run>(?:
+            [^'"`\#;/\-()\w$]+
+          | /(?!\*)
+          | -(?!-(?:\s|$))
+          | (?!(?:LIMIT|FOR|LOCK|INTO)(?![\w$]))[\w$]+
+        )+)
+    | (?P<quoted>""" + _QUOTED + r""")
+    | (?P<comment>""" + _COMMENT + r""")
+    | (?P<open>\()
+    | (?P<close>\))
+    | (?P<semi>;)
+    | (?P<keyword>(?:LIMIT|FOR|LOCK|INTO)(?![\w$]))
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+_LOCKING_CLAUSE_RE = re.compile(r"(?:FOR\s+(?:UPDATE|SHARE)|LOCK\s+IN\s+SHARE\s+MODE)(?![\w$])", re.IGNORECASE)
+_SELECT_START_RE = re.compile(r"\s*SELECT(?![\w$])", re.IGNORECASE)
+_LIMIT_ARGS_RE = re.compile(
+    r"\s+(?P<first>\d+)(?:\s*,\s*(?P<count>\d+)|\s+OFFSET\s+\d+)?(?![\w$.])",
+    re.IGNORECASE,
+)
+
+
+def with_row_limit(query: str, max_rows: int) -> Optional[str]:
+    """为单条SELECT注入或收紧顶层LIMIT，使其最多返回max_rows行
+
+    已有的LIMIT不超过max_rows时返回原查询；无法可靠判断LIMIT位置时
+    （多条语句、可执行注释、顶层INTO、非数字参数等）返回None。
+    """
+    if _SELECT_START_RE.match(query) is None:
+        return None
+
+    depth = 0
+    code_end = 0
+    statement_end: Optional[int] = None
+    limit_at: Optional[int] = None
+    insert_at: Optional[int] = None
+    pos = 0
+    length = len(query)
+
+    while pos < length:
+        match = _LIMIT_SCAN_RE.match(query, pos)
+        if match is None:
+            # 无法闭合的引号或注释
+            return None
+        kind = match.lastgroup
+        text = match.group()
+        pos = match.end()
+
+        if kind == 'comment':
+            continue
+        if statement_end is not None:
+            if kind == 'run' and not text.strip():
+                continue
+            # 分号之后还有代码：多条语句
+            return None
+
+        if kind == 'run':
+            stripped = len(text.rstrip())
+            if stripped:
+                code_end = match.start() + stripped
+            continue
+        if kind == 'semi':
+            if depth != 0:
+                return None
+            statement_end = match.start()
+            continue
+
+        code_end = pos
+        if kind == 'open':
+            depth += 1
+        elif kind == 'close':
+            depth -= 1
+            if depth < 0:
+                return None
+        elif kind == 'keyword' and depth == 0 and query[match.start() - 1] not in _DML_PREFIX_CHARS:
+            word = text.upper()
+            if word == 'INTO':
+                return None
+            if word == 'LIMIT':
+                if limit_at is not None or insert_at is not None:
+                    return None
+                limit_at = pos
+            elif insert_at is None and _LOCKING_CLAUSE_RE.match(query, match.start()):
+                # FOR UPDATE / FOR SHARE / LOCK IN SHARE MODE 必须位于LIMIT之后
+                insert_at = match.start()
+
+    if depth != 0:
+        return None
+
+    if limit_at is None:
+        if insert_at is None:
+            return f"{query[:code_end]} LIMIT {max_rows}{query[code_end:]}"
+        return f"{query[:insert_at]}LIMIT {max_rows} {query[insert_at:]}"
+
+    args = _LIMIT_ARGS_RE.match(query, limit_at)
+    if args is None:
+        return None
+    group = 'count' if args.group('count') is not None else 'first'
+    if int(args.group(group)) <= max_rows:
+        return query
+    start, end = args.span(group)
+    return f"{query[:start]}{max_rows}{query[end:]}"
+
+
+_HINT_COMMENT_RE = re.compile(r"\s*/\*\+")
+
+
+def with_execution_time(query: str, max_execution_ms: int) -> str:
+    """为以SELECT开头的查询加上MAX_EXECUTION_TIME优化器提示，由服务器在超时后中止查询
+
+    已有提示注释时并入其中（每个查询块只识别紧跟SELECT的第一个提示注释）；
+    已指定MAX_EXECUTION_TIME或不以SELECT开头时返回原查询。
+    """
+    match = _SELECT_START_RE.match(query)
+    if match is None or max_execution_ms <= 0 or 'MAX_EXECUTION_TIME' in query.upper():
+        return query
+    hint = _HINT_COMMENT_RE.match(query, match.end())
+    if hint is not None:
+        return f"{query[:hint.end()]} MAX_EXECUTION_TIME({max_execution_ms}){query[hint.end():]}"
+    return f"{query[:match.end()]} /*+ MAX_EXECUTION_TIME({max_execution_ms}) */{query[match.end():]}"
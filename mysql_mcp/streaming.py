@@ -0,0 +1,248 @@
+"""服务端流式游标：按页读取大结果集，通过续传令牌跨工具调用恢复读取"""
+
+import asyncio
+import logging
+import secrets
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import aiomysql
+
+    from .converters import ConversionPlan
+    from .pool import ConnectionPool
+    from .replicas import ReplicaRouter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StreamSession:
+    """一个打开的流式游标，独占一个从连接池借出的连接"""
+
+    token: str
+    pool: "ConnectionPool"
+    conn: "aiomysql.Connection"
+    cursor: "aiomysql.SSCursor"
+    columns: List[str]
+    description: Optional[Sequence[Any]]
+    last_used: float
+    rows_fetched: int = 0
+    done: bool = False
+    # 预读的一行：用于准确判断是否还有下一页
+    pending: Optional[Tuple[Any, ...]] = None
+    # 每一页沿用打开游标时请求的返回格式
+    result_format: str = 'objects'
+    # 首页生成的按列转换计划，后续各页复用
+    plan: Optional["ConversionPlan"] = None
+    # 查询可能留下会话状态（命名锁、用户变量），归还连接前重置会话
+    reset: bool = False
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class StreamRegistry:
+    """管理所有打开的流式游标
+
+    每页结果通过SSCursor从套接字逐行读取，内存占用只与页大小有关。
+    游标空闲超过idle_ttl后自动关闭并归还连接；打开的游标数量受max_cursors限制，
+    保证连接池中始终有连接留给普通查询。
+    """
+
+    def __init__(self, idle_ttl: float = 60.0, max_cursors: int = 4):
+        self.idle_ttl = idle_ttl
+        self.max_cursors = max_cursors
+        self._sessions: Dict[str, StreamSession] = {}
+        self._opening = 0
+        self._reaper: Optional["asyncio.Task[None]"] = None
+
+    def has_capacity(self) -> bool:
+        """是否还能打开新的游标"""
+        return len(self._sessions) + self._opening < self.max_cursors
+
+    async def open(
+        self,
+        pool: "ConnectionPool",
+        query: str,
+        page_size: int,
+        result_format: str = 'objects',
+        active: Optional[Dict[str, Any]] = None,
+        reset: bool = False,
+        router: Optional["ReplicaRouter"] = None,
+    ) -> Tuple[StreamSession, List[Tuple[Any, ...]]]:
+        """执行查询并读取第一页；结果未读完时会话保持打开
+
+        active不为None时记入连接的线程ID、所属连接池与开始时刻，供调用方在超时或取消时
+        执行KILL QUERY（见MySQLHandler._with_deadline）；第一页读完后移除线程ID。
+        reset为True时正常归还连接前重置会话（见ConnectionPool.release）。
+        router不为None时经副本路由借出连接（pool为回退用的主库），会话记录实际所属的连接池。
+        """
+        import aiomysql
+
+        await self.reap()
+        if not self.has_capacity():
+            raise RuntimeError("too many open stream cursors")
+
+        self._opening += 1
+        try:
+            if router is not None:
+                pool, conn = await router.lease(pool)
+            else:
+                conn = await pool.lease()
+            if active is not None:
+                active['thread_id'] = conn.thread_id()
+                active['pool'] = pool
+                active['started'] = time.perf_counter()
+            try:
+                cursor = conn.cursor(aiomysql.SSCursor)
+                await cursor.execute(query)
+            except BaseException:
+                # 出错、超时或被取消：未读完的无缓冲结果会让连接处于不可复用的状态
+                await pool.release(conn, discard=True)
+                raise
+
+            description = cursor.description
+            session = StreamSession(
+                token=secrets.token_urlsafe(16),
+                pool=pool,
+                conn=conn,
+                cursor=cursor,
+                columns=[desc[0] for desc in description] if description else [],
+                description=description,
+                last_used=asyncio.get_running_loop().time(),
+                result_format=result_format,
+                reset=reset,
+            )
+            self._sessions[session.token] = session
+        finally:
+            self._opening -= 1
+
+        self._ensure_reaper()
+        async with session.lock:
+            rows = await self._read_page(session, page_size)
+        if active is not None:
+            # 之后的超时不能再中止这个连接：游标仍由会话持有
+            active.pop('thread_id', None)
+            active['rows'] = len(rows)
+        return session, rows
+
+    async def fetch(self, token: str, page_size: int) -> Tuple[StreamSession, List[Tuple[Any, ...]]]:
+        """读取下一页，令牌不存在或已过期时抛出KeyError"""
+        await self.reap()
+        session = self._sessions.get(token)
+        if session is None:
+            raise KeyError(token)
+        async with session.lock:
+            if token not in self._sessions:
+                raise KeyError(token)
+            rows = await self._read_page(session, page_size)
+        return session, rows
+
+    async def _read_page(self, session: StreamSession, page_size: int) -> List[Tuple[Any, ...]]:
+        rows: List[Tuple[Any, ...]] = []
+        try:
+            if session.pending is not None:
+                rows.append(session.pending)
+                session.pending = None
+            if len(rows) < page_size:
+                rows.extend(await session.cursor.fetchmany(page_size - len(rows)))
+            session.pending = await session.cursor.fetchone()
+        except BaseException:
+            # 读取中途失败或被取消时游标停在结果中间，只能关闭连接
+            await self._close_session(session, drained=False)
+            raise
+
+        session.rows_fetched += len(rows)
+        session.last_used = asyncio.get_running_loop().time()
+        if session.pending is None:
+            session.done = True
+            await self._close_session(session, drained=True)
+        return rows
+
+    async def close(self, token: str) -> bool:
+        """关闭游标并归还连接，返回令牌是否存在"""
+        session = self._sessions.get(token)
+        if session is None:
+            return False
+        async with session.lock:
+            if token not in self._sessions:
+                return False
+            await self._close_session(session, drained=session.done)
+        return True
+
+    async def _close_session(self, session: StreamSession, drained: bool) -> None:
+        """结果已读完时正常归还连接；否则直接关闭连接，避免读完剩余的全部行"""
+        self._sessions.pop(session.token, None)
+        if drained:
+            try:
+                await session.cursor.close()
+            except Exception as e:
+                logger.warning(f"关闭流式游标失败: {e}")
+                drained = False
+        await session.pool.release(session.conn, discard=not drained, reset=session.reset)
+
+    async def reap(self) -> int:
+        """关闭所有空闲超时的游标，返回关闭的数量"""
+        now = asyncio.get_running_loop().time()
+        expired = [
+            s for s in list(self._sessions.values())
+            if not s.lock.locked() and now - s.last_used >= self.idle_ttl
+        ]
+        closed = 0
+        for session in expired:
+            async with session.lock:
+                # 等待锁期间游标可能已被续读或关闭
+                now = asyncio.get_running_loop().time()
+                if session.token in self._sessions and now - session.last_used >= self.idle_ttl:
+                    await self._close_session(session, drained=False)
+                    closed += 1
+        return closed
+
+    def _ensure_reaper(self) -> None:
+        """存在打开的游标时在后台定期回收超时游标"""
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.get_running_loop().create_task(self._reap_loop())
+
+    async def _reap_loop(self) -> None:
+        interval = max(1.0, min(self.idle_ttl / 2, 30.0))
+        while self._sessions:
+            await asyncio.sleep(interval)
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.warning(f"回收流式游标失败: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """返回游标状态"""
+        return {
+            "open_cursors": len(self._sessions),
+            "max_cursors": self.max_cursors,
+            "idle_ttl": self.idle_ttl,
+        }
+
+    async def close_all(self) -> None:
+        """关闭所有游标（服务器关闭时调用）"""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        for session in list(self._sessions.values()):
+            await self._close_session(session, drained=False)
+
+
+_shared_registry: Optional[StreamRegistry] = None
+
+
+def get_stream_registry(idle_ttl: float = 60.0, max_cursors: int = 4) -> StreamRegistry:
+    """获取进程内共享的游标注册表，首次调用时按给定参数创建"""
+    global _shared_registry
+    if _shared_registry is None:
+        _shared_registry = StreamRegistry(idle_ttl=idle_ttl, max_cursors=max_cursors)
+    return _shared_registry
+
+
+async def close_stream_registry() -> None:
+    """关闭所有流式游标（须在关闭连接池之前调用）"""
+    global _shared_registry
+    if _shared_registry is not None:
+        registry, _shared_registry = _shared_registry, None
+        await registry.close_all()
@@ -0,0 +1,242 @@
+"""结果集的常数内存摘要
+
+按块读取结果并增量计算每列的统计量，内存占用与结果集行数无关：
+
+- 计数、NULL数、最小/最大值
+- 数值列的均值与方差（按块计算后用Chan的并行公式合并，数值稳定）
+- 近似不同值数（HyperLogLog，精度12时标准误差约1.6%）
+- 高频值（Misra-Gries摘要，给出的次数是下界，误差不超过top_error）
+- 整行的蓄水池抽样（Algorithm L，每块只需生成被替换行的随机数）
+"""
+
+import heapq
+import math
+import random
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+from .converters import DECIMAL_TYPES, NULL, NUMERIC_TYPES, TYPE_NAMES, YEAR, convert_value
+
+# 摘要模式每次从服务端游标读取的行数
+SUMMARY_CHUNK_ROWS = 2000
+# HyperLogLog的精度：2**12个一字节的寄存器
+HLL_PRECISION = 12
+# 每列的高频值摘要最多保留的计数器数
+TOP_CAPACITY = 64
+# 输出中字符串值（最小/最大值、高频值）的最大长度
+MAX_VALUE_LENGTH = 256
+
+_MASK64 = (1 << 64) - 1
+_STATS_TYPES = (NUMERIC_TYPES | DECIMAL_TYPES) - {NULL, YEAR}
+
+
+def _mix64(x: int) -> int:
+    """splitmix64的终结函数：int的hash()是其自身，需要打散后才能用于HyperLogLog"""
+    x &= _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+class HyperLogLog:
+    """近似不同值计数（进程内的hash()，估计值只在本次摘要内有意义）"""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def update(self, values) -> None:
+        p = self.precision
+        width = 64 - p
+        low = (1 << width) - 1
+        registers = self.registers
+        for value in values:
+            h = _mix64(hash(value))
+            index = h >> width
+            rank = width - (h & low).bit_length() + 1
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / math.fsum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # 小基数时改用线性计数
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+
+class TopValues:
+    """Misra-Gries高频值摘要：可以逐块合并，计数器超过容量时整体减去第capacity+1大的计数"""
+
+    def __init__(self, capacity: int = TOP_CAPACITY):
+        self.capacity = capacity
+        self.counts: Counter = Counter()
+        # 任一值的实际次数与counts中的计数之差不超过error
+        self.error = 0
+
+    @property
+    def exact(self) -> bool:
+        return self.error == 0
+
+    def update(self, chunk: Counter) -> None:
+        counts = self.counts
+        counts.update(chunk)
+        if len(counts) > self.capacity:
+            cut = heapq.nlargest(self.capacity + 1, counts.values())[-1]
+            self.error += cut
+            self.counts = Counter({value: count - cut for value, count in counts.items() if count > cut})
+
+    def top(self, k: int) -> List[Any]:
+        """出现次数确定高于误差的前k个值，按计数降序"""
+        return [(value, count) for value, count in self.counts.most_common(k) if count > self.error]
+
+
+class Reservoir:
+    """固定大小的均匀行抽样（Algorithm L）"""
+
+    def __init__(self, size: int, rng: Optional[random.Random] = None):
+        self.size = size
+        self.rows: List[Sequence[Any]] = []
+        self.seen = 0
+        self._rng = rng or random.Random()
+        self._w = 1.0
+        self._next = 0
+
+    def _advance(self) -> None:
+        rng = self._rng
+        self._w *= math.exp(math.log(rng.random() or 1e-300) / self.size)
+        skip = math.floor(math.log(rng.random() or 1e-300) / math.log1p(-self._w)) if self._w < 1 else 0
+        self._next += skip + 1
+
+    def extend(self, rows: Sequence[Sequence[Any]]) -> None:
+        if self.size <= 0:
+            self.seen += len(rows)
+            return
+        start = self.seen
+        end = start + len(rows)
+        index = start
+        while len(self.rows) < self.size and index < end:
+            self.rows.append(rows[index - start])
+            index += 1
+            if len(self.rows) == self.size:
+                # 蓄水池刚填满：确定下一个被替换的行号
+                self._next = index - 1
+                self._advance()
+        if len(self.rows) == self.size:
+            while self._next < end:
+                self.rows[self._rng.randrange(self.size)] = rows[self._next - start]
+                self._advance()
+        self.seen = end
+
+
+class ColumnSummary:
+    """一列的增量统计"""
+
+    def __init__(self, desc: Sequence[Any]):
+        self.name = desc[0]
+        self.type_code = desc[1] if len(desc) > 1 else None
+        self.numeric = self.type_code in _STATS_TYPES
+        self.count = 0
+        self.nulls = 0
+        self.min: Any = None
+        self.max: Any = None
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.comparable = True
+        self.distinct = HyperLogLog()
+        self.top_values = TopValues()
+
+    def update(self, column: Sequence[Any]) -> None:
+        chunk = Counter(column)
+        nulls = chunk.pop(None, 0)
+        self.nulls += nulls
+        if not chunk:
+            return
+        n = len(column) - nulls
+        self.top_values.update(chunk)
+        # 每块的不同值已由Counter去重，HyperLogLog只需处理这些值
+        self.distinct.update(chunk.keys())
+        if self.comparable:
+            try:
+                low, high = min(chunk), max(chunk)
+                self.min = low if self.min is None else min(self.min, low)
+                self.max = high if self.max is None else max(self.max, high)
+            except TypeError:
+                # 同一列出现无法比较的类型（如零日期以字符串返回）
+                self.comparable = False
+                self.min = self.max = None
+        if self.numeric:
+            values = [float(v) for v in column if v is not None]
+            mean = math.fsum(values) / n
+            m2 = math.fsum((v - mean) ** 2 for v in values)
+            total = self.count + n
+            delta = mean - self.mean
+            self.mean += delta * n / total
+            self.m2 += m2 + delta * delta * self.count * n / total
+        self.count += n
+
+    def stats(self, top_k: int, decimal_as_string: bool = False) -> Dict[str, Any]:
+        exact = self.top_values.exact
+        result: Dict[str, Any] = {
+            "name": self.name,
+            "type": TYPE_NAMES.get(self.type_code, str(self.type_code)),
+            "count": self.count,
+            "nulls": self.nulls,
+            "distinct": len(self.top_values.counts) if exact else self.distinct.estimate(),
+            "distinct_exact": exact,
+            "min": _output_value(self.min, decimal_as_string),
+            "max": _output_value(self.max, decimal_as_string),
+        }
+        if self.numeric:
+            result["mean"] = self.mean if self.count else None
+            result["variance"] = self.m2 / (self.count - 1) if self.count > 1 else None
+            result["stddev"] = math.sqrt(result["variance"]) if result["variance"] is not None else None
+        result["top"] = [
+            {"value": _output_value(value, decimal_as_string), "count": count}
+            for value, count in self.top_values.top(top_k)
+        ]
+        result["top_error"] = self.top_values.error
+        return result
+
+
+def _output_value(value: Any, decimal_as_string: bool) -> Any:
+    value = convert_value(value, decimal_as_string)
+    if isinstance(value, str) and len(value) > MAX_VALUE_LENGTH:
+        return value[:MAX_VALUE_LENGTH]
+    return value
+
+
+class ResultSummary:
+    """整个结果集的摘要：逐块调用update，结束后由stats输出
+
+    Args:
+        description: cursor.description
+        top_k: 每列输出的高频值个数
+        sample_size: 蓄水池抽样保留的行数
+        decimal_as_string: 最小/最大值与高频值中的DECIMAL按字符串输出
+    """
+
+    def __init__(
+        self,
+        description: Sequence[Sequence[Any]],
+        top_k: int = 5,
+        sample_size: int = 5,
+        decimal_as_string: bool = False,
+    ):
+        self.top_k = top_k
+        self.decimal_as_string = decimal_as_string
+        self.rows = 0
+        self.columns = [ColumnSummary(desc) for desc in description]
+        self.sample = Reservoir(sample_size)
+
+    def update(self, rows: Sequence[Sequence[Any]]) -> None:
+        self.rows += len(rows)
+        for summary, column in zip(self.columns, zip(*rows)):
+            summary.update(column)
+        self.sample.extend(rows)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [column.stats(self.top_k, self.decimal_as_string) for column in self.columns]
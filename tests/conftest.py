@@ -0,0 +1,75 @@
+"""测试共用的fixture
+
+回归测试通过benchmarks.fake_driver（基准测试使用的进程内aiomysql替身）驱动处理器，不需要
+MySQL服务器。benchmarks是测试的显式依赖：pyproject.toml中的pythonpath把仓库根目录加入导入路径，
+测试模块只通过这里的fake_mysql fixture使用它。
+"""
+
+import asyncio
+from typing import Any, Dict, Optional
+
+import pytest
+
+from benchmarks import fake_driver
+from mysql_mcp import cost_gate, mysql_handler, replicas, result_cache, slow_log, streaming
+from mysql_mcp import pool as pool_module
+from mysql_mcp.config import Settings
+
+
+class SlowSelectServer(fake_driver.FakeServer):
+    """SELECT要执行很久的服务器，记录收到的每条语句"""
+
+    def __init__(self, select_latency: float, **kwargs: Any):
+        super().__init__(latency=0, **kwargs)
+        self.select_latency = select_latency
+        self.log = []
+        self._slow = False
+
+    def respond(self, query, args=None):
+        self.log.append(query)
+        self._slow = query.lstrip().upper().startswith('SELECT')
+        return super().respond(query, args)
+
+    async def delay(self, rows=0):
+        # 只有紧跟在SELECT之后的等待是慢的（建立连接等其他等待不受影响）
+        slow, self._slow = self._slow, False
+        await asyncio.sleep(self.select_latency if slow else 0)
+
+
+class FakeMySQL:
+    """在测试中安装FakeServer，并构造指向它的配置"""
+
+    TABLE = fake_driver.TABLE
+    FakeServer = fake_driver.FakeServer
+    SlowSelectServer = SlowSelectServer
+
+    @staticmethod
+    def settings(**overrides: Any) -> Settings:
+        values = dict(
+            host='127.0.0.1', port=3306, user='test', password='test', database='bench',
+            allow_dangerous_operations=False, is_chinese=False,
+        )
+        values.update(overrides)
+        return Settings(**values)
+
+    @staticmethod
+    def install(server: fake_driver.FakeServer, hosts: Optional[Dict[str, fake_driver.FakeServer]] = None):
+        return fake_driver.install(server, hosts)
+
+    @staticmethod
+    async def close() -> None:
+        """关闭本次测试创建的游标、副本路由与连接池（须在安装替身的事件循环中调用）"""
+        await streaming.close_stream_registry()
+        await replicas.close_replica_router()
+        await pool_module.close_shared_pool()
+
+
+@pytest.fixture
+def fake_mysql(monkeypatch) -> FakeMySQL:
+    # 进程内共享的缓存与闸门按首次调用时的配置创建，每个测试从头开始
+    monkeypatch.setattr(result_cache, '_shared_cache', None)
+    monkeypatch.setattr(mysql_handler, '_verdict_cache', None)
+    monkeypatch.setattr(mysql_handler, '_metadata_cache', None)
+    monkeypatch.setattr(cost_gate, '_shared_gate', None)
+    monkeypatch.setattr(slow_log, '_shared_log', None)
+    return FakeMySQL()
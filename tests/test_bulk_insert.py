@@ -0,0 +1,77 @@
+"""bulk_insert：按服务器版本选择upsert写法，每个提交分块受查询期限限制"""
+
+import asyncio
+import json
+
+import pytest
+
+from mysql_mcp.mysql_handler import MySQLHandler, supports_row_alias
+
+ROWS = [[i, f"item-{i}"] for i in range(5)]
+
+
+@pytest.mark.parametrize("version, expected", [
+    ("8.0.36", True),
+    ("8.0.19-log", True),
+    ("8.4.2", True),
+    ("8.0.18", False),
+    ("5.7.44-log", False),
+    ("10.11.6-MariaDB-log", False),
+    ("unknown", False),
+])
+def test_supports_row_alias(version, expected):
+    assert supports_row_alias(version) is expected
+
+
+@pytest.mark.parametrize("version, update", [
+    ("8.0.36", "AS new ON DUPLICATE KEY UPDATE `id` = new.`id`, `name` = new.`name`"),
+    ("5.7.44", "ON DUPLICATE KEY UPDATE `id` = VALUES(`id`), `name` = VALUES(`name`)"),
+])
+def test_upsert_clause_follows_server_version(fake_mysql, version, update):
+    handler = MySQLHandler(fake_mysql.settings(allow_dangerous_operations=True))
+    server = fake_mysql.FakeServer(rows=10, latency=0, version=version)
+
+    async def run():
+        with fake_mysql.install(server):
+            try:
+                result = json.loads(await handler.bulk_insert(fake_mysql.TABLE, ["id", "name"], ROWS, upsert=True))
+                assert result["status"] == "success"
+                assert server.last_batch.endswith(f"VALUES (%s, %s) {update}")
+            finally:
+                await fake_mysql.close()
+
+    asyncio.run(run())
+
+
+def bulk_insert(fake_mysql, commit_rows):
+    """每行写入0.3秒、查询期限0.05秒（加上客户端宽限共约1.05秒）时写入5行"""
+    handler = MySQLHandler(fake_mysql.settings(
+        allow_dangerous_operations=True, query_timeout=0.05, bulk_commit_rows=commit_rows
+    ))
+    server = fake_mysql.FakeServer(rows=10, latency=0, row_latency=0.3)
+
+    async def run():
+        with fake_mysql.install(server):
+            try:
+                result = json.loads(await handler.bulk_insert(fake_mysql.TABLE, ["id", "name"], ROWS))
+                return result, handler.pool._pool.size
+            finally:
+                await fake_mysql.close()
+
+    return asyncio.run(run())
+
+
+def test_deadline_applies_per_commit_chunk(fake_mysql):
+    # 总耗时超过期限，但每个分块都在期限内
+    result, _ = bulk_insert(fake_mysql, commit_rows=1)
+    assert result["status"] == "success"
+    assert result["commits"] == 5
+
+
+def test_chunk_over_deadline_is_aborted(fake_mysql):
+    result, pool_size = bulk_insert(fake_mysql, commit_rows=5)
+    assert result["status"] == "error"
+    assert "timed out" in result["message"]
+    assert result["rows_committed"] == 0
+    # 超时的连接被关闭而不是归还连接池
+    assert pool_size == 0
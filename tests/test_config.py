@@ -0,0 +1,53 @@
+"""从环境变量解析配置：小连接池与低并发上限下的默认值"""
+
+import pytest
+
+from mysql_mcp.config import Settings
+
+REQUIRED_ENV = {
+    'MYSQL_HOST': '127.0.0.1:3306',
+    'MYSQL_USER': 'test',
+    'MYSQL_PASSWORD': 'test',
+    'MYSQL_DATABASE': 'test',
+}
+
+
+@pytest.fixture
+def env(monkeypatch):
+    for name in (
+        'MYSQL_POOL_MAX_SIZE', 'MYSQL_STREAM_MAX_CURSORS',
+        'MYSQL_MAX_CONCURRENT', 'MYSQL_METADATA_RESERVED_SLOTS',
+    ):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in REQUIRED_ENV.items():
+        monkeypatch.setenv(name, value)
+    return monkeypatch
+
+
+@pytest.mark.parametrize("pool_max_size, expected", [(10, 4), (5, 4), (4, 3), (2, 1), (1, 0)])
+def test_stream_cursor_default_fits_small_pools(env, pool_max_size, expected):
+    env.setenv('MYSQL_POOL_MAX_SIZE', str(pool_max_size))
+    settings = Settings.from_env()
+    assert settings.stream_max_cursors == expected
+
+
+def test_explicit_stream_cursors_must_leave_a_connection(env):
+    env.setenv('MYSQL_POOL_MAX_SIZE', '4')
+    env.setenv('MYSQL_STREAM_MAX_CURSORS', '4')
+    with pytest.raises(ValueError):
+        Settings.from_env()
+
+
+@pytest.mark.parametrize("variable", ['MYSQL_MAX_CONCURRENT', 'MYSQL_POOL_MAX_SIZE'])
+def test_single_slot_reserves_nothing_for_metadata(env, variable):
+    env.setenv(variable, '1')
+    settings = Settings.from_env()
+    assert settings.max_concurrent == 1
+    assert settings.metadata_reserved_slots == 0
+
+
+def test_explicit_reserved_slots_must_leave_a_query_slot(env):
+    env.setenv('MYSQL_MAX_CONCURRENT', '1')
+    env.setenv('MYSQL_METADATA_RESERVED_SLOTS', '1')
+    with pytest.raises(ValueError):
+        Settings.from_env()
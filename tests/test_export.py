@@ -0,0 +1,41 @@
+"""导出文件的发布：不覆盖导出期间出现的同名文件"""
+
+import asyncio
+
+import pytest
+
+from mysql_mcp.export import ExportError, ExportWriter, export_path
+
+
+def test_finish_does_not_overwrite_file_created_during_export(tmp_path):
+    path = export_path(str(tmp_path), 'report', 'csv', False)
+    writer = ExportWriter(path, compress=False)
+
+    async def run():
+        writer.open()
+        await writer.write(b"id\r\n1\r\n")
+        with open(path, 'wb') as other:
+            other.write(b"not ours")
+        try:
+            with pytest.raises(ExportError):
+                await writer.finish()
+        finally:
+            await writer.abort()
+
+    asyncio.run(run())
+    with open(path, 'rb') as f:
+        assert f.read() == b"not ours"
+    assert not (tmp_path / 'report.csv.part').exists()
+
+
+def test_finish_publishes_complete_file(tmp_path):
+    path = export_path(str(tmp_path), 'report', 'csv', False)
+    writer = ExportWriter(path, compress=False)
+
+    async def run():
+        writer.open()
+        await writer.write(b"id\r\n1\r\n")
+        return await writer.finish()
+
+    assert asyncio.run(run()) == 7
+    assert not (tmp_path / 'report.csv.part').exists()
@@ -0,0 +1,43 @@
+"""元数据读取（缓存未命中或比较结构签名时）受查询期限限制"""
+
+import asyncio
+
+import pytest
+
+from mysql_mcp.mysql_handler import MySQLHandler
+
+
+def test_metadata_load_is_bounded_by_query_timeout(fake_mysql):
+    handler = MySQLHandler(fake_mysql.settings(query_timeout=0.1))
+    # information_schema查询是SELECT，在该服务器上执行很久
+    server = fake_mysql.SlowSelectServer(select_latency=5.0, rows=10)
+
+    async def run():
+        with fake_mysql.install(server):
+            try:
+                with pytest.raises(Exception, match="timed out"):
+                    await handler.schema_snapshot()
+                assert any(query.startswith("KILL QUERY") for query in server.log)
+                assert handler.metadata_cache.stats()["size"] == 0
+            finally:
+                await fake_mysql.close()
+
+    asyncio.run(run())
+
+
+def test_cached_metadata_skips_database(fake_mysql):
+    handler = MySQLHandler(fake_mysql.settings(query_timeout=0.1))
+    server = fake_mysql.SlowSelectServer(select_latency=0, rows=10)
+
+    async def run():
+        with fake_mysql.install(server):
+            try:
+                first = await handler.list_tables()
+                count = len(server.log)
+                assert await handler.list_tables() == first
+                # 命中后只比较结构签名，不再执行SHOW TABLES
+                assert not any(query.startswith("SHOW") for query in server.log[count:])
+            finally:
+                await fake_mysql.close()
+
+    asyncio.run(run())
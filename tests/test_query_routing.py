@@ -0,0 +1,104 @@
+"""读写路径的划分：只有单条只读语句走读路径并进入结果缓存"""
+
+import asyncio
+
+import pytest
+
+from mysql_mcp.mysql_handler import MySQLHandler, is_read_only
+from mysql_mcp.result_cache import is_cacheable
+
+TABLE = 'bench_items'
+
+MULTI_STATEMENT = f"SELECT id FROM {TABLE} WHERE 0; DELETE FROM {TABLE}"
+
+
+@pytest.mark.parametrize("query, expected", [
+    (f"SELECT * FROM {TABLE}", True),
+    (f"SELECT * FROM {TABLE};", True),
+    ("SHOW TABLES", True),
+    (f"DESC {TABLE}", True),
+    (f"EXPLAIN DELETE FROM {TABLE}", True),
+    (f"EXPLAIN ANALYZE DELETE FROM {TABLE}", False),
+    (f"DELETE FROM {TABLE}", False),
+    (MULTI_STATEMENT, False),
+    ("SELECT 1; SELECT 2", False),
+])
+def test_is_read_only(query, expected):
+    assert is_read_only(query) is expected
+
+
+def test_multi_statement_is_not_cacheable():
+    assert is_cacheable(f"SELECT id FROM {TABLE}")
+    assert not is_cacheable(MULTI_STATEMENT)
+
+
+def test_multi_statement_write_invalidates_result_cache(fake_mysql):
+    handler = MySQLHandler(fake_mysql.settings(allow_dangerous_operations=True, result_cache_bytes=1 << 20))
+
+    async def run():
+        with fake_mysql.install(fake_mysql.FakeServer(rows=10, latency=0)):
+            try:
+                await handler.execute_query(f"SELECT * FROM {TABLE}")
+                cache = handler.result_cache
+                assert cache.stats()["size"] == 1
+                result = await handler.execute_query(MULTI_STATEMENT)
+                assert result.startswith("查询执行成功")
+                assert cache.stats()["size"] == 0
+                assert cache.invalidations == 1
+            finally:
+                await fake_mysql.close()
+
+    asyncio.run(run())
+
+
+def replica_handler(fake_mysql, **overrides):
+    """配置了一个副本的处理器；副本直接标记为健康，不等待后台探测"""
+    handler = MySQLHandler(fake_mysql.settings(replicas=(('replica', 3306),), **overrides))
+    replica = handler.replicas.replicas[0]
+    replica.healthy, replica.lag = True, 0.0
+    return handler
+
+
+def selects(server):
+    return [query for query in server.log if query.lstrip().upper().startswith('SELECT')]
+
+
+def test_paged_read_is_routed_to_replica(fake_mysql):
+    handler = replica_handler(fake_mysql)
+    primary = fake_mysql.SlowSelectServer(select_latency=0, rows=10)
+    replica = fake_mysql.SlowSelectServer(select_latency=0, rows=10)
+
+    async def run():
+        with fake_mysql.install(primary, hosts={'replica': replica}):
+            try:
+                await handler.execute_query(f"SELECT * FROM {TABLE}", page_size=4)
+                assert len(selects(replica)) == 1
+                assert selects(primary) == []
+                (session,) = handler.streams._sessions.values()
+                assert session.pool is handler.replicas.replicas[0].pool
+                # 需要主库的读仍在主库打开游标
+                await handler.execute_query(f"SELECT id, LAST_INSERT_ID() FROM {TABLE}", page_size=4)
+                assert len(selects(primary)) == 1
+            finally:
+                await fake_mysql.close()
+
+    asyncio.run(run())
+
+
+def test_paged_read_timeout_kills_on_replica(fake_mysql):
+    handler = replica_handler(fake_mysql, query_timeout=0.1)
+    primary = fake_mysql.SlowSelectServer(select_latency=0, rows=10)
+    replica = fake_mysql.SlowSelectServer(select_latency=5.0, rows=10)
+
+    async def run():
+        with fake_mysql.install(primary, hosts={'replica': replica}):
+            try:
+                result = await handler.execute_query(f"SELECT * FROM {TABLE}", page_size=4)
+                assert "timed out" in result
+                assert any(query.startswith("KILL QUERY") for query in replica.log)
+                assert not any(query.startswith("KILL QUERY") for query in primary.log)
+                assert handler.streams.stats()["open_cursors"] == 0
+            finally:
+                await fake_mysql.close()
+
+    asyncio.run(run())
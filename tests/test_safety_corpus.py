@@ -0,0 +1,46 @@
+"""单遍词法分析（lexer）与sqlparse两种安全检查引擎在语料上的判定一致性
+
+语料与已知分歧来自benchmarks.safety_corpus，耗时对比仍在benchmarks中运行。
+"""
+
+import dataclasses
+
+import pytest
+
+from benchmarks.safety_corpus import CORPUS, KNOWN_DIVERGENCES, run_corpus
+from mysql_mcp.config import Settings
+from mysql_mcp.mysql_handler import MySQLHandler
+
+
+@pytest.fixture(scope='module')
+def engines():
+    settings = Settings(
+        host='127.0.0.1', port=3306, user='test', password='test', database='shop',
+        allow_dangerous_operations=False, is_chinese=False, safety_cache_size=0,
+    )
+    lexer = MySQLHandler(dataclasses.replace(settings, sql_parser='lexer'))
+    ast = MySQLHandler(dataclasses.replace(settings, sql_parser='sqlparse'))
+    return lexer, ast
+
+
+@pytest.mark.parametrize("query", CORPUS)
+def test_lexer_matches_sqlparse(engines, query):
+    lexer, ast = engines
+    assert lexer.check_query(query) == ast.check_query(query)
+
+
+@pytest.mark.parametrize("query", KNOWN_DIVERGENCES)
+def test_lexer_rejects_multi_statement_bypasses(engines, query):
+    lexer, ast = engines
+    (lexer_safe, _), _ = lexer.check_query(query)
+    (ast_safe, _), _ = ast.check_query(query)
+    assert not lexer_safe
+    # sqlparse仍然放行时这条语料才是已知分歧；sqlparse修复后应将其移入CORPUS
+    assert ast_safe
+
+
+def test_run_corpus_reports_no_differences(engines):
+    report = run_corpus(*engines)
+    assert report["queries"] == len(CORPUS)
+    assert report["mismatches"] == []
+    assert report["unexpected_divergences"] == []
@@ -0,0 +1,60 @@
+"""连接归还连接池前重置会话：命名锁、用户变量不会被下一个借用者继承"""
+
+import asyncio
+import json
+
+import pytest
+
+from mysql_mcp.mysql_handler import MySQLHandler, leaves_session_state
+
+TABLE = 'bench_items'
+
+
+@pytest.mark.parametrize("query, expected", [
+    (f"SELECT * FROM {TABLE}", False),
+    ("SELECT @@version", False),
+    ("SELECT GET_LOCK('job', 0)", True),
+    ("SELECT @n := COUNT(*) FROM bench_items", True),
+    (f"DELETE FROM {TABLE}", True),
+    ("SET @n = 1", True),
+])
+def test_leaves_session_state(query, expected):
+    assert leaves_session_state(query) is expected
+
+
+def lock_value(response: str) -> int:
+    return next(iter(json.loads(response)["data"][0].values()))
+
+
+def test_named_lock_is_released_before_reuse(fake_mysql):
+    handler = MySQLHandler(fake_mysql.settings())
+    server = fake_mysql.FakeServer(rows=10, latency=0)
+
+    async def run():
+        with fake_mysql.install(server):
+            try:
+                assert lock_value(await handler.execute_query("SELECT GET_LOCK('job', 0)")) == 1
+                assert lock_value(await handler.execute_query("SELECT IS_FREE_LOCK('job')")) == 1
+                assert server.named_locks == {}
+                # 连接经重置后继续复用，而不是被关闭
+                pool = handler.pool._pool
+                assert pool.size == 1
+                assert pool._free[0].resets == 1
+            finally:
+                await fake_mysql.close()
+
+    asyncio.run(run())
+
+
+def test_plain_read_skips_reset(fake_mysql):
+    handler = MySQLHandler(fake_mysql.settings())
+
+    async def run():
+        with fake_mysql.install(fake_mysql.FakeServer(rows=10, latency=0)):
+            try:
+                await handler.execute_query(f"SELECT * FROM {TABLE}")
+                assert handler.pool._pool._free[0].resets == 0
+            finally:
+                await fake_mysql.close()
+
+    asyncio.run(run())
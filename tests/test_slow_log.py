@@ -0,0 +1,32 @@
+"""慢查询日志文件的写入不阻塞事件循环"""
+
+import asyncio
+import json
+import time
+
+from mysql_mcp.slow_log import SlowQueryLog
+
+
+def test_log_file_append_runs_off_the_event_loop(tmp_path, monkeypatch):
+    log_file = tmp_path / 'slow.ndjson'
+    slow_log = SlowQueryLog(threshold=0.0, capacity=10, log_file=str(log_file), explain=False)
+    append = slow_log._append
+
+    def slow_append(line):
+        # 模拟慢磁盘
+        time.sleep(0.3)
+        append(line)
+
+    monkeypatch.setattr(slow_log, '_append', slow_append)
+
+    async def run():
+        slow_log.record("SELECT * FROM t WHERE id = 1", 0.5, rows=1)
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        waited = time.perf_counter() - start
+        await asyncio.gather(*slow_log._tasks)
+        return waited
+
+    assert asyncio.run(run()) < 0.2
+    entries = [json.loads(line) for line in log_file.read_text(encoding='utf-8').splitlines()]
+    assert [entry["rows"] for entry in entries] == [1]
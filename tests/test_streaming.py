@@ -0,0 +1,22 @@
+"""分页读取（page_size）打开游标时的查询期限"""
+
+import asyncio
+
+from mysql_mcp.mysql_handler import MySQLHandler
+
+
+def test_opening_stream_cursor_is_bounded_by_query_timeout(fake_mysql):
+    handler = MySQLHandler(fake_mysql.settings(query_timeout=0.1))
+    server = fake_mysql.SlowSelectServer(select_latency=5.0, rows=10)
+
+    async def run():
+        with fake_mysql.install(server):
+            try:
+                result = await handler.execute_query(f"SELECT * FROM {fake_mysql.TABLE}", page_size=5)
+                assert "timed out" in result
+                assert any(query.startswith("KILL QUERY") for query in server.log)
+                assert handler.streams.stats()["open_cursors"] == 0
+            finally:
+                await fake_mysql.close()
+
+    asyncio.run(run())